@@ -1,20 +1,31 @@
+import heapq
+import random
+import struct
+import threading
+from collections import OrderedDict, deque
+
+
 class Fence:
-    """A class to represent a fence with direction (horizontal/vertical) and number of fences."""
+    """A class to represent a fence with direction (horizontal/vertical) and number of fences. The fence glyphs and the
+    number of fences a player starts with are the same for every game, so they are class attributes."""
+    __slots__ = ("_fences_p1", "_fences_p2")
+    FENCE_HORIZONTAL = "-"
+    FENCE_VERTICAL = "|"
+    FENCES_PER_PLAYER = 10
+
     def __init__(self):
         """The constructor for Fence class. Takes no parameters. Initializes the required data members."""
-        self._fence_horizontal = "-"
-        self._fence_vertical = "|"
-        self._fences_p1 = 10
-        self._fences_p2 = 10
+        self._fences_p1 = self.FENCES_PER_PLAYER
+        self._fences_p2 = self.FENCES_PER_PLAYER
 
     def get_fence_horizontal(self):
         """Gets the horizontal fence. Used by QuordidorGame class to get horizontal fence to be placed at given
         position."""
-        return self._fence_horizontal
+        return self.FENCE_HORIZONTAL
 
     def get_fence_vertical(self):
         """Gets the vertical fence. Used by QuordidorGame class to get vertical fence to be placed at given position."""
-        return self._fence_vertical
+        return self.FENCE_VERTICAL
 
     def get_fences_p1(self):
         """Gets total number of fences for Player 1."""
@@ -25,41 +36,805 @@ class Fence:
         return self._fences_p2
 
 
+# squares are numbered row * 9 + column, where the row is the first index of _board and the column the second one
+BOARD_SIZE = 9
+FULL_MASK = (1 << 81) - 1
+ROW_MASKS = [((1 << BOARD_SIZE) - 1) << (BOARD_SIZE * row) for row in range(BOARD_SIZE)]
+COLUMN_MASKS = [sum(1 << (row * BOARD_SIZE + column) for row in range(BOARD_SIZE)) for column in range(BOARD_SIZE)]
+# a horizontal fence bit marks the top edge of a square, the top row and the bottom border (bits 81-89) are always set
+H_BORDER = ROW_MASKS[0] | (((1 << BOARD_SIZE) - 1) << 81)
+# a vertical fence bit marks the left edge of a square, the first column is always set
+V_BORDER = COLUMN_MASKS[0]
+# fence slots off the borders: a horizontal slot is the top edge of its square, a vertical one the left edge
+FENCE_SLOTS = {"h": FULL_MASK & ~H_BORDER, "v": FULL_MASK & ~V_BORDER}
+# FENCE_CONFLICTS[direction][square] holds the (horizontal, vertical) masks of the slots a fence there can not share the
+# board with. Fences here cover a single square edge, so they only conflict with a fence on the same slot
+FENCE_CONFLICTS = {"h": [(1 << square, 0) for square in range(81)], "v": [(0, 1 << square) for square in range(81)]}
+
+
+def corner_walls(row, column, direction, square):
+    """Returns the (horizontal, vertical) masks of the fence slots touching the given corner of the grid, the slot of
+    the given fence left out, or None for a corner on the outer border, which always touches a wall. Corner (r, c) is
+    the top left corner of square (r, c)."""
+    if row in (0, BOARD_SIZE) or column in (0, BOARD_SIZE):
+        return None
+    h_walls = (1 << (row * BOARD_SIZE + column - 1)) | (1 << (row * BOARD_SIZE + column))
+    v_walls = (1 << ((row - 1) * BOARD_SIZE + column)) | (1 << (row * BOARD_SIZE + column))
+    if direction == "h":
+        h_walls &= ~(1 << square)
+    else:
+        v_walls &= ~(1 << square)
+    return h_walls, v_walls
+
+
+# FENCE_CORNERS[direction][square] holds corner_walls of both ends of a fence. A fence can only cut the board in two
+# when both of its ends touch a wall already
+FENCE_CORNERS = {
+    "h": [(corner_walls(square // BOARD_SIZE, square % BOARD_SIZE, "h", square),
+           corner_walls(square // BOARD_SIZE, square % BOARD_SIZE + 1, "h", square)) for square in range(81)],
+    "v": [(corner_walls(square // BOARD_SIZE, square % BOARD_SIZE, "v", square),
+           corner_walls(square // BOARD_SIZE + 1, square % BOARD_SIZE, "v", square)) for square in range(81)],
+}
+# row each pawn has to reach to win, as used by win_logic
+GOAL_MASKS = {1: ROW_MASKS[8], 2: ROW_MASKS[0]}
+START_SQUARES = {1: 4, 2: 76}
+PAWN_GLYPHS = {1: "P1", 2: "P2"}
+# distance given to squares that cannot reach the goal row
+UNREACHABLE = 1000
+
+# Zobrist keys, drawn from a fixed seed so hashes are the same in every process
+_zobrist_random = random.Random(20210315)
+PAWN_KEYS = {player_number: [_zobrist_random.getrandbits(64) for _ in range(81)] for player_number in (1, 2)}
+H_FENCE_KEYS = [_zobrist_random.getrandbits(64) for _ in range(81)]
+V_FENCE_KEYS = [_zobrist_random.getrandbits(64) for _ in range(81)]
+# a player starts with 10 fences, so there is a key for every count from 0 to 10
+FENCE_COUNT_KEYS = {player_number: [_zobrist_random.getrandbits(64) for _ in range(11)] for player_number in (1, 2)}
+TURN_KEY = _zobrist_random.getrandbits(64)
+
+# kinds of values kept in a TranspositionTable entry
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# to_bytes layout: square of each pawn, the horizontal and the vertical fences without the borders as 11 byte
+# integers, fences left of each player, turn and state
+GAME_BYTES = struct.Struct("<BB11s11sBBBB")
+GAME_STATES = ("UNFINISHED", "Player_1 won", "Player_2 won")
+
+
+def fence_edge(direction, square):
+    """Returns the two squares a fence at the given slot separates."""
+    if direction == "h":
+        return square - BOARD_SIZE, square
+    return square - 1, square
+
+
+def square_of(x_coord, y_coord):
+    """Returns the square number of the given _board position."""
+    return x_coord * BOARD_SIZE + y_coord
+
+
+def square_of_mask(mask):
+    """Returns the square number of a mask holding a single pawn."""
+    return mask.bit_length() - 1
+
+
+def freeze_row(row):
+    """Returns a row of the _board layout as a tuple of cell tuples, so it can be shared and never written to."""
+    return tuple(tuple(cell) for cell in row)
+
+
+# directions a pawn can step in, used to index the move tables
+DOWN = 0
+UP = 1
+RIGHT = 2
+LEFT = 3
+# directions of the diagonal moves taken when a jump in the given direction is blocked
+SIDE_DIRECTIONS = ((LEFT, RIGHT), (LEFT, RIGHT), (UP, DOWN), (UP, DOWN))
+
+
+def step_entry(square, direction):
+    """Returns (neighbour, fence plane, fence bit) of a step from the square in the given direction, the plane being 0
+    for horizontal and 1 for vertical fences, or None if the step leaves the board."""
+    (x_coord, y_coord) = divmod(square, BOARD_SIZE)
+    if direction == DOWN:
+        return (square + BOARD_SIZE, 0, 1 << (square + BOARD_SIZE)) if x_coord < BOARD_SIZE - 1 else None
+    if direction == UP:
+        return (square - BOARD_SIZE, 0, 1 << square) if x_coord > 0 else None
+    if direction == RIGHT:
+        return (square + 1, 1, 1 << (square + 1)) if y_coord < BOARD_SIZE - 1 else None
+    return (square - 1, 1, 1 << square) if y_coord > 0 else None
+
+
+# move tables, built once for every square. STEPS[square][direction] is a step_entry (a jump over the pawn on square is
+# the step from square), ADJACENT[square] holds (direction, neighbour, plane, bit) of every step staying on the board
+# and DIAGONALS[square][direction] the steps from square taken instead of a blocked jump in that direction
+STEPS = [[step_entry(square, direction) for direction in (DOWN, UP, RIGHT, LEFT)] for square in range(81)]
+ADJACENT = [tuple((direction,) + STEPS[square][direction] for direction in (DOWN, UP, RIGHT, LEFT)
+                  if STEPS[square][direction] is not None) for square in range(81)]
+DIAGONALS = [[tuple(STEPS[square][side] for side in SIDE_DIRECTIONS[direction] if STEPS[square][side] is not None)
+              for direction in (DOWN, UP, RIGHT, LEFT)] for square in range(81)]
+
+
+class Bitboard:
+    """A class to represent the pawns and fences of a game as integers. Each pawn is an 81 bit mask with a single bit
+    set, horizontal and vertical fences are masks of the square edges they block, borders included. Neighbour and fence
+    tests are made by shifting and masking the integers."""
+    __slots__ = ("_pawns", "_h_fences", "_v_fences")
+
+    def __init__(self):
+        """The constructor for Bitboard class. Takes no parameters. Places both pawns on their starting squares."""
+        # indexed by player number, the first entry is not used
+        self._pawns = [0, 1 << START_SQUARES[1], 1 << START_SQUARES[2]]
+        self._h_fences = H_BORDER
+        self._v_fences = V_BORDER
+
+    def get_pawn(self, player_number):
+        """Gets the mask of the given player's pawn."""
+        return self._pawns[player_number]
+
+    def get_h_fences(self):
+        """Gets the mask of horizontal fences, borders included."""
+        return self._h_fences
+
+    def get_v_fences(self):
+        """Gets the mask of vertical fences, borders included."""
+        return self._v_fences
+
+    def set_pawn(self, player_number, mask):
+        """Moves the given player's pawn to the square of the mask. Does not check the rules."""
+        self._pawns[player_number] = mask
+
+    def set_fences(self, h_fences, v_fences):
+        """Replaces every fence with the given masks, borders added. Does not check the rules."""
+        self._h_fences = h_fences | H_BORDER
+        self._v_fences = v_fences | V_BORDER
+
+    def is_fence_free(self, direction, square):
+        """Checks that no fence (or border) is in conflict with a fence at the given slot."""
+        conflicts = FENCE_CONFLICTS.get(direction)
+        if conflicts is None:
+            return False
+        (h_conflicts, v_conflicts) = conflicts[square]
+        return not (self._h_fences & h_conflicts or self._v_fences & v_conflicts)
+
+    def free_fence_slots(self, direction):
+        """Returns the mask of the slots of the given direction where a fence is in conflict with no other fence."""
+        if direction == "h":
+            return FENCE_SLOTS["h"] & ~self._h_fences
+        return FENCE_SLOTS["v"] & ~self._v_fences
+
+    def set_fence(self, direction, square):
+        """Places a fence at the given slot. Does not check the rules."""
+        if direction == "h":
+            self._h_fences |= 1 << square
+        else:
+            self._v_fences |= 1 << square
+
+    def remove_fence(self, direction, square):
+        """Takes a fence away from the given slot. Does not check the rules."""
+        if direction == "h":
+            self._h_fences &= ~(1 << square)
+        else:
+            self._v_fences &= ~(1 << square)
+
+    def neighbours(self, square):
+        """Returns the squares a pawn on the given square could step to if there were no other pawn."""
+        mask = 1 << square
+        squares = []
+        for step in (self.shift_down(mask), self.shift_up(mask), self.shift_right(mask), self.shift_left(mask)):
+            if step:
+                squares.append(square_of_mask(step))
+        return squares
+
+    def shift_down(self, mask):
+        """Moves every square of the mask one row down (towards row 8), dropping the ones blocked by a fence."""
+        return (mask << BOARD_SIZE) & ~self._h_fences & FULL_MASK
+
+    def shift_up(self, mask):
+        """Moves every square of the mask one row up (towards row 0), dropping the ones blocked by a fence."""
+        return (mask & ~self._h_fences) >> BOARD_SIZE
+
+    def shift_right(self, mask):
+        """Moves every square of the mask one column right, dropping the ones blocked by a fence."""
+        return (mask << 1) & ~self._v_fences & FULL_MASK
+
+    def shift_left(self, mask):
+        """Moves every square of the mask one column left, dropping the ones blocked by a fence."""
+        return (mask & ~self._v_fences) >> 1
+
+    def pawn_move_masks(self, player_number):
+        """Returns the masks (steps, jumps, diagonals) of the squares the given player's pawn can move to. A pawn steps
+        right, left, forward or backwards, jumps over the other pawn if they are face to face and moves diagonally when
+        a fence (or border) is at the back of the other pawn. Both players go through the same move tables."""
+        pawn = square_of_mask(self._pawns[player_number])
+        other = square_of_mask(self._pawns[3 - player_number])
+        fences = (self._h_fences, self._v_fences)
+        steps = 0
+        jumps = 0
+        diagonals = 0
+        for (direction, neighbour, plane, bit) in ADJACENT[pawn]:
+            if fences[plane] & bit:
+                continue
+            # the other pawn is not in the way, plain step
+            if neighbour != other:
+                steps |= 1 << neighbour
+                continue
+            # jump over the other pawn if there is no fence at its back, else move diagonally
+            jump = STEPS[other][direction]
+            if jump is not None and not fences[jump[1]] & jump[2]:
+                jumps |= 1 << jump[0]
+                continue
+            for (side, side_plane, side_bit) in DIAGONALS[other][direction]:
+                if not fences[side_plane] & side_bit:
+                    diagonals |= 1 << side
+        return steps, jumps, diagonals
+
+    def pawn_moves(self, player_number):
+        """Returns the mask of every square the given player's pawn can move to: steps, jumps and diagonal moves."""
+        (steps, jumps, diagonals) = self.pawn_move_masks(player_number)
+        return steps | jumps | diagonals
+
+    def touches_walls(self, direction, square):
+        """Checks that both ends of a fence at the given slot touch a fence or the border. A fence that does not can not
+        cut any square off."""
+        for walls in FENCE_CORNERS[direction][square]:
+            if walls is not None and not (self._h_fences & walls[0] or self._v_fences & walls[1]):
+                return False
+        return True
+
+    def keeps_shortest_step(self, distances, square, blocked):
+        """Checks that the square still has an open step to a neighbour one step closer to the goal, as given by the
+        distances list, other than the step to the blocked neighbour. If it has, blocking that step changes no
+        distance."""
+        fences = (self._h_fences, self._v_fences)
+        closer = distances[square] - 1
+        for (_, neighbour, plane, bit) in ADJACENT[square]:
+            if neighbour != blocked and distances[neighbour] == closer and not fences[plane] & bit:
+                return True
+        return False
+
+    def goal_distances(self, player_number):
+        """Returns a list holding, for every square, the number of steps needed to reach the given player's goal row.
+        Squares cut off from the goal get UNREACHABLE. Pawns do not block paths."""
+        distances = [UNREACHABLE] * 81
+        frontier = GOAL_MASKS[player_number]
+        reached = frontier
+        distance = 0
+        # breadth first search from the whole goal row, one row of shifts per step
+        while frontier:
+            mask = frontier
+            while mask:
+                lowest = mask & -mask
+                distances[square_of_mask(lowest)] = distance
+                mask ^= lowest
+            frontier = (self.shift_down(frontier) | self.shift_up(frontier) | self.shift_right(frontier) |
+                        self.shift_left(frontier)) & ~reached
+            reached |= frontier
+            distance += 1
+        return distances
+
+    def repair_distances(self, distances, first, second):
+        """Updates a goal_distances list after a fence was placed between the two given squares. Only the squares whose
+        every shortest path went through that edge are searched again. Returns the same list if nothing changed,
+        otherwise a new one."""
+        if distances[first] == distances[second]:
+            return distances
+        if distances[first] > distances[second]:
+            upper = first
+        else:
+            upper = second
+        # collect the squares left without a neighbour one step closer to the goal, nearest ones first
+        affected = set()
+        queue = deque([upper])
+        while queue:
+            square = queue.popleft()
+            if square in affected:
+                continue
+            distance = distances[square]
+            neighbours = self.neighbours(square)
+            if any(distances[near] == distance - 1 and near not in affected for near in neighbours):
+                continue
+            affected.add(square)
+            for near in neighbours:
+                if distances[near] == distance + 1:
+                    queue.append(near)
+        if not affected:
+            return distances
+        # search again inside the affected region, starting from the distances around it
+        repaired = list(distances)
+        for square in affected:
+            repaired[square] = UNREACHABLE
+        heap = []
+        for square in affected:
+            best = min([distances[near] + 1 for near in self.neighbours(square) if near not in affected],
+                       default=UNREACHABLE)
+            if best < UNREACHABLE:
+                repaired[square] = best
+                heap.append((best, square))
+        heapq.heapify(heap)
+        while heap:
+            (distance, square) = heapq.heappop(heap)
+            if distance > repaired[square]:
+                continue
+            for near in self.neighbours(square):
+                if near in affected and distance + 1 < repaired[near]:
+                    repaired[near] = distance + 1
+                    heapq.heappush(heap, (distance + 1, near))
+        return repaired
+
+    def has_reached_goal(self, player_number):
+        """Checks if the given player's pawn is on its goal row."""
+        return self._pawns[player_number] & GOAL_MASKS[player_number] != 0
+
+    def load_board(self, board):
+        """Reads pawns and fences from a board in the _board layout of QuoridorGame."""
+        self._h_fences = H_BORDER
+        self._v_fences = V_BORDER
+        for x_coord in range(BOARD_SIZE):
+            for y_coord in range(BOARD_SIZE):
+                cell = board[x_coord][y_coord]
+                square = square_of(x_coord, y_coord)
+                if cell[0] == "-":
+                    self._h_fences |= 1 << square
+                if cell[1] == "|":
+                    self._v_fences |= 1 << square
+                if cell[2] == "P1":
+                    self._pawns[1] = 1 << square
+                elif cell[2] == "P2":
+                    self._pawns[2] = 1 << square
+
+    def to_board_row(self, x_coord):
+        """Returns a new row of the _board layout of QuoridorGame. The first column shows the left border in its first
+        slot and the right border column is always the same."""
+        row = []
+        for y_coord in range(BOARD_SIZE):
+            square = square_of(x_coord, y_coord)
+            if self._h_fences >> square & 1 and (x_coord > 0 or y_coord > 0):
+                horizontal = "-"
+            elif y_coord == 0:
+                horizontal = "|"
+            else:
+                horizontal = ""
+            if self._v_fences >> square & 1 and y_coord > 0:
+                vertical = "|"
+            else:
+                vertical = ""
+            if self._pawns[1] >> square & 1:
+                pawn = "P1"
+            elif self._pawns[2] >> square & 1:
+                pawn = "P2"
+            else:
+                pawn = "X"
+            row.append([horizontal, vertical, pawn])
+        row.append(["||"])
+        return row
+
+    def to_board(self):
+        """Returns a new board in the _board layout of QuoridorGame. The bottom border row is always the same."""
+        board = [self.to_board_row(x_coord) for x_coord in range(BOARD_SIZE)]
+        board.append([["-", "", ""] for _ in range(BOARD_SIZE)])
+        return board
+
+
+class TranspositionTable:
+    """A class to represent a fixed size table of search results keyed by Zobrist hash. Entries are kept in pairs of
+    slots: the first slot of a pair keeps the deepest result (depth-preferred), the second one always takes the newest
+    result. The table never grows past the size given to the constructor."""
+    def __init__(self, size=1 << 16):
+        """The constructor for TranspositionTable class. Takes the number of entries, rounded down to a power of two
+        and at least two (one pair of slots)."""
+        pairs = 1
+        while pairs * 4 <= size:
+            pairs *= 2
+        self._mask = pairs - 1
+        self._keys = [None] * (pairs * 2)
+        self._entries = [None] * (pairs * 2)
+        self._hits = 0
+        self._misses = 0
+
+    def get_size(self):
+        """Gets the number of entries the table can hold."""
+        return len(self._keys)
+
+    def get_hits(self):
+        """Gets the number of successful lookups."""
+        return self._hits
+
+    def get_misses(self):
+        """Gets the number of lookups that found nothing."""
+        return self._misses
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        self._keys = [None] * len(self._keys)
+        self._entries = [None] * len(self._entries)
+        self._hits = 0
+        self._misses = 0
+
+    def lookup(self, key):
+        """Returns the (depth, value, flag, move) entry stored for the given key, or None."""
+        slot = (key & self._mask) * 2
+        if self._keys[slot] == key:
+            self._hits += 1
+            return self._entries[slot]
+        if self._keys[slot + 1] == key:
+            self._hits += 1
+            return self._entries[slot + 1]
+        self._misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, move=None):
+        """Stores a search result. It goes in the depth-preferred slot if that one holds the same position or a
+        shallower result, otherwise it replaces the always-replace slot."""
+        slot = (key & self._mask) * 2
+        entry = self._entries[slot]
+        if entry is None or self._keys[slot] == key or entry[0] <= depth:
+            self._keys[slot] = key
+            self._entries[slot] = (depth, value, flag, move)
+        else:
+            self._keys[slot + 1] = key
+            self._entries[slot + 1] = (depth, value, flag, move)
+
+
+class DistanceCache:
+    """A class to represent a bounded cache of the distance maps of both players, keyed by fence layout. The least
+    recently used layout is dropped once the cache is full. The same layouts come up again and again in a search and
+    across games, so their maps are only searched once. Cached maps are shared and never changed in place. Games in
+    different threads share the cache, so every change to it is made under a lock."""
+    def __init__(self, size=1 << 12):
+        """The constructor for DistanceCache class. Takes the number of layouts kept."""
+        self._size = size
+        self._lock = threading.Lock()
+        self._maps = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get_size(self):
+        """Gets the number of layouts the cache can hold."""
+        return self._size
+
+    def get_hits(self):
+        """Gets the number of successful lookups."""
+        return self._hits
+
+    def get_misses(self):
+        """Gets the number of lookups that found nothing."""
+        return self._misses
+
+    def get_hit_rate(self):
+        """Gets the share of lookups that were successful, 0.0 before the first one."""
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._maps)
+
+    def clear(self):
+        """Removes every layout and resets the counters."""
+        with self._lock:
+            self._maps = OrderedDict()
+            self._hits = 0
+            self._misses = 0
+
+    def lookup(self, key):
+        """Returns the [None, player 1 map, player 2 map] list stored for the given (horizontal, vertical) fence masks,
+        or None."""
+        with self._lock:
+            maps = self._maps.get(key)
+            if maps is None:
+                self._misses += 1
+                return None
+            self._maps.move_to_end(key)
+            self._hits += 1
+            return maps
+
+    def store(self, key, maps):
+        """Stores the distance maps of a fence layout, dropping the least recently used layout if the cache is full."""
+        with self._lock:
+            self._maps[key] = maps
+            self._maps.move_to_end(key)
+            if len(self._maps) > self._size:
+                self._maps.popitem(last=False)
+
+    def get_maps(self, bitboard):
+        """Returns the distance maps of the fence layout of a Bitboard, searching them from the goal rows if they are
+        not cached."""
+        key = (bitboard.get_h_fences(), bitboard.get_v_fences())
+        maps = self.lookup(key)
+        if maps is None:
+            maps = [None, bitboard.goal_distances(1), bitboard.goal_distances(2)]
+            self.store(key, maps)
+        return maps
+
+
+# distance maps shared by every game of the process
+DISTANCE_CACHE = DistanceCache()
+
+
+def mask_coordinates(mask):
+    """Returns the coordinate tuple (y, x) of every square of a mask, lowest square first."""
+    coordinates = []
+    while mask:
+        lowest = mask & -mask
+        (x_coord, y_coord) = divmod(square_of_mask(lowest), BOARD_SIZE)
+        coordinates.append((y_coord, x_coord))
+        mask ^= lowest
+    return coordinates
+
+
+class GameSnapshot:
+    """A class to represent the position of a game after one of its actions, which never changes afterwards. A game
+    publishes a new one after every action, so readers in other threads or tasks take game.snapshot() without a lock.
+    The whole position is a handful of integers shared with the game, so publishing builds no board; it is only drawn
+    when a reader asks for it."""
+    __slots__ = ("_version", "_pawns", "_h_fences", "_v_fences", "_fences_left", "_turn", "_state", "_board")
+
+    def __init__(self, version, pawns, h_fences, v_fences, fences_left, turn, state):
+        """The constructor for GameSnapshot class. Takes the number of the snapshot in its game, the (player 1,
+        player 2) pawn squares, the fence masks, the (player 1, player 2) fences left, the turn and the state."""
+        self._version = version
+        self._pawns = pawns
+        self._h_fences = h_fences
+        self._v_fences = v_fences
+        self._fences_left = fences_left
+        self._turn = turn
+        self._state = state
+        # drawn on the first get_board call
+        self._board = None
+
+    def get_version(self):
+        """Gets the number of the snapshot, counting the ones its game published before."""
+        return self._version
+
+    def get_pawn_position(self, player_number):
+        """Gets the (x, y) position of the given player's pawn on _board."""
+        return divmod(self._pawns[player_number - 1], BOARD_SIZE)
+
+    def get_fences(self, direction):
+        """Gets the coordinate tuple of every fence of the given direction, borders left out."""
+        if direction == "h":
+            return mask_coordinates(self._h_fences & ~H_BORDER & FULL_MASK)
+        return mask_coordinates(self._v_fences & ~V_BORDER)
+
+    def get_fences_left(self, player_number):
+        """Gets the number of fences the given player could still place."""
+        return self._fences_left[player_number - 1]
+
+    def get_turn(self):
+        """Gets the number of the player whose turn it was."""
+        return self._turn
+
+    def get_current_state(self):
+        """Gets the state of the game: "UNFINISHED", "Player_1 won" or "Player_2 won"."""
+        return self._state
+
+    def get_board(self):
+        """Gets the board in the _board layout of QuoridorGame, as nested tuples so it can not be changed."""
+        board = self._board
+        if board is None:
+            bitboard = Bitboard()
+            bitboard.set_pawn(1, 1 << self._pawns[0])
+            bitboard.set_pawn(2, 1 << self._pawns[1])
+            for direction in ("h", "v"):
+                for (y_coord, x_coord) in self.get_fences(direction):
+                    bitboard.set_fence(direction, square_of(x_coord, y_coord))
+            board = tuple(freeze_row(row) for row in bitboard.to_board())
+            self._board = board
+        return board
+
+    def diff(self, older):
+        """Returns what changed since an older snapshot of the same game, for sending only the changes: versions,
+        pawns moved with their new coordinate tuple, fences added and removed as (direction, coordinate_tuple), fences
+        left of the players whose count changed, turn and state."""
+        pawns = {}
+        fences_left = {}
+        for player_number in (1, 2):
+            if self._pawns[player_number - 1] != older._pawns[player_number - 1]:
+                (x_coord, y_coord) = self.get_pawn_position(player_number)
+                pawns[player_number] = (y_coord, x_coord)
+            if self._fences_left[player_number - 1] != older._fences_left[player_number - 1]:
+                fences_left[player_number] = self._fences_left[player_number - 1]
+        added = []
+        removed = []
+        for (direction, fences, older_fences) in (("h", self._h_fences, older._h_fences),
+                                                   ("v", self._v_fences, older._v_fences)):
+            added += [(direction, coordinate_tuple) for coordinate_tuple in mask_coordinates(fences & ~older_fences)]
+            removed += [(direction, coordinate_tuple) for coordinate_tuple in mask_coordinates(older_fences & ~fences)]
+        return {"version": self._version, "since": older._version, "pawns": pawns, "fences_added": added,
+                "fences_removed": removed, "fences_left": fences_left, "turn": self._turn, "state": self._state}
+
+
+# snapshot of every new game
+START_SNAPSHOT = GameSnapshot(0, (START_SQUARES[1], START_SQUARES[2]), H_BORDER, V_BORDER,
+                              (Fence.FENCES_PER_PLAYER, Fence.FENCES_PER_PLAYER), 1, "UNFINISHED")
+
+# Zobrist hash of every new game
+START_HASH = PAWN_KEYS[1][START_SQUARES[1]] ^ PAWN_KEYS[2][START_SQUARES[2]] ^ \
+    FENCE_COUNT_KEYS[1][Fence.FENCES_PER_PLAYER] ^ FENCE_COUNT_KEYS[2][Fence.FENCES_PER_PLAYER]
+
+# rows of _board at the start of a game, shared by every game until it replaces them. Tuples, so they can not be
+# changed through _board
+START_BOARD = tuple(freeze_row(row) for row in Bitboard().to_board())
+# distance maps at the start of a game, shared the same way. Distance maps are replaced, never changed in place
+START_DISTANCES = [None, Bitboard().goal_distances(1), Bitboard().goal_distances(2)]
+
+
 class QuoridorGame:
     """QuoridorGame class to represent Quoridor game, played by two players. Player 1 always starts first.
     Returns True if is a valid move, or a valid fence placement or if one of the player wins. Uses Fence class for fence
-    to use those data members."""
+    to use those data members.
+    A new game takes about 700 bytes, as it shares the rows of START_BOARD and START_DISTANCES until it changes them."""
+    __slots__ = ("_bitboard", "_rows", "_turn", "_current_state", "_num_fence_p1", "_num_fence_p2",
+                 "_pawn_positions", "_distances", "_hash", "_history", "_snapshot")
+    _h_fence = Fence.FENCE_HORIZONTAL
+    _v_fence = Fence.FENCE_VERTICAL
+
     def __init__(self):
-        """Constructor for QuoridorGame  class. Initializes the board with the fences and pawns (P1 and P2) placed in correct positions. """
-        self._board = [
-            [["|", "", "X"], ["-", "", "X"], ["-", "", "X"], ["-", "", "X"], ["-", "", "P1"], ["-", "", "X"],
-             ["-", "", "X"],
-             ["-", "", "X"], ["-", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["|", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "X"], ["", "", "P2"], ["", "", "X"], ["", "", "X"],
-             ["", "", "X"], ["", "", "X"], ["||"]],
-            [["-", "", ""], ["-", "", ""], ["-", "", ""], ["-", "", ""], ["-", "", ""], ["-", "", ""], ["-", "", ""],
-             ["-", "", ""], ["-", "", ""]]]
-        self._fence = Fence()
+        """Constructor for QuoridorGame  class. Initializes the board with the fences and pawns (P1 and P2) placed in correct
+        positions. The rules run on the Bitboard, _board is kept in the same layout for display and older callers."""
+        self._bitboard = Bitboard()
+        # rows of _board. None until get_board is called in a game made by from_bytes
+        self._rows = list(START_BOARD)
         self._turn = 1
         self._current_state = "UNFINISHED"
-        self._num_fence_p1 = self._fence.get_fences_p1()
-        self._num_fence_p2 = self._fence.get_fences_p2()
-        self._v_fence = self._fence.get_fence_vertical()
-        self._h_fence = self._fence.get_fence_horizontal()
+        self._num_fence_p1 = Fence.FENCES_PER_PLAYER
+        self._num_fence_p2 = Fence.FENCES_PER_PLAYER
+        # (x, y) position of each pawn on _board indexed by player number, updated on every move
+        self._pawn_positions = [None, divmod(START_SQUARES[1], BOARD_SIZE), divmod(START_SQUARES[2], BOARD_SIZE)]
+        # distance from every square to each player's goal row indexed by player number, repaired after every fence.
+        # None until get_distances is called in a game made by from_bytes
+        self._distances = START_DISTANCES
+        # Zobrist hash of the position, updated on every change
+        self._hash = START_HASH
+        # undo records of the actions made with push_move, push_fence and push_null
+        self._history = []
+        # GameSnapshot of the last action, replaced (never changed) by publish_snapshot
+        self._snapshot = START_SNAPSHOT
+
+    def get_bitboard(self):
+        """Gets the Bitboard holding pawn positions and fences of the game."""
+        return self._bitboard
+
+    def get_turn(self):
+        """Gets the number of the player whose turn it is."""
+        return self._turn
+
+    def get_current_state(self):
+        """Gets the state of the game: "UNFINISHED", "Player_1 won" or "Player_2 won"."""
+        return self._current_state
+
+    def get_hash(self):
+        """Gets the 64 bit Zobrist hash of the position: pawns, fences, fences left and turn."""
+        return self._hash
+
+    def compute_hash(self):
+        """Computes the Zobrist hash of the position from scratch."""
+        key = PAWN_KEYS[1][square_of_mask(self._bitboard.get_pawn(1))]
+        key ^= PAWN_KEYS[2][square_of_mask(self._bitboard.get_pawn(2))]
+        for (fences, borders, keys) in ((self._bitboard.get_h_fences(), H_BORDER, H_FENCE_KEYS),
+                                        (self._bitboard.get_v_fences(), V_BORDER, V_FENCE_KEYS)):
+            mask = fences & ~borders
+            while mask:
+                lowest = mask & -mask
+                key ^= keys[square_of_mask(lowest)]
+                mask ^= lowest
+        key ^= FENCE_COUNT_KEYS[1][self._num_fence_p1] ^ FENCE_COUNT_KEYS[2][self._num_fence_p2]
+        if self._turn == 2:
+            key ^= TURN_KEY
+        return key
+
+    def snapshot(self):
+        """Gets the GameSnapshot published after the last action. Safe to call from other threads without a lock."""
+        return self._snapshot
+
+    def publish_snapshot(self):
+        """Replaces the published GameSnapshot with one of the current position. Called after every action made with
+        move_pawn or place_fence; push_move, push_fence, push_null and pop do not publish, a search making and taking
+        back actions on its own copy of a game has no readers."""
+        version = self._snapshot.get_version() + 1
+        pawns = (square_of(*self._pawn_positions[1]), square_of(*self._pawn_positions[2]))
+        self._snapshot = GameSnapshot(version, pawns, self._bitboard.get_h_fences(), self._bitboard.get_v_fences(),
+                                      (self._num_fence_p1, self._num_fence_p2), self._turn, self._current_state)
+        return True
+
+    def get_pawn_position(self, player_number):
+        """Gets the (x, y) position of the given player's pawn on _board without scanning the board."""
+        return self._pawn_positions[player_number]
+
+    def get_distances(self):
+        """Gets the [None, player 1 map, player 2 map] distance maps, taken from DISTANCE_CACHE (or searched) the first
+        time they are needed in a game made by from_bytes."""
+        distances = self._distances
+        if distances is None:
+            distances = DISTANCE_CACHE.get_maps(self._bitboard)
+            self._distances = distances
+        return distances
+
+    def get_distance_map(self, player_number):
+        """Gets the list of distances from every square to the given player's goal row."""
+        return self.get_distances()[player_number]
+
+    def get_goal_distance(self, player_number):
+        """Gets the number of steps the given player's pawn needs to reach its goal row, fences considered."""
+        (x_coord, y_coord) = self._pawn_positions[player_number]
+        return self.get_distances()[player_number][square_of(x_coord, y_coord)]
+
+    def refresh_distances(self):
+        """Gets both distance maps again for the current fences, from DISTANCE_CACHE or searched from scratch. Needed
+        after fences were placed with update_fence alone."""
+        self._distances = DISTANCE_CACHE.get_maps(self._bitboard)
+
+    def validate_fence_path(self, direction, square):
+        """Checks that a fence at the given slot leaves both pawns a path to their goal rows. Returns the distance maps
+        of both players with the fence if it does, None otherwise. The maps come from DISTANCE_CACHE when the layout was
+        seen before; else they are only searched again when the fence is on a shortest path, and only around it."""
+        if direction == "h":
+            key = (self._bitboard.get_h_fences() | 1 << square, self._bitboard.get_v_fences())
+        else:
+            key = (self._bitboard.get_h_fences(), self._bitboard.get_v_fences() | 1 << square)
+        distances = DISTANCE_CACHE.lookup(key)
+        if distances is None:
+            (first, second) = fence_edge(direction, square)
+            current = self.get_distances()
+            self._bitboard.set_fence(direction, square)
+            distances = [None, self._bitboard.repair_distances(current[1], first, second),
+                         self._bitboard.repair_distances(current[2], first, second)]
+            self._bitboard.remove_fence(direction, square)
+            DISTANCE_CACHE.store(key, distances)
+        for player_number in (1, 2):
+            (x_coord, y_coord) = self._pawn_positions[player_number]
+            if distances[player_number][square_of(x_coord, y_coord)] >= UNREACHABLE:
+                return None
+        return distances
+
+    def legal_moves(self, player_number):
+        """Returns every coordinate tuple the given player can pass to move_pawn right now, straight jumps and diagonal
+        moves included. Returns an empty list if it is not the player's turn or the game is over."""
+        if self._current_state != "UNFINISHED" or not self.same_player_turn(player_number):
+            return []
+        moves = []
+        mask = self._bitboard.pawn_moves(player_number)
+        while mask:
+            lowest = mask & -mask
+            (x_coord, y_coord) = divmod(square_of_mask(lowest), BOARD_SIZE)
+            moves.append((y_coord, x_coord))
+            mask ^= lowest
+        return moves
+
+    def legal_fences(self, player_number):
+        """Returns every (direction, coordinate_tuple) the given player can pass to place_fence right now. Returns an
+        empty list if it is not the player's turn, the game is over or the player has no fence left. A fence can only
+        cut a pawn off when both its ends touch a wall and it blocks the last step a square had towards the goal, so
+        only those fences are searched with validate_fence_path."""
+        if self._current_state != "UNFINISHED" or not self.same_player_turn(player_number) or \
+                not self.has_fences_left(player_number):
+            return []
+        fences = []
+        (_, distances1, distances2) = self.get_distances()
+        for direction in ("h", "v"):
+            mask = self._bitboard.free_fence_slots(direction)
+            while mask:
+                lowest = mask & -mask
+                mask ^= lowest
+                square = square_of_mask(lowest)
+                (first, second) = fence_edge(direction, square)
+                if self._bitboard.touches_walls(direction, square) and \
+                        (self.is_last_step(distances1, first, second) or self.is_last_step(distances2, first, second)):
+                    if self.validate_fence_path(direction, square) is None:
+                        continue
+                (x_coord, y_coord) = divmod(square, BOARD_SIZE)
+                fences.append((direction, (y_coord, x_coord)))
+        return fences
+
+    def is_last_step(self, distances, first, second):
+        """Checks if the step between two neighbouring squares is the only way left for one of them to get closer to
+        the goal of the given distances list."""
+        if distances[first] == distances[second] + 1:
+            return not self._bitboard.keeps_shortest_step(distances, first, second)
+        if distances[second] == distances[first] + 1:
+            return not self._bitboard.keeps_shortest_step(distances, second, first)
+        return False
 
     def same_player_turn(self, player_number):
         """Ensures that same player can’t make more than one valid turn"""
@@ -75,6 +850,7 @@ class QuoridorGame:
             self._turn = 2
         else:
             self._turn = 1
+        self._hash ^= TURN_KEY
         return True
 
     def lock_borders(self, coordinate_tuple):
@@ -86,426 +862,338 @@ class QuoridorGame:
             return False
         return True
 
+    def pawn_move_kind(self, player_number, x_dest, y_dest):
+        """Returns "step", "jump" or "diagonal" if the given player's pawn can move to the given position, None
+        otherwise. Both pawns are checked by the same move tables."""
+        if not self.lock_borders((y_dest, x_dest)):
+            return None
+        bit = 1 << square_of(x_dest, y_dest)
+        (steps, jumps, diagonals) = self._bitboard.pawn_move_masks(player_number)
+        if steps & bit:
+            return "step"
+        if jumps & bit:
+            return "jump"
+        if diagonals & bit:
+            return "diagonal"
+        return None
+
+    def make_pawn_move(self, player_number, kinds, x_dest, y_dest):
+        """Moves the given player's pawn to the given position if it is a move of one of the given kinds. Keeps the
+        Bitboard, _board and the hash in step but does not check or switch turns. Returns True if the pawn moved."""
+        if self.pawn_move_kind(player_number, x_dest, y_dest) not in kinds:
+            return False
+        self.update_pawn(player_number, x_dest, y_dest)
+        return True
+
+    # the per-player helpers below are kept for older callers; they only act for their own player and run the same
+    # rules as move_pawn and place_fence
+
     def validate_move_pawn1(self, player_number, x_dest, y_dest):
         """Checks validity of left, right, forward, backward movement of the pawn1 on board."""
-        current = self._board[x_dest][y_dest]
-        right = self._board[x_dest][y_dest + 1]
-        if player_number == 1:
-            # check validity for right movement
-            if y_dest > 0:
-                if self._board[x_dest][y_dest - 1][2] == "P1" and current[2] == "X" and current[1] != self._v_fence:
-                    return True
-            # check validity for forward movement
-            if x_dest > 0:
-                if self._board[x_dest - 1][y_dest][2] == "P1" and current[2] == "X" and current[0] != self._h_fence:
-                    return True
-            # check validity for backwards movement if x coordinate is equal to zero
-            if x_dest == 0:
-                if self._board[x_dest + 1][y_dest][2] == "P1" and current[2] == "X":
-                    return True
-            # check validity for backwards movement
-            if x_dest < 8:
-                if self._board[x_dest + 1][y_dest][2] == "P1" and current[2] == "X" and current[0] != self._h_fence:
-                    return True
-            # check validity for left movement
-            if y_dest < 8:
-                if self._board[x_dest][y_dest + 1][2] == "P1" and current[2] == "X" and right[1] != self._v_fence:
-                    return True
-        # if it is second player, then return True
-        elif player_number == 2:
-            return True
-        return False
+        return player_number == 1 and self.pawn_move_kind(1, x_dest, y_dest) == "step"
 
     def validate_move_pawn2(self, player_number, x_dest, y_dest):
         """Checks validity of left, right, forward, backward movement of the pawn2 on board."""
-        current = self._board[x_dest][y_dest]
-        right = self._board[x_dest][y_dest + 1]
-        if player_number == 2:
-            # check validity for right movement
-            if y_dest > 0:
-                if self._board[x_dest][y_dest - 1][2] == "P2" and current[2] == "X" and current[1] != self._v_fence:
-                    return True
-            # check validity for left movement
-            if y_dest < 8:
-                if right[2] == "P2" and current[2] == "X" and right[1] != self._v_fence:
-                    return True
-            # check validity for forward movement
-            if x_dest > 0:
-                if self._board[x_dest - 1][y_dest][2] == "P2" and current[2] == "X" and current[0] != self._h_fence:
-                    return True
-            # check validity for backwards movement if x coordinate is equal to zero
-            if x_dest == 0:
-                if self._board[x_dest + 1][y_dest][2] == "P2" and current[2] == "X":
-                    return True
-            # check validity for backwards movement
-            if x_dest < 8:
-                if self._board[x_dest + 1][y_dest][2] == "P2" and current[2] == "X" and current[0] != self._h_fence:
-                    return True
-        # if it is first player, then return True
-        elif player_number == 1:
-            return True
-        return False
+        return player_number == 2 and self.pawn_move_kind(2, x_dest, y_dest) == "step"
 
     def validate_jump_pawn1(self, player_number, x_dest, y_dest):
-        """Validates the pawn1 jumping over pawn2 if both pawns are face to face and there is a fence at the back of pawn2.
-    Checks validity of left, right, forward, backward movement of the pawn1 on board. Also checks for diagonal validity
-    if fences are found at the back of pawn2."""
-        current = self._board[x_dest][y_dest]
-        diagonal_left = self._board[x_dest + 1][y_dest + 1]
-        diagonal_right = self._board[x_dest + 1][y_dest - 1]
-        right = self._board[x_dest][y_dest + 1]
-        forward = self._board[x_dest + 1][y_dest]
-        left = self._board[x_dest][y_dest - 1]
-        if player_number == 1:
-            # check for forward jump validity
-            if x_dest >= 2:
-                if self._board[x_dest - 2][y_dest][2] == "P1" and left[2] == "P2" and current[0] != self._h_fence:
-                    return True
-            # check for backwards jump validity
-            if x_dest < 7:
-                if self._board[x_dest + 2][y_dest][2] == "P1" and forward[2] == "P2" and forward[0] != self._h_fence:
-                    return True
-            # check diagonal validity if fence at back and moving forward
-            if x_dest > 0 and y_dest < 8:
-                # checking diagonal left
-                if self._board[x_dest - 1][y_dest + 1][2] == "P1" and right[2] == "P2" and diagonal_left[0] == \
-                        self._h_fence and right[1] != self._v_fence and current[0] != self._h_fence:
-                    return True
-            if x_dest > 0 and y_dest > 0:
-                # checking diagonal right
-                if self._board[x_dest - 1][y_dest - 1][2] == "P1" and left[2] == "P2" and diagonal_right[0] == \
-                        self._h_fence and current[1] != self._v_fence and current[0] != self._h_fence:
-                    return True
-            # check diagonal validity if fence at back and moving backwards
-            if x_dest < 8 and y_dest < 8:
-                # checking diagonal left
-                if diagonal_left[2] == "P1" and right[2] == "P2" and right[0] == self._h_fence and forward[0] \
-                        != self._h_fence and right[1] != self._v_fence:
-                    return True
-            if x_dest < 8 and y_dest > 0:
-                # checking diagonal right
-                if diagonal_right[2] == "P1" and left[2] == "P2" and left[0] == self._h_fence and forward[0] \
-                        != self._h_fence and current[1] != self._v_fence:
-                    return True
-        return False
+        """Validates the pawn1 jumping over pawn2 if both pawns are face to face, or moving diagonally if there is a
+        fence at the back of pawn2."""
+        return player_number == 1 and self.pawn_move_kind(1, x_dest, y_dest) in ("jump", "diagonal")
 
     def validate_jump_pawn2(self, player_number, x_dest, y_dest):
-        """Validates the pawn2 jumping over pawn1 if both pawns are face to face and there is a fence at the back of pawn1.
-       Checks validity of left, right, forward, backward movement
-        of the pawn2 on board. Also checks for diagonal validity if fences are found at the back of pawn1."""
-        current = self._board[x_dest][y_dest]
-        diagonal_left = self._board[x_dest + 1][y_dest + 1]
-        diagonal_right = self._board[x_dest + 1][y_dest - 1]
-        right = self._board[x_dest][y_dest + 1]
-        forward = self._board[x_dest + 1][y_dest]
-        left = self._board[x_dest][y_dest - 1]
-        if player_number == 2:
-            # check for forward jump validity
-            if 2 <= x_dest < 8:
-                if self._board[x_dest - 2][y_dest][2] == "P2" and self._board[x_dest - 1][y_dest][2] == "P1" and \
-                        current[0] != self._h_fence:
-                    return True
-            # check for backwards jump validity
-            if x_dest < 7:
-                if self._board[x_dest + 2][y_dest][2] == "P2" and forward[2] == "P1" and forward[0] != self._h_fence:
-                    return True
-            # check diagonal validity if fence at back and moving forward
-            if x_dest > 0 and y_dest < 8:
-                # checking diagonal left
-                if self._board[x_dest - 1][y_dest + 1][2] == "P2" and right[2] == "P1" and diagonal_left[0] == \
-                        self._h_fence and right[1] != self._v_fence and current[0] != self._h_fence:
-                    return True
-            if x_dest > 0 and y_dest > 0:
-                # checking diagonal right
-                if self._board[x_dest - 1][y_dest - 1][2] == "P2" and left[2] == "P1" and diagonal_right[0] == \
-                        self._h_fence and current[1] != self._v_fence and current[0] != self._h_fence:
-                    return True
-            # check diagonal validity if fence at back and moving backwards
-            if x_dest < 8 and y_dest < 8:
-                # checking diagonal left
-                if diagonal_left[2] == "P2" and right[2] == "P1" and right[0] == self._h_fence and forward[0] != \
-                        self._h_fence and right[1] != self._v_fence:
-                    return True
-            if x_dest < 8 and y_dest > 0:
-                # checking diagonal right
-                if diagonal_right[2] == "P2" and left[2] == "P1" and left[0] == self._h_fence and forward[0] != \
-                        self._h_fence and current[1] != self._v_fence:
-                    return True
-        return False
+        """Validates the pawn2 jumping over pawn1 if both pawns are face to face, or moving diagonally if there is a
+        fence at the back of pawn1."""
+        return player_number == 2 and self.pawn_move_kind(2, x_dest, y_dest) in ("jump", "diagonal")
 
     def jump_move_pawn1(self, player_number, x_dest, y_dest):
-        """Actual move occurs here for pawn1 jumping over pawn2 if pawn1 and pawn2 are face to face and there is no fence
-        at the back of pawn2. Jumps right, left, forward, backwards as per the requirements."""
-        current = self._board[x_dest][y_dest]
-        if player_number == 1:
-            # if jumping forward, makes the move if it meets the criteria
-            if x_dest > 1:
-                if self._board[x_dest - 2][y_dest][2] == "P1" and self._board[x_dest - 1][y_dest][2] == "P2" and \
-                        current[0] != self._h_fence:
-                    current[2] = "P1"
-                    self._board[x_dest - 2][y_dest][2] = "X"
-            # if jumping backwards, makes the move if it meets the criteria
-            if x_dest < 7:
-                if self._board[x_dest + 2][y_dest][2] == "P1" and self._board[x_dest + 1][y_dest][2] == "P2" and \
-                        self._board[x_dest + 1][y_dest][0] != self._h_fence:
-                    current[2] = "P1"
-                    self._board[x_dest + 2][y_dest][2] = "X"
-        # if it is second player, then return True
-        elif player_number == 2:
-            return True
-        return True
+        """Jumps pawn1 over pawn2 if they are face to face and there is no fence at the back of pawn2."""
+        return player_number == 1 and self.make_pawn_move(1, ("jump",), x_dest, y_dest)
 
     def jump_move_pawn2(self, player_number, x_dest, y_dest):
-        """Actual move occurs here for pawn2 jumping over pawn2 if pawn2 and pawn1 are face to face and there is no fence
-        at the back of pawn1. Jumps right, left, forward, backwards as per the requirements"""
-        current = self._board[x_dest][y_dest]
-        if player_number == 2:
-            # if jumping forward, makes the move if it meets the criteria
-            if x_dest > 1:
-                if self._board[x_dest - 2][y_dest][2] == "P2" and self._board[x_dest - 1][y_dest][2] == "P1" and \
-                        current[0] != self._h_fence:
-                    current[2] = "P2"
-                    self._board[x_dest - 2][y_dest][2] = "X"
-            # if jumping backwards, makes the move if it meets the criteria
-            if x_dest < 7:
-                if self._board[x_dest + 2][y_dest][2] == "P2" and self._board[x_dest + 1][y_dest][2] == "P1" and \
-                        self._board[x_dest + 1][y_dest][0] != self._h_fence:
-                    current[2] = "P2"
-                    self._board[x_dest + 2][y_dest][2] = "X"
-        # if it is first player, then return True
-        elif player_number == 1:
-            return True
-        return True
+        """Jumps pawn2 over pawn1 if they are face to face and there is no fence at the back of pawn1."""
+        return player_number == 2 and self.make_pawn_move(2, ("jump",), x_dest, y_dest)
 
     def move_diagonal_pawn1(self, player_number, x_dest, y_dest):
-        """Pawn1 is moved diagonally if there is a fence at the back of pawn2.
-       Moves diagonal right and left for both forward and backward jumps as per user input."""
-        if player_number == 1 and 0 < x_dest < 8 and 8 > y_dest > 0:
-            current = self._board[x_dest][y_dest]
-            diagonal_right = self._board[x_dest + 1][y_dest + 1]
-            diagonal_up_left = self._board[x_dest - 1][y_dest - 1]
-            right = self._board[x_dest][y_dest + 1]
-            left = self._board[x_dest][y_dest - 1]
-            # move diagonal left - for forward jumping
-            if self._board[x_dest - 1][y_dest + 1][2] == "P1" and right[2] == "P2" and diagonal_right[0] == self._h_fence:
-                self._board[x_dest - 1][y_dest + 1][2] = "X"
-                current[2] = "P1"
-            # move diagonal right - for forward jumping
-            if diagonal_up_left[2] == "P1" and left[2] == "P2" and self._board[x_dest + 1][y_dest - 1][0] == self._h_fence:
-                diagonal_up_left[2] = "X"
-                current[2] = "P1"
-            # move diagonal left - for backward jumping
-            if diagonal_right[2] == "P1" and right[2] == "P2" and right[0] == self._h_fence:
-                diagonal_right[2] = "X"
-                current[2] = "P1"
-            # move diagonal right - for backward jumping
-            if self._board[x_dest + 1][y_dest - 1][2] == "P2" and left[2] == "P2" and left[0] == self._h_fence:
-                self._board[x_dest + 1][y_dest - 1][2] = "X"
-                current[2] = "P1"
+        """Moves pawn1 diagonally if there is a fence at the back of pawn2."""
+        return player_number == 1 and self.make_pawn_move(1, ("diagonal",), x_dest, y_dest)
 
     def move_diagonal_pawn2(self, player_number, x_dest, y_dest):
-        """Pawn2 is moved diagonally if there is a fence at the back of pawn1.
-       Moves diagonal right and left for both forward and backward jumps as per user input"""
-        if player_number == 2 and 0 < x_dest < 8 and 8 > y_dest > 0:
-            current = self._board[x_dest][y_dest]
-            diagonal_right = self._board[x_dest + 1][y_dest + 1]
-            diagonal_left = self._board[x_dest - 1][y_dest - 1]
-            right = self._board[x_dest][y_dest + 1]
-            left = self._board[x_dest][y_dest - 1]
-            # move diagonal left - for forward jumping
-            if self._board[x_dest - 1][y_dest + 1][2] == "P2" and right[2] == "P1" and diagonal_right[0] == self._h_fence:
-                    self._board[x_dest - 1][y_dest + 1][2] = "X"
-                    current[2] = "P2"
-            # move diagonal right - for forward jumping
-            if diagonal_left[2] == "P2" and left[2] == "P1" and self._board[x_dest + 1][y_dest - 1][0] == self._h_fence:
-                self._board[x_dest - 1][y_dest - 1][2] = "X"
-                current[2] = "P2"
-            # move diagonal left - for backward jumping
-            if diagonal_right[2] == "P2" and right[2] == "P1" and right[0] == self._h_fence:
-                diagonal_right[2] = "X"
-                current[2] = "P2"
-            # move diagonal right - for backward jumping
-            if self._board[x_dest + 1][y_dest - 1][2] == "P2" and left[2] == "P1" and left[0] == self._h_fence:
-                self._board[x_dest + 1][y_dest - 1][2] = "X"
-                current[2] = "P2"
+        """Moves pawn2 diagonally if there is a fence at the back of pawn1."""
+        return player_number == 2 and self.make_pawn_move(2, ("diagonal",), x_dest, y_dest)
 
     def move_pawn_1(self, player_number, x_dest, y_dest):
         """Moves pawn1 according to given coordinates. Pawn can be moved to right, left, forward, backwards"""
-        current = self._board[x_dest][y_dest]
-        if player_number == 1:
-            # checking and moving to right side
-            if y_dest > 0:
-                if self._board[x_dest][y_dest - 1][2] == "P1" and current[1] != self._v_fence:
-                    self._board[x_dest][y_dest - 1][2] = "X"
-                    current[2] = "P1"
-            # checking and moving forward
-            if x_dest > 0:
-                if self._board[x_dest - 1][y_dest][2] == "P1" and current[0] != self._h_fence:
-                    self._board[x_dest - 1][y_dest][2] = "X"
-                    current[2] = "P1"
-            if x_dest == 0:
-                if self._board[x_dest + 1][y_dest][2] == "P1" and current[2] == "X":
-                    self._board[x_dest + 1][y_dest][2] = "X"
-                    current[2] = "P1"
-            # checking and moving to left side
-            if y_dest < 8:
-                if self._board[x_dest][y_dest + 1][2] == "P1" and current[1] != self._v_fence:
-                    self._board[x_dest][y_dest + 1][2] = "X"
-                    current[2] = "P1"
-            # checking and moving backwards
-            if x_dest < 8:
-                if self._board[x_dest + 1][y_dest][2] == "P1" and current[0] != self._h_fence:
-                    self._board[x_dest + 1][y_dest][2] = "X"
-                    current[2] = "P1"
+        return player_number == 1 and self.make_pawn_move(1, ("step",), x_dest, y_dest)
 
     def move_pawn_2(self, player_number, x_dest, y_dest):
         """Moves pawn2 according to given coordinates. Pawn can be moved to right, left, forward, backwards"""
-        current = self._board[x_dest][y_dest]
-        if player_number == 2:
-            # checking and moving to right side
-            if y_dest > 0:
-                if self._board[x_dest][y_dest - 1][2] == "P2" and current[1] != self._v_fence:
-                    self._board[x_dest][y_dest - 1][2] = "X"
-                    current[2] = "P2"
-            # checking and moving to left side
-            if y_dest < 8:
-                if self._board[x_dest][y_dest + 1][2] == "P2" and current[1] != self._v_fence:
-                    self._board[x_dest][y_dest + 1][2] = "X"
-                    current[2] = "P2"
-            # checking and moving forward
-            if x_dest > 0:
-                if self._board[x_dest - 1][y_dest][2] == "P2" and current[0] != self._h_fence:
-                    self._board[x_dest - 1][y_dest][2] = "X"
-                    current[2] = "P2"
-            if x_dest == 0:
-                if self._board[x_dest + 1][y_dest][2] == "P2" and current[2] == "X":
-                    self._board[x_dest + 1][y_dest][2] = "X"
-                    current[2] = "P2"
-            # checking and moving backwards
-            if x_dest < 8:
-                if self._board[x_dest + 1][y_dest][2] == "P2" and current[0] != self._h_fence:
-                    self._board[x_dest + 1][y_dest][2] = "X"
-                    current[2] = "P2"
-            if y_dest == 8:
-                # move right
-                if self._board[x_dest][y_dest - 2][2] == "P1" and self._board[x_dest][y_dest - 1][2] == "P2" and \
-                        current[0] != self._h_fence:
-                    current[2] = "P1"
-                    self._board[x_dest][y_dest - 2][2] = "X"
+        return player_number == 2 and self.make_pawn_move(2, ("step",), x_dest, y_dest)
 
     def place_fence_player1(self, player_number, direction, x_dest, y_dest):
         """Places fence for player1 depending on the direction of the fence. Subtracts 1 every time a fence is placed."""
-        current = self._board[x_dest][y_dest]
-        if player_number == 1:
-            # checks if it is horizontal fence, if yes places a fence and subtracts one from total fences for player 1
-            if direction == "h" and current[0] != self._h_fence:
-                current[0] = self._h_fence
-                self._num_fence_p1 -= 1
-                return True
-            # checks if number of fences is 0, if yes, returns False
-            if self._num_fence_p2 < 1:
-                return False
-            # checks if it is vertical fence, if yes places a fence and subtracts one from total fences for player 1
-            elif direction == "v" and current[1] != self._v_fence:
-                current[1] = self._v_fence
-                self._num_fence_p1 -= 1
-                return True
-            # checks if number of fences is 0, if yes, returns False
-            if self._num_fence_p1 < 1:
-                return False
-        elif player_number == 2:
-            return True
-        return False
+        return player_number == 1 and self.lock_borders((y_dest, x_dest)) and \
+            self.make_fence(1, direction, x_dest, y_dest)
 
     def place_fence_player2(self, player_number, direction, x_dest, y_dest):
         """Places fence for player2 depending on the direction of the fence. Subtracts 1 every time a fence is placed."""
-        current = self._board[x_dest][y_dest]
-        if player_number == 2:
-            # checks if it is horizontal fence, if yes places a fence and subtracts one from total fences for player 2
-            if direction == "h" and player_number == 2 and current[0] != self._h_fence:
-                current[0] = self._h_fence
-                self._num_fence_p2 -= 1
-                return True
-            # checks if number of fences is 0, if yes, returns False
-            if self._num_fence_p2 < 1:
-                return False
-            # checks if it is vertical fence, if yes places a fence and subtracts one from total fences for player 2
-            elif direction == "v" and player_number == 2 and current[1] != self._v_fence:
-                current[1] = self._v_fence
-                self._num_fence_p2 -= 1
-                return True
-            # checks if number of fences is 0, if yes, returns False
-            if self._num_fence_p2 < 1:
-                return False
-        elif player_number == 1:
-            return True
-        return False
+        return player_number == 2 and self.lock_borders((y_dest, x_dest)) and \
+            self.make_fence(2, direction, x_dest, y_dest)
+
+    @property
+    def _board(self):
+        """The board in its original nested list layout, the same as get_board. Kept for older callers reading it."""
+        return self.get_board()
+
+    def get_board(self):
+        """Gets _board, drawn from the Bitboard the first time it is needed in a game made by from_bytes. Rows and cells
+        are tuples, so writing to them raises TypeError instead of leaving the Bitboard behind. Rows that do not differ
+        from the starting board stay shared with it."""
+        board = self._rows
+        if board is None:
+            bitboard = self._bitboard
+            changed = (bitboard.get_h_fences() ^ H_BORDER) | (bitboard.get_v_fences() ^ V_BORDER) | \
+                (bitboard.get_pawn(1) ^ 1 << START_SQUARES[1]) | (bitboard.get_pawn(2) ^ 1 << START_SQUARES[2])
+            board = list(START_BOARD)
+            for x_coord in range(BOARD_SIZE):
+                if changed & ROW_MASKS[x_coord]:
+                    board[x_coord] = freeze_row(bitboard.to_board_row(x_coord))
+            self._rows = board
+        return board
+
+    def set_cell(self, x_dest, y_dest, index, value):
+        """Changes one slot of a _board cell by replacing its row with a new tuple, so rows shared with the starting
+        board or with other games are never written to."""
+        board = self._rows
+        if board is None:
+            board = self.get_board()
+        row = board[x_dest]
+        cell = row[y_dest]
+        cell = cell[:index] + (value,) + cell[index + 1:]
+        board[x_dest] = row[:y_dest] + (cell,) + row[y_dest + 1:]
+
+    def update_pawn(self, player_number, x_dest, y_dest):
+        """Moves the pawn of the given player to the given position on the Bitboard, on _board and in the pawn index."""
+        (x_from, y_from) = self._pawn_positions[player_number]
+        self._bitboard.set_pawn(player_number, 1 << square_of(x_dest, y_dest))
+        self._hash ^= PAWN_KEYS[player_number][square_of(x_from, y_from)] ^ \
+            PAWN_KEYS[player_number][square_of(x_dest, y_dest)]
+        self.set_cell(x_from, y_from, 2, "X")
+        self.set_cell(x_dest, y_dest, 2, PAWN_GLYPHS[player_number])
+        self._pawn_positions[player_number] = (x_dest, y_dest)
+
+    def update_fence(self, direction, x_dest, y_dest):
+        """Places a fence on the Bitboard and on _board."""
+        self._bitboard.set_fence(direction, square_of(x_dest, y_dest))
+        if direction == "h":
+            self.set_cell(x_dest, y_dest, 0, self._h_fence)
+            self._hash ^= H_FENCE_KEYS[square_of(x_dest, y_dest)]
+        else:
+            self.set_cell(x_dest, y_dest, 1, self._v_fence)
+            self._hash ^= V_FENCE_KEYS[square_of(x_dest, y_dest)]
+
+    def clear_fence(self, direction, x_dest, y_dest):
+        """Takes a fence away from the Bitboard and from _board."""
+        self._bitboard.remove_fence(direction, square_of(x_dest, y_dest))
+        if direction == "h":
+            # the first column shows the left border in the horizontal slot
+            if y_dest == 0:
+                self.set_cell(x_dest, y_dest, 0, self._v_fence)
+            else:
+                self.set_cell(x_dest, y_dest, 0, "")
+            self._hash ^= H_FENCE_KEYS[square_of(x_dest, y_dest)]
+        else:
+            self.set_cell(x_dest, y_dest, 1, "")
+            self._hash ^= V_FENCE_KEYS[square_of(x_dest, y_dest)]
+
+    def update_fences_left(self, player_number, fences_left):
+        """Sets the number of fences the given player can still place."""
+        self._hash ^= FENCE_COUNT_KEYS[player_number][self.get_fences_left(player_number)] ^ \
+            FENCE_COUNT_KEYS[player_number][fences_left]
+        if player_number == 1:
+            self._num_fence_p1 = fences_left
+        else:
+            self._num_fence_p2 = fences_left
+
+    def get_fences_left(self, player_number):
+        """Gets the number of fences the given player can still place."""
+        if player_number == 1:
+            return self._num_fence_p1
+        return self._num_fence_p2
+
+    def game_in_progress(self):
+        """Checks that nobody has won yet, no move or fence is accepted after that."""
+        return self._current_state == "UNFINISHED"
+
+    def validate_pawn_move(self, player_number, x_dest, y_dest):
+        """Checks that the destination is one of the squares the pawn can step, jump or move diagonally to."""
+        return self._bitboard.pawn_moves(player_number) >> square_of(x_dest, y_dest) & 1 == 1
+
+    def has_fences_left(self, player_number):
+        """Checks that the given player has a fence left to place."""
+        return self.get_fences_left(player_number) > 0
+
+    def validate_fence_slot(self, direction, x_dest, y_dest):
+        """Checks that the direction is "h" or "v" and that the slot does not already hold a fence (or border)."""
+        return self._bitboard.is_fence_free(direction, square_of(x_dest, y_dest))
 
     def move_pawn(self, player_number, coordinate_tuple):
         """Takes into account all the game rules of making a valid move and preventing an invalid one and returns True or
       False based on that."""
+        if not self.play_pawn_move(player_number, coordinate_tuple):
+            return False
+        self.publish_snapshot()
+        return True
+
+    def play_pawn_move(self, player_number, coordinate_tuple):
+        """Same as move_pawn, without publishing a GameSnapshot."""
         (y_coord, x_coord) = coordinate_tuple
+        if not self.game_in_progress():
+            return False
         if not self.same_player_turn(player_number):
             return False
         if not self.lock_borders(coordinate_tuple):
             return False
-        if not self.validate_move_pawn1(player_number, x_coord, y_coord):
-            if not self.validate_jump_pawn1(player_number, x_coord, y_coord):
-                return False
-        if not self.validate_move_pawn2(player_number, x_coord, y_coord):
-            if not self.validate_jump_pawn2(player_number, x_coord, y_coord):
-                return False
-        if not self.jump_move_pawn1(player_number, x_coord, y_coord):
-            return False
-        if not self.jump_move_pawn2(player_number, x_coord, y_coord):
-            return False
-        self.move_diagonal_pawn1(player_number, x_coord, y_coord)
-        self.move_diagonal_pawn2(player_number, x_coord, y_coord)
-        self.move_pawn_1(player_number, x_coord, y_coord)
-        self.move_pawn_2(player_number, x_coord, y_coord)
-        if not self.switch_turns():
-            return False
-        if self._current_state != "UNFINISHED":
+        if not self.validate_pawn_move(player_number, x_coord, y_coord):
             return False
+        self.update_pawn(player_number, x_coord, y_coord)
+        self.switch_turns()
         self.win_logic(player_number, x_coord, y_coord)
         return True
 
     def place_fence(self, player_number, direction, coordinate_tuple):
         """Takes into account all the game rules of placing a fence, and then returns True or False based on that."""
+        if not self.play_fence(player_number, direction, coordinate_tuple):
+            return False
+        self.publish_snapshot()
+        return True
+
+    def play_fence(self, player_number, direction, coordinate_tuple):
+        """Same as place_fence, without publishing a GameSnapshot."""
         (y_coord, x_coord) = coordinate_tuple
+        if not self.game_in_progress():
+            return False
         if not self.same_player_turn(player_number):
             return False
         if not self.lock_borders(coordinate_tuple):
             return False
-        if not self.place_fence_player1(player_number, direction, x_coord, y_coord):
+        if not self.make_fence(player_number, direction, x_coord, y_coord):
+            return False
+        self.switch_turns()
+        return True
+
+    def make_fence(self, player_number, direction, x_dest, y_dest):
+        """Places a fence of the given player if the player has one left, the slot is free and both pawns keep a path
+        to their goal rows. Does not check or switch turns. Returns True if the fence was placed."""
+        if not self.has_fences_left(player_number):
             return False
-        if not self.place_fence_player2(player_number, direction, x_coord, y_coord):
+        if not self.validate_fence_slot(direction, x_dest, y_dest):
             return False
-        if not self.switch_turns():
+        # a fence can not cut a pawn off from its goal row
+        distances = self.validate_fence_path(direction, square_of(x_dest, y_dest))
+        if distances is None:
+            return False
+        self._distances = distances
+        self.update_fence(direction, x_dest, y_dest)
+        self.update_fences_left(player_number, self.get_fences_left(player_number) - 1)
+        return True
+
+    def push_move(self, player_number, coordinate_tuple):
+        """Same as move_pawn, but a valid move can be taken back with pop. No GameSnapshot is published."""
+        (x_from, y_from) = self._pawn_positions[player_number]
+        state = self._current_state
+        if not self.play_pawn_move(player_number, coordinate_tuple):
             return False
+        self._history.append(("move", player_number, x_from, y_from, state))
+        return True
+
+    def push_fence(self, player_number, direction, coordinate_tuple):
+        """Same as place_fence, but a valid fence can be taken back with pop. No GameSnapshot is published."""
+        distances = self._distances
+        if not self.play_fence(player_number, direction, coordinate_tuple):
+            return False
+        (y_coord, x_coord) = coordinate_tuple
+        self._history.append(("fence", player_number, direction, x_coord, y_coord, distances))
+        return True
+
+    def push_null(self):
+        """Passes the turn to the other player without moving, for null move search. Can be taken back with pop."""
         if self._current_state != "UNFINISHED":
             return False
+        self.switch_turns()
+        self._history.append(("null",))
         return True
 
+    def pop(self):
+        """Takes back the last action made with push_move, push_fence or push_null. Returns False if there is none."""
+        if not self._history:
+            return False
+        record = self._history.pop()
+        if record[0] == "move":
+            (_, player_number, x_from, y_from, state) = record
+            self.update_pawn(player_number, x_from, y_from)
+            self._current_state = state
+        elif record[0] == "fence":
+            (_, player_number, direction, x_coord, y_coord, distances) = record
+            self.clear_fence(direction, x_coord, y_coord)
+            self.update_fences_left(player_number, self.get_fences_left(player_number) + 1)
+            self._distances = distances
+        self.switch_turns()
+        return True
+
+    def to_bytes(self):
+        """Returns the position as GAME_BYTES.size (28) bytes: pawns, fences, fences left, turn and state. The undo
+        history of push_move and push_fence is not kept."""
+        return GAME_BYTES.pack(square_of_mask(self._bitboard.get_pawn(1)), square_of_mask(self._bitboard.get_pawn(2)),
+                               (self._bitboard.get_h_fences() & ~H_BORDER & FULL_MASK).to_bytes(11, "little"),
+                               (self._bitboard.get_v_fences() & ~V_BORDER).to_bytes(11, "little"),
+                               self._num_fence_p1, self._num_fence_p2, self._turn,
+                               GAME_STATES.index(self._current_state))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Returns a new game in the position given by to_bytes. Raises ValueError if data is not such a position."""
+        if len(data) != GAME_BYTES.size:
+            raise ValueError("game data must be %d bytes, got %d" % (GAME_BYTES.size, len(data)))
+        (pawn1, pawn2, h_fences, v_fences, fences_p1, fences_p2, turn, state) = GAME_BYTES.unpack(data)
+        h_fences = int.from_bytes(h_fences, "little")
+        v_fences = int.from_bytes(v_fences, "little")
+        if pawn1 >= 81 or pawn2 >= 81 or pawn1 == pawn2 or h_fences & (H_BORDER | ~FULL_MASK) or \
+                v_fences & (V_BORDER | ~FULL_MASK) or fences_p1 > Fence.FENCES_PER_PLAYER or \
+                fences_p2 > Fence.FENCES_PER_PLAYER or turn not in (1, 2) or state >= len(GAME_STATES):
+            raise ValueError("bad game data")
+        # is_winner reads the pawns, so the state must be the one they give: won by the only pawn on its goal row
+        winners = [player_number for (player_number, pawn) in ((1, pawn1), (2, pawn2))
+                   if 1 << pawn & GOAL_MASKS[player_number]]
+        if len(winners) > 1 or state != sum(winners):
+            raise ValueError("game state does not match the pawns")
+        game = cls()
+        bitboard = game._bitboard
+        bitboard.set_pawn(1, 1 << pawn1)
+        bitboard.set_pawn(2, 1 << pawn2)
+        bitboard.set_fences(h_fences, v_fences)
+        # drawn and searched when first needed, most restored games are never played again
+        game._rows = None
+        game._pawn_positions = [None, divmod(pawn1, BOARD_SIZE), divmod(pawn2, BOARD_SIZE)]
+        game._num_fence_p1 = fences_p1
+        game._num_fence_p2 = fences_p2
+        game._turn = turn
+        game._current_state = GAME_STATES[state]
+        if h_fences or v_fences:
+            game._distances = None
+        game._hash = game.compute_hash()
+        game.publish_snapshot()
+        return game
+
     def win_logic(self, player_number, x_dest, y_dest):
         """Sets out how pawn1 or pawn2 can win. Sets the current game state to whoever wins."""
-        if player_number == 1:
-            for num in range(9):
-                if y_dest == num and x_dest == 8:
-                    self._current_state = "Player_1 won"
-                    return True
-        elif player_number == 2:
-            for num in range(9):
-                if y_dest == num and x_dest == 0:
-                    self._current_state = "Player_2 won"
-                    return True
+        if (1 << square_of(x_dest, y_dest)) & GOAL_MASKS[player_number]:
+            self._current_state = "Player_" + str(player_number) + " won"
+            return True
+        return False
 
     def is_winner(self, player_number):
         """Checks if player 1 or player 2 has won the game."""
-        if player_number == 1:
-            if self._current_state == "Player_1 won":
-                return True
-        if player_number == 2:
-            if self._current_state == "Player_2 won":
-                return True
-        return False
+        if player_number not in GOAL_MASKS:
+            return False
+        return self._bitboard.has_reached_goal(player_number)
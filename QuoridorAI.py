@@ -0,0 +1,296 @@
+import copy
+import time
+
+from Quoridor import BOARD_SIZE, DISTANCE_CACHE, EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable, mask_coordinates, \
+    square_of
+
+# score of a won position, lowered by one per ply so quicker wins are preferred
+WIN_SCORE = 100000
+# weight of one step of shortest path against one fence left in the evaluation
+DISTANCE_WEIGHT = 10
+FENCE_WEIGHT = 1
+# the clock is read about this often during a search, in seconds: the nodes between two readings follow the nodes per
+# second measured so far in the move
+CLOCK_PERIOD = 0.0005
+# the clock is read at least once every this many nodes, and on the first one
+CLOCK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget of the move is used up."""
+    pass
+
+
+def play_action(game, player_number, action):
+    """Makes the given action on the game through the public API. Actions are ("move", coordinate_tuple) or
+    ("fence", direction, coordinate_tuple). Returns True if it was valid."""
+    if action[0] == "move":
+        return game.move_pawn(player_number, action[1])
+    return game.place_fence(player_number, action[1], action[2])
+
+
+def push_action(game, player_number, action):
+    """Makes the given action so it can be taken back with game.pop(). Returns True if it was valid."""
+    if action[0] == "move":
+        return game.push_move(player_number, action[1])
+    return game.push_fence(player_number, action[1], action[2])
+
+
+def evaluate(game, player_number=None):
+    """Scores the position for the given player (the player to move by default): difference of shortest path lengths
+    to the goal rows, then of fences left. The distance maps are the game's own, taken from DISTANCE_CACHE when its
+    fence layout was seen before, so scoring a position costs two list lookups."""
+    if player_number is None:
+        player_number = game.get_turn()
+    other = 3 - player_number
+    distance = game.get_goal_distance(other) - game.get_goal_distance(player_number)
+    fences = game.get_fences_left(player_number) - game.get_fences_left(other)
+    return distance * DISTANCE_WEIGHT + fences * FENCE_WEIGHT
+
+
+def shortest_path(game, player_number):
+    """Returns the squares of one shortest path from the given player's pawn to its goal row, pawn square first."""
+    bitboard = game.get_bitboard()
+    distances = game.get_distance_map(player_number)
+    (x_coord, y_coord) = game.get_pawn_position(player_number)
+    square = square_of(x_coord, y_coord)
+    path = [square]
+    while distances[square] > 0:
+        for near in bitboard.neighbours(square):
+            if distances[near] == distances[square] - 1:
+                square = near
+                break
+        path.append(square)
+    return path
+
+
+def fence_action(first, second):
+    """Returns the fence action blocking the edge between two neighbouring squares."""
+    if first > second:
+        (first, second) = (second, first)
+    (x_coord, y_coord) = divmod(second, BOARD_SIZE)
+    if second - first == BOARD_SIZE:
+        return "fence", "h", (y_coord, x_coord)
+    return "fence", "v", (y_coord, x_coord)
+
+
+class QuoridorAI:
+    """A class to represent a search engine picking moves for a QuoridorGame. Uses alpha-beta search with iterative
+    deepening, a transposition table keyed by the game's Zobrist hash and a hard time budget per move. The position is
+    explored with push_move/push_fence/pop on a private copy of the game. Given a QuoridorTablebase.Tablebase,
+    positions where both players are out of fences are looked up instead of searched."""
+    def __init__(self, time_limit=1.0, max_depth=32, table_size=1 << 18, tablebase=None):
+        """Constructor for QuoridorAI class. Takes the time budget per move in seconds, the deepest iteration to search,
+        the number of transposition table entries and the endgame tablebase, if any."""
+        self._time_limit = time_limit
+        self._max_depth = max_depth
+        self._table = TranspositionTable(table_size)
+        self._tablebase = tablebase
+        self._start = 0.0
+        self._deadline = 0.0
+        # number of nodes searched when the clock is read next
+        self._next_check = 0
+        self._nodes = 0
+        self._depth = 0
+        self._score = 0
+        self._elapsed = 0.0
+
+    def get_report(self):
+        """Gets the statistics of the last choose_move call: depth completed, score, nodes searched, time used and
+        nodes per second, and the hit rate of the process-wide distance map cache."""
+        return {
+            "depth": self._depth,
+            "score": self._score,
+            "nodes": self._nodes,
+            "elapsed": self._elapsed,
+            "nodes_per_second": self._nodes / self._elapsed if self._elapsed else 0.0,
+            "distance_cache_hit_rate": DISTANCE_CACHE.get_hit_rate(),
+        }
+
+    def evaluate(self, game, player_number):
+        """Scores the position for the given player, see the evaluate function."""
+        return evaluate(game, player_number)
+
+    def tablebase_score(self, game, ply):
+        """Returns the exact score of the position for the player to move from the tablebase, or None if it has no
+        answer. Scores follow the search: a win at ply N is worth WIN_SCORE - N."""
+        if self._tablebase is None:
+            return None
+        answer = self._tablebase.probe(game)
+        if answer is None:
+            return None
+        (result, plies) = answer
+        if result == "win":
+            return WIN_SCORE - ply - plies
+        if result == "loss":
+            return ply + plies - WIN_SCORE
+        return 0
+
+    def ordered_actions(self, game, player_number, first=None):
+        """Returns the actions to try for the given player, most promising first: the given action (from the
+        transposition table), pawn moves getting closer to the goal, fences on the opponent's shortest path, then the
+        remaining pawn moves, fences next to that path and every other legal fence."""
+        distances = game.get_distance_map(player_number)
+        moves = []
+        for coordinate_tuple in game.legal_moves(player_number):
+            (y_coord, x_coord) = coordinate_tuple
+            moves.append((distances[square_of(x_coord, y_coord)], ("move", coordinate_tuple)))
+        moves.sort()
+        forward = [action for (_, action) in moves[:1]]
+        backward = [action for (_, action) in moves[1:]]
+        on_path = []
+        near_path = []
+        away = []
+        if game.get_fences_left(player_number) > 0:
+            bitboard = game.get_bitboard()
+            path = shortest_path(game, 3 - player_number)
+            seen = set()
+            for index in range(len(path) - 1):
+                action = fence_action(path[index], path[index + 1])
+                if action not in seen:
+                    seen.add(action)
+                    on_path.append(action)
+            for square in path:
+                for near in bitboard.neighbours(square):
+                    action = fence_action(square, near)
+                    if action not in seen:
+                        seen.add(action)
+                        near_path.append(action)
+            # free slots, a fence cutting a pawn off is refused by push_fence like the ones above
+            for direction in ("h", "v"):
+                for coordinate_tuple in mask_coordinates(bitboard.free_fence_slots(direction)):
+                    action = ("fence", direction, coordinate_tuple)
+                    if action not in seen:
+                        away.append(action)
+        actions = forward + on_path + backward + near_path + away
+        if first is not None and first in actions:
+            actions.remove(first)
+            actions.insert(0, first)
+        return actions
+
+    def check_clock(self):
+        """Raises SearchTimeout once the time budget of the move is used up. Otherwise sets the next reading of the
+        clock CLOCK_PERIOD seconds of search ahead, at the nodes per second measured so far."""
+        now = time.perf_counter()
+        if now > self._deadline:
+            raise SearchTimeout()
+        elapsed = now - self._start
+        interval = int(self._nodes / elapsed * CLOCK_PERIOD) if elapsed > 0 else 1
+        self._next_check = self._nodes + max(1, min(CLOCK_INTERVAL, interval))
+
+    def search(self, game, depth, alpha, beta, ply):
+        """Negamax alpha-beta search. Returns the score of the position for the player to move."""
+        self._nodes += 1
+        if self._nodes >= self._next_check:
+            self.check_clock()
+        player_number = game.get_turn()
+        # the previous move won the game
+        if game.get_current_state() != "UNFINISHED":
+            return ply - WIN_SCORE
+        score = self.tablebase_score(game, ply)
+        if score is not None:
+            return score
+        if depth == 0:
+            return self.evaluate(game, player_number)
+        key = game.get_hash()
+        entry = self._table.lookup(key)
+        table_action = None
+        if entry is not None:
+            (entry_depth, value, flag, table_action) = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND and value >= beta:
+                    return value
+                if flag == UPPER_BOUND and value <= alpha:
+                    return value
+        alpha_start = alpha
+        best = None
+        best_action = None
+        for action in self.ordered_actions(game, player_number, table_action):
+            if not push_action(game, player_number, action):
+                continue
+            score = -self.search(game, depth - 1, -beta, -alpha, ply + 1)
+            game.pop()
+            if best is None or score > best:
+                best = score
+                best_action = action
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+        if best is None:
+            return self.evaluate(game, player_number)
+        if best <= alpha_start:
+            flag = UPPER_BOUND
+        elif best >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._table.store(key, depth, best, flag, best_action)
+        return best
+
+    def choose_move(self, game, player_number):
+        """Returns the best action found for the given player within the time budget, as ("move", coordinate_tuple)
+        or ("fence", direction, coordinate_tuple). When time runs out the best action of the last finished depth is
+        returned, or the current depth's one if its first root action was searched. Returns None if the player can not
+        move."""
+        start = time.perf_counter()
+        self._start = start
+        self._deadline = start + self._time_limit
+        self._next_check = 1
+        self._nodes = 0
+        self._depth = 0
+        self._score = 0
+        if game.get_current_state() != "UNFINISHED" or game.get_turn() != player_number:
+            self._elapsed = 0.0
+            return None
+        # a solved endgame needs no search
+        if self._tablebase is not None and self._tablebase.probe(game) is not None:
+            move = self._tablebase.best_move(game)
+            if move is not None:
+                self._score = self.tablebase_score(game, 0)
+                self._elapsed = time.perf_counter() - start
+                return "move", move
+        board = copy.deepcopy(game)
+        best_action = None
+        for depth in range(1, self._max_depth + 1):
+            depth_action = None
+            depth_score = None
+            alpha = -WIN_SCORE - 1
+            try:
+                # the best action of the previous depth is searched first
+                for action in self.ordered_actions(board, player_number, best_action):
+                    # root actions validate their fence paths before the search below reads the clock
+                    self.check_clock()
+                    if not push_action(board, player_number, action):
+                        continue
+                    score = -self.search(board, depth - 1, -WIN_SCORE - 1, -alpha, 1)
+                    board.pop()
+                    if depth_score is None or score > depth_score:
+                        depth_score = score
+                        depth_action = action
+                    if score > alpha:
+                        alpha = score
+            except SearchTimeout:
+                if depth_action is not None:
+                    best_action = depth_action
+                    self._score = depth_score
+                break
+            if depth_action is None:
+                break
+            best_action = depth_action
+            self._score = depth_score
+            self._depth = depth
+            # a forced win or loss was found, searching deeper will not change it
+            if abs(depth_score) > WIN_SCORE - self._max_depth or time.perf_counter() > self._deadline:
+                break
+        # out of time before a single action was searched, take the first valid one
+        if best_action is None:
+            board = copy.deepcopy(game)
+            for action in self.ordered_actions(board, player_number):
+                if push_action(board, player_number, action):
+                    best_action = action
+                    break
+        self._elapsed = time.perf_counter() - start
+        return best_action
@@ -0,0 +1,239 @@
+import numpy as np
+
+from Quoridor import BOARD_SIZE, START_SQUARES, Fence
+
+# moves of one step as (x, y) changes: down, up, right, left
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# the two directions at the side of each direction, used for diagonal moves
+SIDES = ((2, 3), (2, 3), (0, 1), (0, 1))
+
+
+class BatchQuoridor:
+    """A class to represent many Quoridor games advanced together. Games are stored as NumPy arrays: pawn positions,
+    a horizontal and a vertical fence plane, fences left, turn and state. move_pawns and place_fences apply one action
+    to every selected game in a single call, with the same rules as QuoridorGame.move_pawn and place_fence, and return
+    a boolean array telling which actions were valid."""
+    def __init__(self, size):
+        """Constructor for BatchQuoridor class. Takes the number of games and puts all of them at the start."""
+        self._size = size
+        # (x, y) position of both pawns of every game, x being the row of _board
+        self._pawns = np.zeros((size, 2, 2), dtype=np.int8)
+        # top edge of every square plus the bottom border, and left edge of every square plus the right border
+        self._h_fences = np.zeros((size, BOARD_SIZE + 1, BOARD_SIZE), dtype=bool)
+        self._v_fences = np.zeros((size, BOARD_SIZE, BOARD_SIZE + 1), dtype=bool)
+        self._fences_left = np.zeros((size, 2), dtype=np.int8)
+        self._turn = np.zeros(size, dtype=np.int8)
+        # 0 while the game is unfinished, otherwise the number of the player who won
+        self._state = np.zeros(size, dtype=np.int8)
+        self.reset()
+
+    def reset(self, games=None):
+        """Puts the given games (all of them by default) back at the start."""
+        if games is None:
+            games = np.arange(self._size)
+        for player_index in (0, 1):
+            self._pawns[games, player_index] = divmod(START_SQUARES[player_index + 1], BOARD_SIZE)
+        self._h_fences[games] = False
+        self._h_fences[games, 0, :] = True
+        self._h_fences[games, BOARD_SIZE, :] = True
+        self._v_fences[games] = False
+        self._v_fences[games, :, 0] = True
+        self._v_fences[games, :, BOARD_SIZE] = True
+        self._fences_left[games] = Fence.FENCES_PER_PLAYER
+        self._turn[games] = 1
+        self._state[games] = 0
+
+    def get_size(self):
+        """Gets the number of games."""
+        return self._size
+
+    def get_pawns(self):
+        """Gets the (size, 2, 2) array of (x, y) pawn positions, player 1 first."""
+        return self._pawns
+
+    def get_turns(self):
+        """Gets the array of players whose turn it is."""
+        return self._turn
+
+    def get_states(self):
+        """Gets the array of game states, 0 for unfinished games or the number of the winner."""
+        return self._state
+
+    def get_fences_left(self):
+        """Gets the (size, 2) array of fences left, player 1 first."""
+        return self._fences_left
+
+    def get_h_fences(self):
+        """Gets the horizontal fence plane, borders included."""
+        return self._h_fences
+
+    def get_v_fences(self):
+        """Gets the vertical fence plane, borders included."""
+        return self._v_fences
+
+    def is_winner(self, player_number):
+        """Returns the boolean array of games the given player has won."""
+        return self._state == player_number
+
+    def blocked(self, games, x_coords, y_coords, direction):
+        """Returns which of the given squares have a fence (or border) on the side of the given direction."""
+        (x_step, y_step) = DIRECTIONS[direction]
+        # positions off the board are clipped, the caller ignores them
+        x_coords = np.clip(x_coords, 0, BOARD_SIZE - 1)
+        y_coords = np.clip(y_coords, 0, BOARD_SIZE - 1)
+        if x_step:
+            return self._h_fences[games, x_coords + max(x_step, 0), y_coords]
+        return self._v_fences[games, x_coords, y_coords + max(y_step, 0)]
+
+    def select_games(self, games):
+        """Returns the given game indices (every game by default) as an array. Raises ValueError if a game is given
+        more than once, a call makes one action per game."""
+        if games is None:
+            return np.arange(self._size)
+        games = np.asarray(games)
+        if np.unique(games).size != games.size:
+            raise ValueError("a game can only be given once per call")
+        return games
+
+    def select_players(self, players, games):
+        """Returns the player numbers of a call, one per game, which of them are 1 or 2, and their indices into the
+        arrays. Indices of other player numbers are clamped to 0 or 1 so they can be looked up, their actions are
+        refused as QuoridorGame refuses them."""
+        players = np.broadcast_to(np.asarray(players, dtype=np.int64), games.shape)
+        known = (players == 1) | (players == 2)
+        return players, known, np.clip(players - 1, 0, 1)
+
+    def move_pawns(self, players, coordinates, games=None):
+        """Moves the pawn of players[i] in games[i] (every game by default) to coordinates[i], given as the (y, x)
+        tuples of move_pawn. Returns the boolean array of valid moves, only those are made. Raises ValueError if
+        games holds the same game twice."""
+        games = self.select_games(games)
+        (players, known, player_index) = self.select_players(players, games)
+        coordinates = np.asarray(coordinates).reshape(-1, 2)
+        y_dest = coordinates[:, 0]
+        x_dest = coordinates[:, 1]
+        valid = known & (self._state[games] == 0) & (self._turn[games] == players)
+        valid &= (x_dest >= 0) & (x_dest < BOARD_SIZE) & (y_dest >= 0) & (y_dest < BOARD_SIZE)
+        own = self._pawns[games, player_index]
+        other = self._pawns[games, 1 - player_index]
+        reachable = np.zeros(games.shape, dtype=bool)
+        for direction in range(4):
+            (x_step, y_step) = DIRECTIONS[direction]
+            open_step = ~self.blocked(games, own[:, 0], own[:, 1], direction)
+            x_step_to = own[:, 0] + x_step
+            y_step_to = own[:, 1] + y_step
+            facing = open_step & (x_step_to == other[:, 0]) & (y_step_to == other[:, 1])
+            # plain step when the other pawn is not in the way
+            reachable |= open_step & ~facing & (x_dest == x_step_to) & (y_dest == y_step_to)
+            # jump over the other pawn, or move diagonally if there is a fence at its back
+            open_jump = ~self.blocked(games, other[:, 0], other[:, 1], direction)
+            reachable |= facing & open_jump & (x_dest == other[:, 0] + x_step) & (y_dest == other[:, 1] + y_step)
+            for side in SIDES[direction]:
+                (x_side, y_side) = DIRECTIONS[side]
+                open_side = ~self.blocked(games, other[:, 0], other[:, 1], side)
+                reachable |= facing & ~open_jump & open_side & (x_dest == other[:, 0] + x_side) & \
+                    (y_dest == other[:, 1] + y_side)
+        valid &= reachable
+        moved = games[valid]
+        moved_players = player_index[valid]
+        self._pawns[moved, moved_players, 0] = x_dest[valid]
+        self._pawns[moved, moved_players, 1] = y_dest[valid]
+        self._turn[moved] = 2 - moved_players
+        # player 1 wins on row 8, player 2 on row 0
+        won = x_dest[valid] == np.where(moved_players == 0, BOARD_SIZE - 1, 0)
+        self._state[moved[won]] = moved_players[won] + 1
+        return valid
+
+    def place_fences(self, players, directions, coordinates, games=None):
+        """Places a fence for players[i] in games[i] (every game by default), in direction directions[i] ("h" or "v")
+        at coordinates[i], given as the (y, x) tuples of place_fence. Returns the boolean array of valid placements,
+        only those are made. Raises ValueError if games holds the same game twice."""
+        games = self.select_games(games)
+        (players, known, player_index) = self.select_players(players, games)
+        horizontal = np.broadcast_to(np.asarray(directions) == "h", games.shape)
+        vertical = np.broadcast_to(np.asarray(directions) == "v", games.shape)
+        coordinates = np.asarray(coordinates).reshape(-1, 2)
+        y_dest = coordinates[:, 0]
+        x_dest = coordinates[:, 1]
+        valid = known & (self._state[games] == 0) & (self._turn[games] == players) & (horizontal | vertical)
+        valid &= (x_dest >= 0) & (x_dest < BOARD_SIZE) & (y_dest >= 0) & (y_dest < BOARD_SIZE)
+        valid &= self._fences_left[games, player_index] > 0
+        x_slot = np.clip(x_dest, 0, BOARD_SIZE - 1)
+        y_slot = np.clip(y_dest, 0, BOARD_SIZE - 1)
+        taken = np.where(horizontal, self._h_fences[games, x_slot, y_slot], self._v_fences[games, x_slot, y_slot])
+        valid &= ~taken
+        # only a fence with both ends on a wall can cut a pawn off, the others need no flood
+        cutting = valid & self.touches_walls(games, x_slot, y_slot, horizontal)
+        # try the fences, then take back the ones leaving a pawn without a path to its goal row
+        placed_h = valid & horizontal
+        placed_v = valid & vertical
+        self._h_fences[games[placed_h], x_slot[placed_h], y_slot[placed_h]] = True
+        self._v_fences[games[placed_v], x_slot[placed_v], y_slot[placed_v]] = True
+        open_paths = self.has_paths(games[cutting])
+        closed = np.flatnonzero(cutting)[~open_paths]
+        self._h_fences[games[closed], x_slot[closed], y_slot[closed]] &= ~horizontal[closed]
+        self._v_fences[games[closed], x_slot[closed], y_slot[closed]] &= ~vertical[closed]
+        valid[closed] = False
+        placed = games[valid]
+        self._fences_left[placed, player_index[valid]] -= 1
+        self._turn[placed] = 2 - player_index[valid]
+        return valid
+
+    def corner_touches_wall(self, games, rows, columns):
+        """Returns which of the given grid corners touch a fence or the border. Corner (r, c) is the top left corner of
+        square (r, c), r and c going up to BOARD_SIZE."""
+        border = (rows == 0) | (rows == BOARD_SIZE) | (columns == 0) | (columns == BOARD_SIZE)
+        # positions off the inner corners are clipped, border corners touch a wall anyway
+        rows = np.clip(rows, 1, BOARD_SIZE - 1)
+        columns = np.clip(columns, 1, BOARD_SIZE - 1)
+        return border | self._h_fences[games, rows, columns - 1] | self._h_fences[games, rows, columns] | \
+            self._v_fences[games, rows - 1, columns] | self._v_fences[games, rows, columns]
+
+    def touches_walls(self, games, x_slots, y_slots, horizontal):
+        """Returns which of the given fence slots, not placed yet, have both ends on a fence or the border, as
+        Bitboard.touches_walls. A fence that does not can not cut any square off."""
+        x_ends = np.where(horizontal, x_slots, x_slots + 1)
+        y_ends = np.where(horizontal, y_slots + 1, y_slots)
+        return self.corner_touches_wall(games, x_slots, y_slots) & self.corner_touches_wall(games, x_ends, y_ends)
+
+    def has_paths(self, games):
+        """Returns which of the given games leave both pawns a path to their goal rows. Every game is flooded from the
+        goal rows at once, one step per loop, until nothing new is reached or every pawn is."""
+        games = np.asarray(games)
+        result = np.ones(games.shape, dtype=bool)
+        if not games.size:
+            return result
+        # squares a pawn can not cross into the next row or column
+        down_open = ~self._h_fences[games, 1:BOARD_SIZE, :]
+        right_open = ~self._v_fences[games, :, 1:BOARD_SIZE]
+        rows = np.arange(games.size)
+        for (player_index, goal_row) in ((0, BOARD_SIZE - 1), (1, 0)):
+            pawns = self._pawns[games, player_index]
+            reached = np.zeros((games.size, BOARD_SIZE, BOARD_SIZE), dtype=bool)
+            reached[:, goal_row, :] = True
+            while not reached[rows, pawns[:, 0], pawns[:, 1]].all():
+                grown = reached.copy()
+                grown[:, 1:, :] |= reached[:, :-1, :] & down_open
+                grown[:, :-1, :] |= reached[:, 1:, :] & down_open
+                grown[:, :, 1:] |= reached[:, :, :-1] & right_open
+                grown[:, :, :-1] |= reached[:, :, 1:] & right_open
+                if np.array_equal(grown, reached):
+                    break
+                reached = grown
+            result &= reached[rows, pawns[:, 0], pawns[:, 1]]
+        return result
+
+    def apply(self, players, fences, directions, coordinates):
+        """Makes one action in every game: a fence placement where fences[i] is True, a pawn move otherwise. Directions
+        are ignored for pawn moves. Returns the boolean array of valid actions."""
+        fences = np.asarray(fences, dtype=bool)
+        players = np.broadcast_to(np.asarray(players, dtype=np.int64), fences.shape)
+        directions = np.broadcast_to(np.asarray(directions), fences.shape)
+        coordinates = np.asarray(coordinates).reshape(-1, 2)
+        valid = np.zeros(self._size, dtype=bool)
+        moves = np.flatnonzero(~fences)
+        placements = np.flatnonzero(fences)
+        valid[moves] = self.move_pawns(players[moves], coordinates[moves], moves)
+        valid[placements] = self.place_fences(players[placements], directions[placements], coordinates[placements],
+                                              placements)
+        return valid
@@ -0,0 +1,269 @@
+import argparse
+import copy
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from Quoridor import DISTANCE_CACHE, EXACT, Bitboard, DistanceCache, QuoridorGame, TranspositionTable, square_of
+from QuoridorAI import play_action
+
+# positions the move benchmarks start from, as (player_number, action) lists played from the start
+STEP_SETUP = []
+JUMP_SETUP = [(1, ("move", (4, 1))), (2, ("move", (4, 7))), (1, ("move", (4, 2))), (2, ("move", (4, 6))),
+              (1, ("move", (4, 3))), (2, ("move", (4, 5))), (1, ("move", (3, 3))), (2, ("move", (4, 4))),
+              (1, ("move", (4, 3)))]
+DIAGONAL_SETUP = [(1, ("move", (4, 1))), (2, ("move", (4, 7))), (1, ("fence", "h", (4, 3))), (2, ("move", (4, 6))),
+                  (1, ("move", (3, 1))), (2, ("move", (4, 5))), (1, ("move", (3, 2))), (2, ("move", (4, 4))),
+                  (1, ("move", (3, 3))), (2, ("fence", "v", (8, 8))), (1, ("move", (4, 3)))]
+# moves timed from those positions: plain step, straight jump over player 1, diagonal move past a fence
+STEP_MOVE = (1, (4, 1))
+JUMP_MOVE = (2, (4, 2))
+DIAGONAL_MOVE = (2, (3, 3))
+CROWDED_FENCES = 16
+# bytes a new game may take when many are alive, see the QuoridorGame docstring. Going over it is a regression even
+# without a baseline
+GAME_MEMORY_LIMIT = 1024
+
+
+def setup_game(actions):
+    """Returns a new game with the given actions played."""
+    game = QuoridorGame()
+    for (player_number, action) in actions:
+        if not play_action(game, player_number, action):
+            raise RuntimeError("benchmark setup action refused: %r" % (action,))
+    return game
+
+
+def crowded_game(seed=0):
+    """Returns a game where both players placed CROWDED_FENCES fences in total, with the fence slot still free to time
+    a placement on."""
+    rng = random.Random(seed)
+    game = QuoridorGame()
+    placed = 0
+    while placed < CROWDED_FENCES:
+        direction = rng.choice("hv")
+        coordinate_tuple = (rng.randrange(9), rng.randrange(9))
+        if game.place_fence(game.get_turn(), direction, coordinate_tuple):
+            placed += 1
+    while True:
+        direction = rng.choice("hv")
+        (y_coord, x_coord) = (rng.randrange(9), rng.randrange(9))
+        square = square_of(x_coord, y_coord)
+        if game.get_bitboard().is_fence_free(direction, square) and \
+                game.validate_fence_path(direction, square) is not None:
+            return game, (game.get_turn(), direction, (y_coord, x_coord))
+
+
+def time_calls(prepare, call, number, repeat, reset=None):
+    """Times call(item) over number items made by prepare(), best of repeat runs. Preparing is not timed. Given a reset
+    function, it is called before every call without being timed, and each call is timed on its own. Returns the
+    seconds per call."""
+    clock = time.perf_counter
+    best = None
+    for _ in range(repeat):
+        items = [prepare() for _ in range(number)]
+        if reset is None:
+            start = clock()
+            for item in items:
+                call(item)
+            elapsed = clock() - start
+        else:
+            elapsed = 0.0
+            for item in items:
+                reset()
+                start = clock()
+                call(item)
+                elapsed += clock() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / number
+
+
+def bench_move(setup, move, number, repeat):
+    """Times move_pawn from the position of the setup actions."""
+    game = setup_game(setup)
+    (player_number, coordinate_tuple) = move
+    if coordinate_tuple not in game.legal_moves(player_number):
+        raise RuntimeError("benchmark move is not legal: %r" % (move,))
+    return time_calls(lambda: copy.deepcopy(game), lambda item: item.move_pawn(player_number, coordinate_tuple),
+                      number, repeat)
+
+
+def bench_fence(game, fence, number, repeat, cached=False):
+    """Times place_fence from the given position. Every call places the same fence, so the distance maps of the new
+    layout are in DISTANCE_CACHE after the first one; unless cached is set the cache is cleared before every call, so
+    the path to the goal rows is checked each time."""
+    (player_number, direction, coordinate_tuple) = fence
+    return time_calls(lambda: copy.deepcopy(game),
+                      lambda item: item.place_fence(player_number, direction, coordinate_tuple), number, repeat,
+                      None if cached else DISTANCE_CACHE.clear)
+
+
+def random_playout(rng, fence_rate=0.2, max_plies=400):
+    """Plays a game of random actions from the start and returns the number of actions made."""
+    game = QuoridorGame()
+    plies = 0
+    while plies < max_plies and game.get_current_state() == "UNFINISHED":
+        player_number = game.get_turn()
+        if game.get_fences_left(player_number) > 0 and rng.random() < fence_rate:
+            if game.place_fence(player_number, rng.choice("hv"), (rng.randrange(9), rng.randrange(9))):
+                plies += 1
+                continue
+        moves = game.legal_moves(player_number)
+        if not moves:
+            break
+        game.move_pawn(player_number, rng.choice(moves))
+        plies += 1
+    return plies
+
+
+def bench_playouts(number, repeat, seed=0):
+    """Times full random playouts. Returns the seconds per playout."""
+    best = None
+    for _ in range(repeat):
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        for _ in range(number):
+            random_playout(rng)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / number
+
+
+def bench_copy(number, repeat):
+    """Times copy.deepcopy of a game in the middle of a match."""
+    (game, _) = crowded_game()
+    return time_calls(lambda: game, copy.deepcopy, number, repeat)
+
+
+def measure_memory(count=1000):
+    """Returns the peak memory in bytes of one new game, and the memory per game when count games are alive."""
+    tracemalloc.start()
+    QuoridorGame()
+    (_, single) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracemalloc.start()
+    games = [QuoridorGame() for _ in range(count)]
+    (current, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del games
+    return single, current / count
+
+
+def measure_table_memory(count=1 << 14):
+    """Returns the memory in bytes taken by each entry of a full TranspositionTable."""
+    rng = random.Random(0)
+    tracemalloc.start()
+    table = TranspositionTable(count)
+    for depth in range(count):
+        table.store(rng.getrandbits(64), depth % 8, depth - count // 2, EXACT, ("move", (4, 1)))
+    (current, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / table.get_size()
+
+
+def measure_cache_memory(count=1000):
+    """Returns the memory in bytes taken by each fence layout of a full DistanceCache, layouts having three random
+    fences."""
+    rng = random.Random(0)
+    tracemalloc.start()
+    cache = DistanceCache(count)
+    while len(cache) < count:
+        bitboard = Bitboard()
+        for _ in range(3):
+            bitboard.set_fence(rng.choice("hv"), square_of(rng.randrange(1, 9), rng.randrange(1, 9)))
+        cache.get_maps(bitboard)
+    del bitboard
+    (current, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(cache)
+
+
+def run_benchmarks(scale=1.0, repeat=5):
+    """Runs every benchmark and returns the results: seconds and operations per second of every timed operation, and
+    the memory figures."""
+    number = max(1, int(2000 * scale))
+    (crowded, crowded_fence) = crowded_game()
+    timings = {
+        "move_pawn_step": bench_move(STEP_SETUP, STEP_MOVE, number, repeat),
+        "move_pawn_jump": bench_move(JUMP_SETUP, JUMP_MOVE, number, repeat),
+        "move_pawn_diagonal": bench_move(DIAGONAL_SETUP, DIAGONAL_MOVE, number, repeat),
+        "place_fence_empty": bench_fence(QuoridorGame(), (1, "h", (4, 4)), number, repeat),
+        "place_fence_crowded": bench_fence(crowded, crowded_fence, number, repeat),
+        "place_fence_empty_cached": bench_fence(QuoridorGame(), (1, "h", (4, 4)), number, repeat, True),
+        "place_fence_crowded_cached": bench_fence(crowded, crowded_fence, number, repeat, True),
+        "random_playout": bench_playouts(max(1, int(20 * scale)), repeat),
+        "copy_game": bench_copy(max(1, number // 4), repeat),
+    }
+    (peak, per_game) = measure_memory()
+    results = {}
+    for (name, seconds) in timings.items():
+        results[name] = {"seconds": seconds, "ops_per_second": 1.0 / seconds}
+    return {
+        "python": platform.python_version(),
+        "results": results,
+        "memory": {"peak_bytes_one_game": peak, "bytes_per_game": per_game,
+                   "bytes_per_table_entry": measure_table_memory(),
+                   "bytes_per_cached_layout": measure_cache_memory()},
+    }
+
+
+def check_memory(report):
+    """Returns the memory regression of report against GAME_MEMORY_LIMIT, as a list like compare."""
+    per_game = report["memory"]["bytes_per_game"]
+    if per_game > GAME_MEMORY_LIMIT:
+        return [{"name": "bytes_per_game", "baseline": GAME_MEMORY_LIMIT, "current": per_game,
+                 "change": per_game / GAME_MEMORY_LIMIT - 1.0}]
+    return []
+
+
+def compare(report, baseline, threshold):
+    """Returns the list of regressions of report against baseline: timings slower, or memory bigger, by more than the
+    threshold (0.1 for 10 percent)."""
+    regressions = []
+    for (name, result) in report["results"].items():
+        if name not in baseline.get("results", {}):
+            continue
+        before = baseline["results"][name]["seconds"]
+        if result["seconds"] > before * (1.0 + threshold):
+            regressions.append({"name": name, "baseline": before, "current": result["seconds"],
+                                "change": result["seconds"] / before - 1.0})
+    for (name, value) in report["memory"].items():
+        before = baseline.get("memory", {}).get(name)
+        if before and value > before * (1.0 + threshold):
+            regressions.append({"name": name, "baseline": before, "current": value, "change": value / before - 1.0})
+    return regressions
+
+
+def main(arguments=None):
+    """Command line entry point of the benchmark suite. Prints the JSON report, and exits with 1 when a new game takes
+    more than GAME_MEMORY_LIMIT bytes, or when a baseline is given and a regression is found."""
+    parser = argparse.ArgumentParser(description="Times the QuoridorGame hot paths.")
+    parser.add_argument("--output", help="file the JSON report is written to")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.1 for 10 percent")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the number of timed calls")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the best one is kept")
+    options = parser.parse_args(arguments)
+    report = run_benchmarks(options.scale, options.repeat)
+    report["regressions"] = check_memory(report)
+    if options.baseline:
+        with open(options.baseline) as baseline:
+            report["regressions"] += compare(report, json.load(baseline), options.threshold)
+    status = 0
+    if report["regressions"]:
+        status = 1
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, "w") as output:
+            output.write(text + "\n")
+    print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import mmap
+import os
+import struct
+import tempfile
+
+from Quoridor import BOARD_SIZE
+
+# every record file starts with this, followed by the games one after the other
+MAGIC = b"QRG1"
+# a game is its number of actions, the winner (0 while unfinished or drawn) and then one byte per action
+GAME_HEADER = struct.Struct("<HB")
+# the index file holds the offset of every game in the record file
+INDEX_ENTRY = struct.Struct("<Q")
+# action bytes: 0-80 pawn moves to a square, then 72 horizontal and 72 vertical fence slots. Fences on the top row or
+# the first column are borders and have no code
+H_FENCE_BASE = 81
+V_FENCE_BASE = H_FENCE_BASE + (BOARD_SIZE - 1) * BOARD_SIZE
+ACTION_CODES = V_FENCE_BASE + BOARD_SIZE * (BOARD_SIZE - 1)
+
+
+def encode_action(action):
+    """Returns the byte value of an action given as ("move", coordinate_tuple) or ("fence", direction,
+    coordinate_tuple)."""
+    (y_coord, x_coord) = action[-1]
+    if not (0 <= x_coord < BOARD_SIZE and 0 <= y_coord < BOARD_SIZE):
+        raise ValueError("action off the board: %r" % (action,))
+    if action[0] == "move":
+        return x_coord * BOARD_SIZE + y_coord
+    if action[1] == "h" and x_coord > 0:
+        return H_FENCE_BASE + (x_coord - 1) * BOARD_SIZE + y_coord
+    if action[1] == "v" and y_coord > 0:
+        return V_FENCE_BASE + x_coord * (BOARD_SIZE - 1) + y_coord - 1
+    raise ValueError("no code for action: %r" % (action,))
+
+
+def decode_action(code):
+    """Returns the action of a byte value, the opposite of encode_action."""
+    if code < H_FENCE_BASE:
+        (x_coord, y_coord) = divmod(code, BOARD_SIZE)
+        return "move", (y_coord, x_coord)
+    if code < V_FENCE_BASE:
+        (x_coord, y_coord) = divmod(code - H_FENCE_BASE, BOARD_SIZE)
+        return "fence", "h", (y_coord, x_coord + 1)
+    if code < ACTION_CODES:
+        (x_coord, y_coord) = divmod(code - V_FENCE_BASE, BOARD_SIZE - 1)
+        return "fence", "v", (y_coord + 1, x_coord)
+    raise ValueError("no action for code: %d" % code)
+
+
+def action_from_log(entry):
+    """Returns the action of a JSON log entry [player_number, "move" or "fence", direction, [y, x]]."""
+    (_, kind, direction, coordinate_tuple) = entry
+    if kind == "move":
+        return "move", tuple(coordinate_tuple)
+    return "fence", direction, tuple(coordinate_tuple)
+
+
+def replace_file(path, data):
+    """Writes the bytes to path through a temporary file of its own in the same directory, then puts it in place at
+    once: readers and crashes never see half a file, and two writers never share a temporary file."""
+    (handle, temporary) = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                           dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(handle, "wb") as output:
+            output.write(data)
+        # mkstemp makes the file readable by its owner only
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def index_path(path):
+    """Returns the path of the index file of a record file."""
+    return path + ".idx"
+
+
+class GameRecordWriter:
+    """A class to represent an append-only record file of games, with its index file of game offsets. Players are not
+    stored: player 1 makes the first action and the players take turns."""
+    def __init__(self, path):
+        """Constructor for GameRecordWriter class. Opens the record file for appending, creating it if needed. A game
+        cut short by a crash while it was appended is dropped, so new games do not follow its missing bytes."""
+        self._path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._index = open(index_path(path), "ab")
+            return
+        self._file.close()
+        with GameRecordReader(path) as reader:
+            offsets = list(reader.get_offsets())
+            end = reader.get_end()
+        self._file = open(path, "ab")
+        self._file.truncate(end)
+        self._file.seek(end)
+        self._index = open(index_path(path), "ab")
+        if self._index.tell() != len(offsets) * INDEX_ENTRY.size:
+            # the index lists the dropped game or misses some games, write it again
+            self._index.truncate(0)
+            self._index.write(b"".join(INDEX_ENTRY.pack(offset) for offset in offsets))
+
+    def write_game(self, actions, winner=0):
+        """Appends a game given as a list of actions and returns its offset in the file."""
+        offset = self._file.tell()
+        self._file.write(GAME_HEADER.pack(len(actions), winner))
+        self._file.write(bytes(encode_action(action) for action in actions))
+        self._index.write(INDEX_ENTRY.pack(offset))
+        return offset
+
+    def flush(self):
+        """Writes buffered games to disk."""
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        """Closes the record and index files."""
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecordReader:
+    """A class to represent a record file opened for reading. The file is memory-mapped, games are decoded only when
+    asked for, and the index file (rebuilt by scanning the records if it is missing or short) gives the offset of
+    game N directly."""
+    def __init__(self, path):
+        """Constructor for GameRecordReader class. Maps the record file and its index."""
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("not a game record file: " + path)
+        self._offsets = None
+        if os.path.exists(index_path(path)):
+            with open(index_path(path), "rb") as index:
+                offsets = [entry[0] for entry in INDEX_ENTRY.iter_unpack(index.read())]
+            if self.is_complete_index(offsets):
+                self._offsets = offsets
+
+    def is_complete_index(self, offsets):
+        """Checks that the last game of the index ends at the end of the file. An index pointing past the end of the
+        file is stale."""
+        if not offsets:
+            return len(self._data) == len(MAGIC)
+        if offsets[-1] + GAME_HEADER.size > len(self._data):
+            return False
+        (length, _) = GAME_HEADER.unpack_from(self._data, offsets[-1])
+        return offsets[-1] + GAME_HEADER.size + length == len(self._data)
+
+    def get_offsets(self):
+        """Gets the offset of every game, scanning the file once if there was no usable index."""
+        if self._offsets is None:
+            self._offsets = [offset for (offset, _, _) in self.scan()]
+        return self._offsets
+
+    def get_end(self):
+        """Gets the offset just past the last complete game, the end of the file unless a crash cut the last game
+        short."""
+        offsets = self.get_offsets()
+        if not offsets:
+            return len(MAGIC)
+        (length, _) = GAME_HEADER.unpack_from(self._data, offsets[-1])
+        return offsets[-1] + GAME_HEADER.size + length
+
+    def scan(self):
+        """Yields (offset, winner, action bytes) for every game in file order without decoding the actions. Stops
+        before a last game cut short by a crash while it was appended."""
+        offset = len(MAGIC)
+        while offset + GAME_HEADER.size <= len(self._data):
+            (length, winner) = GAME_HEADER.unpack_from(self._data, offset)
+            start = offset + GAME_HEADER.size
+            if start + length > len(self._data):
+                return
+            yield offset, winner, self._data[start:start + length]
+            offset = start + length
+
+    def read_game(self, offset):
+        """Returns the (winner, actions) of the game stored at the given offset. Raises ValueError if the game does
+        not fit in the file."""
+        if offset + GAME_HEADER.size > len(self._data):
+            raise ValueError("no game at offset %d" % offset)
+        (length, winner) = GAME_HEADER.unpack_from(self._data, offset)
+        start = offset + GAME_HEADER.size
+        if start + length > len(self._data):
+            raise ValueError("game at offset %d is cut short" % offset)
+        return winner, [decode_action(code) for code in self._data[start:start + length]]
+
+    def get_game(self, number):
+        """Returns the (winner, actions) of game number N, counting from 0."""
+        return self.read_game(self.get_offsets()[number])
+
+    def __len__(self):
+        return len(self.get_offsets())
+
+    def __iter__(self):
+        """Yields the (winner, actions) of every game in file order."""
+        for (_, winner, codes) in self.scan():
+            yield winner, [decode_action(code) for code in codes]
+
+    def close(self):
+        """Unmaps and closes the record file."""
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Quoridor import QuoridorGame
+from QuoridorAI import play_action
+from QuoridorRecord import MAGIC, GameRecordReader, action_from_log, decode_action, replace_file
+
+# games replayed between two checkpoints
+CHECKPOINT_EVERY = 1000
+
+
+def checkpoint_path(path):
+    """Returns the path of the checkpoint file of a replay output file."""
+    return path + ".ckpt"
+
+
+def is_binary_record(path):
+    """Checks if the file is a binary record file (see QuoridorRecord) rather than JSON lines."""
+    with open(path, "rb") as records:
+        return records.read(len(MAGIC)) == MAGIC
+
+
+def entry_action(entry):
+    """Returns the (player_number, action) of a JSON action entry. Takes the [player_number, action] entries written
+    by the tournament runner and the older [player_number, "move" or "fence", direction, [y, x]] log entries."""
+    if len(entry) == 4:
+        return entry[0], action_from_log(entry)
+    (player_number, action) = entry
+    if action[0] == "move":
+        return player_number, ("move", tuple(action[1]))
+    return player_number, ("fence", action[1], tuple(action[2]))
+
+
+def read_json_games(path, start=0):
+    """Yields (game number, recorded winner, actions) for every game of a JSON lines file, one line at a time,
+    skipping the first start games. Blank lines are not games and are not counted. A line is either a record with
+    "actions" and "winner", or a bare list of log entries; the winner is None when the line does not give it. Actions
+    are (player_number, action) pairs."""
+    with open(path) as records:
+        number = 0
+        for line in records:
+            if not line.strip():
+                continue
+            if number >= start:
+                record = json.loads(line)
+                if isinstance(record, list):
+                    record = {"actions": record}
+                yield number, record.get("winner"), [entry_action(entry) for entry in record["actions"]]
+            number += 1
+
+
+def read_binary_games(path, start=0):
+    """Yields (game number, recorded winner, actions) for every game of a binary record file, skipping the first start
+    games. Players are not stored there, so actions are (None, action) pairs played in turn."""
+    with GameRecordReader(path) as reader:
+        for (number, (_, winner, codes)) in enumerate(reader.scan()):
+            if number < start:
+                continue
+            yield number, winner, [(None, decode_action(code)) for code in codes]
+
+
+def read_games(path, start=0):
+    """Yields the games of a record file of either format, see read_json_games."""
+    if is_binary_record(path):
+        return read_binary_games(path, start)
+    return read_json_games(path, start)
+
+
+def apply_trusted(game, player_number, action):
+    """Makes an action known to be valid without checking it. The distance maps are not repaired after a fence, call
+    game.refresh_distances() once the fences are placed."""
+    (y_coord, x_coord) = action[-1]
+    if action[0] == "move":
+        game.update_pawn(player_number, x_coord, y_coord)
+        game.switch_turns()
+        game.win_logic(player_number, x_coord, y_coord)
+    else:
+        game.update_fence(action[1], x_coord, y_coord)
+        game.update_fences_left(player_number, game.get_fences_left(player_number) - 1)
+        game.switch_turns()
+
+
+def replay_game(actions, trusted=False):
+    """Replays a game from the start. Returns the game and the number of the first action refused, or None if every
+    action was valid. Trusted games skip the rules and are never refused."""
+    game = QuoridorGame()
+    if trusted:
+        fences = False
+        for (player_number, action) in actions:
+            apply_trusted(game, player_number or game.get_turn(), action)
+            fences = fences or action[0] == "fence"
+        if fences:
+            game.refresh_distances()
+        return game, None
+    for (ply, (player_number, action)) in enumerate(actions):
+        if not play_action(game, player_number or game.get_turn(), action):
+            return game, ply
+    return game, None
+
+
+def game_winner(game):
+    """Returns the number of the player who won the game, 0 if it is unfinished."""
+    for player_number in (1, 2):
+        if game.is_winner(player_number):
+            return player_number
+    return 0
+
+
+def load_checkpoint(path):
+    """Returns the checkpoint of a replay output file, or one starting from scratch if there is none."""
+    if not os.path.exists(checkpoint_path(path)):
+        return {"games": 0, "invalid": 0, "offset": 0, "finished": False}
+    with open(checkpoint_path(path)) as checkpoint:
+        return json.load(checkpoint)
+
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint of a replay output file with replace_file."""
+    replace_file(checkpoint_path(path), json.dumps(checkpoint).encode())
+
+
+def replay_file(path, output_path, trusted=False, checkpoint_every=CHECKPOINT_EVERY):
+    """Replays every game of a record file and writes one JSON line per game to output_path: game number, actions, first
+    refused action, winner, whether it matches the recorded one (None when no winner is recorded), and the hash of the
+    final position. A checkpoint is saved every checkpoint_every games; an interrupted replay of the same file carries
+    on from the last one. Returns the counts of the file."""
+    checkpoint = load_checkpoint(output_path)
+    resumed = checkpoint["games"]
+    if not checkpoint["finished"]:
+        with open(output_path, "ab") as output:
+            # lines written after the last checkpoint are written again
+            output.truncate(checkpoint["offset"])
+            for (number, winner, actions) in read_games(path, checkpoint["games"]):
+                (game, refused) = replay_game(actions, trusted)
+                replayed = game_winner(game)
+                matches = None if winner is None else replayed == winner
+                result = {"game": number, "actions": len(actions), "refused": refused, "winner": replayed,
+                          "winner_matches": matches, "hash": game.get_hash()}
+                output.write(json.dumps(result).encode() + b"\n")
+                checkpoint["games"] += 1
+                if refused is not None or matches is False:
+                    checkpoint["invalid"] += 1
+                if checkpoint["games"] % checkpoint_every == 0:
+                    output.flush()
+                    checkpoint["offset"] = output.tell()
+                    save_checkpoint(output_path, checkpoint)
+            output.flush()
+            checkpoint["offset"] = output.tell()
+        checkpoint["finished"] = True
+        save_checkpoint(output_path, checkpoint)
+    return {"path": path, "games": checkpoint["games"], "invalid": checkpoint["invalid"], "resumed_from": resumed}
+
+
+def output_path_of(path, output_dir):
+    """Returns the replay output file of a record file: its name followed by a hash of its full path, so record files
+    of the same name in different directories do not share an output file and checkpoint."""
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(output_dir, "%s.%s.replay.jsonl" % (os.path.basename(path), digest))
+
+
+def run_replay(paths, output_dir, workers=None, trusted=False, checkpoint_every=CHECKPOINT_EVERY):
+    """Replays the record files on a process pool, one file per task, and yields the counts of each file as soon as
+    it is done. workers=0 replays every file in this process."""
+    tasks = [(path, output_path_of(path, output_dir), trusted, checkpoint_every) for path in paths]
+    if workers == 0:
+        for task in tasks:
+            yield replay_file(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(replay_file, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(arguments=None):
+    """Command line entry point of the bulk replay. Prints the counts of every file and the totals as JSON."""
+    parser = argparse.ArgumentParser(description="Replays archived Quoridor games from JSON lines or binary records.")
+    parser.add_argument("paths", nargs="+", help="record files, each one replayed by one worker")
+    parser.add_argument("--output-dir", default=".", help="directory the replay results and checkpoints go to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 to replay in this process")
+    parser.add_argument("--trusted", action="store_true", help="skip the rules for games known to be valid")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help="games between checkpoints")
+    options = parser.parse_args(arguments)
+    os.makedirs(options.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    files = list(run_replay(options.paths, options.output_dir, options.workers, options.trusted,
+                            options.checkpoint_every))
+    elapsed = time.perf_counter() - start
+    games = sum(counts["games"] for counts in files)
+    report = {"files": files, "games": games, "invalid": sum(counts["invalid"] for counts in files),
+              "seconds": elapsed, "games_per_second": games / elapsed if elapsed else 0.0}
+    print(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,503 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import struct
+import time
+
+from Quoridor import GAME_BYTES, QuoridorGame, square_of
+from QuoridorRecord import replace_file
+
+# a request line longer than this closes the connection
+LINE_LIMIT = 64 * 1024
+# a snapshot file starts with this and the number of games, then every game as its id length, id and to_bytes
+SNAPSHOT_MAGIC = b"QSS1"
+SNAPSHOT_HEADER = struct.Struct("<I")
+# games encoded between two yields to the event loop while a snapshot is built
+SNAPSHOT_CHUNK = 1000
+# requests whose service time is kept for the "stats" answer, the oldest ones are dropped
+LATENCY_SAMPLES = 100000
+
+
+class Session:
+    """A class to represent one hosted game and when it was last used."""
+    def __init__(self, game_id, game):
+        """Constructor for Session class. Takes the game id and the QuoridorGame."""
+        self._game_id = game_id
+        self._game = game
+        self._last_used = time.monotonic()
+
+    def get_game_id(self):
+        """Gets the id of the game."""
+        return self._game_id
+
+    def get_game(self):
+        """Gets the QuoridorGame of the session."""
+        return self._game
+
+    def get_last_used(self):
+        """Gets the monotonic time of the last request on the session."""
+        return self._last_used
+
+    def touch(self):
+        """Marks the session as used now."""
+        self._last_used = time.monotonic()
+
+
+class SessionRegistry:
+    """A class to represent the games hosted by a server, keyed by game id. New sessions are refused once max_sessions
+    games are alive."""
+    def __init__(self, max_sessions=100000):
+        """Constructor for SessionRegistry class. Takes the largest number of games hosted at once."""
+        self._sessions = {}
+        self._max_sessions = max_sessions
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self):
+        """Starts a new game and returns its session, or None if the registry is full."""
+        if len(self._sessions) >= self._max_sessions:
+            return None
+        game_id = str(next(self._ids))
+        session = Session(game_id, QuoridorGame())
+        self._sessions[game_id] = session
+        return session
+
+    def get(self, game_id):
+        """Returns the session of the given game id, marked as used, or None."""
+        session = self._sessions.get(game_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    def remove(self, game_id):
+        """Removes the given game. Returns False if there was no such game."""
+        return self._sessions.pop(game_id, None) is not None
+
+    def evict_idle(self, idle_timeout):
+        """Removes every game not used for idle_timeout seconds and returns how many were removed."""
+        oldest = time.monotonic() - idle_timeout
+        idle = [game_id for (game_id, session) in self._sessions.items() if session.get_last_used() < oldest]
+        for game_id in idle:
+            del self._sessions[game_id]
+        return len(idle)
+
+    def snapshot_chunks(self, size=SNAPSHOT_CHUNK):
+        """Yields the bytes of a snapshot file of the games hosted now, size games at a time. Games created or removed
+        while the chunks are taken are left as they were when this started."""
+        sessions = list(self._sessions.items())
+        yield SNAPSHOT_MAGIC + SNAPSHOT_HEADER.pack(len(sessions))
+        for start in range(0, len(sessions), size):
+            chunks = []
+            for (game_id, session) in sessions[start:start + size]:
+                encoded = game_id.encode()
+                chunks.append(bytes((len(encoded),)))
+                chunks.append(encoded)
+                chunks.append(session.get_game().to_bytes())
+            yield b"".join(chunks)
+
+    def to_snapshot(self):
+        """Returns every game as the bytes of a snapshot file."""
+        return b"".join(self.snapshot_chunks())
+
+    def save(self, path):
+        """Writes every game to a snapshot file with replace_file. Returns the number of games written."""
+        replace_file(path, self.to_snapshot())
+        return len(self._sessions)
+
+    def load(self, path):
+        """Replaces the games of the registry with the ones of a snapshot file written by save and returns how many
+        were read. New game ids continue after the largest one read."""
+        with open(path, "rb") as snapshot:
+            data = snapshot.read()
+        if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("not a session snapshot file: " + path)
+        (count,) = SNAPSHOT_HEADER.unpack_from(data, len(SNAPSHOT_MAGIC))
+        offset = len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER.size
+        sessions = {}
+        for _ in range(count):
+            length = data[offset]
+            game_id = data[offset + 1:offset + 1 + length].decode()
+            offset += 1 + length
+            sessions[game_id] = Session(game_id, QuoridorGame.from_bytes(data[offset:offset + GAME_BYTES.size]))
+            offset += GAME_BYTES.size
+        self._sessions = sessions
+        numbers = [int(game_id) for game_id in sessions if game_id.isdigit()]
+        self._ids = itertools.count(max(numbers, default=0) + 1)
+        return count
+
+
+def percentiles(latencies):
+    """Returns the p50 and p99 of a list of latencies in seconds, in milliseconds."""
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"p50_ms": None, "p99_ms": None}
+    return {"p50_ms": latencies[len(latencies) // 2] * 1000.0,
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000.0}
+
+
+def game_status(game):
+    """Returns the turn and state of a game, sent back with every answer about it."""
+    return {"turn": game.get_turn(), "state": game.get_current_state()}
+
+
+def handle_request(registry, request):
+    """Runs one request on the registry and returns the answer. Requests are JSON objects with an "op" of "new",
+    "move", "fence", "winner", "view" or "close"; an "id" given with the request is sent back with the answer."""
+    op = request.get("op")
+    if op == "new":
+        session = registry.create()
+        if session is None:
+            return {"ok": False, "error": "server full"}
+        answer = {"ok": True, "game": session.get_game_id()}
+        answer.update(game_status(session.get_game()))
+        return answer
+    session = registry.get(str(request.get("game")))
+    if session is None:
+        return {"ok": False, "error": "unknown game"}
+    game = session.get_game()
+    if op == "move":
+        (y_coord, x_coord) = request["to"]
+        answer = {"ok": game.move_pawn(request["player"], (y_coord, x_coord))}
+    elif op == "fence":
+        (y_coord, x_coord) = request["at"]
+        answer = {"ok": game.place_fence(request["player"], request["direction"], (y_coord, x_coord))}
+    elif op == "winner":
+        answer = {"ok": True, "winner": game.is_winner(request["player"])}
+    elif op == "view":
+        snapshot = game.snapshot()
+        answer = {"ok": True, "version": snapshot.get_version(),
+                  "pawns": [list(snapshot.get_pawn_position(player_number))[::-1] for player_number in (1, 2)],
+                  "fences": {direction: snapshot.get_fences(direction) for direction in ("h", "v")},
+                  "fences_left": [snapshot.get_fences_left(player_number) for player_number in (1, 2)]}
+    elif op == "close":
+        registry.remove(session.get_game_id())
+        return {"ok": True}
+    else:
+        return {"ok": False, "error": "unknown op"}
+    answer.update(game_status(game))
+    return answer
+
+
+class QuoridorServer:
+    """A class to represent an asyncio TCP server hosting many QuoridorGame sessions. Clients send one JSON request
+    per line and get one JSON answer per line, in order. Each connection is read only as fast as its answers are
+    written (backpressure), and games left idle are evicted. With a snapshot path every game is saved there every
+    snapshot_interval seconds and when the server stops. The time taken to answer each request is kept and a
+    {"op": "stats"} request returns its percentiles."""
+    def __init__(self, registry=None, idle_timeout=300.0, eviction_interval=10.0, snapshot_path=None,
+                 snapshot_interval=5.0):
+        """Constructor for QuoridorServer class. Takes the session registry, the seconds a game may stay unused, how
+        often idle games are looked for, and the snapshot file and how often it is written."""
+        if registry is None:
+            registry = SessionRegistry()
+        self._registry = registry
+        self._idle_timeout = idle_timeout
+        self._eviction_interval = eviction_interval
+        self._snapshot_path = snapshot_path
+        self._snapshot_interval = snapshot_interval
+        self._server = None
+        self._evictor = None
+        self._snapshotter = None
+        # file write of the last snapshot, running on another thread until it is done
+        self._writing = None
+        # handler task of every open connection, with its writer
+        self._connections = {}
+        # seconds taken by the last LATENCY_SAMPLES requests, from parsing the line to queueing the answer
+        self._service_times = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._served = 0
+
+    def get_registry(self):
+        """Gets the session registry."""
+        return self._registry
+
+    def get_served(self):
+        """Gets the number of requests answered since the server started."""
+        return self._served
+
+    def get_stats(self):
+        """Returns the number of requests answered and the p50 and p99 of the time the server took to answer them."""
+        stats = {"ok": True, "served": self._served, "sessions": len(self._registry)}
+        stats.update(percentiles(self._service_times))
+        return stats
+
+    async def handle_connection(self, reader, writer):
+        """Answers the requests of one client until it disconnects."""
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # line longer than LINE_LIMIT
+                    break
+                if not line:
+                    break
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    if request.get("op") == "stats":
+                        answer = self.get_stats()
+                    else:
+                        answer = handle_request(self._registry, request)
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    request = None
+                    answer = {"ok": False, "error": "bad request"}
+                if isinstance(request, dict) and "id" in request:
+                    answer["id"] = request["id"]
+                writer.write(json.dumps(answer).encode() + b"\n")
+                self._service_times.append(time.perf_counter() - start)
+                self._served += 1
+                # stop reading while the client is not reading its answers
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[asyncio.current_task()]
+            writer.close()
+
+    async def evict_forever(self):
+        """Evicts idle games every eviction_interval seconds."""
+        while True:
+            await asyncio.sleep(self._eviction_interval)
+            self._registry.evict_idle(self._idle_timeout)
+
+    async def save_snapshot(self):
+        """Saves every game to the snapshot file without holding up the connections: the bytes are built
+        SNAPSHOT_CHUNK games at a time, letting requests run in between, and the file is written on another thread.
+        Writes are made one at a time, and one already started is finished even if the caller is cancelled."""
+        chunks = []
+        for chunk in self._registry.snapshot_chunks():
+            chunks.append(chunk)
+            await asyncio.sleep(0)
+        while self._writing is not None and not self._writing.done():
+            await asyncio.wait([self._writing])
+        self._writing = asyncio.get_running_loop().run_in_executor(None, replace_file, self._snapshot_path,
+                                                                   b"".join(chunks))
+        await asyncio.shield(self._writing)
+
+    async def snapshot_forever(self):
+        """Saves every game to the snapshot file every snapshot_interval seconds."""
+        while True:
+            await asyncio.sleep(self._snapshot_interval)
+            await self.save_snapshot()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Starts listening, evicting and saving snapshots. Returns the asyncio server."""
+        self._server = await asyncio.start_server(self.handle_connection, host, port, limit=LINE_LIMIT)
+        self._evictor = asyncio.ensure_future(self.evict_forever())
+        if self._snapshot_path is not None:
+            self._snapshotter = asyncio.ensure_future(self.snapshot_forever())
+        return self._server
+
+    async def stop(self):
+        """Stops listening, evicting and saving snapshots, and saves a last snapshot."""
+        if self._evictor is not None:
+            self._evictor.cancel()
+        if self._snapshotter is not None:
+            self._snapshotter.cancel()
+        if self._server is not None:
+            self._server.close()
+        # closing the connections ends their handlers
+        tasks = list(self._connections)
+        for writer in self._connections.values():
+            writer.close()
+        if tasks:
+            await asyncio.wait(tasks)
+        if self._server is not None:
+            await self._server.wait_closed()
+        # a snapshot being written when the periodic saves were cancelled is finished before the last one
+        if self._snapshot_path is not None:
+            await self.save_snapshot()
+
+
+class LoadClient:
+    """A class to represent one connection of the load generator. Many games share the connection; answers are matched
+    to requests by id."""
+    def __init__(self, reader, writer):
+        """Constructor for LoadClient class. Takes the connection streams."""
+        self._reader = reader
+        self._writer = writer
+        # future of every request sent and not answered yet, oldest first
+        self._waiting = {}
+        self._ids = itertools.count(1)
+        self._listener = asyncio.ensure_future(self.listen())
+
+    async def listen(self):
+        """Hands every answer to the request waiting for it. An answer without an id (a request the server could not
+        read) goes to the oldest request, as the server answers in order. Requests still waiting when the connection
+        is lost get a ConnectionError."""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                answer = json.loads(line)
+                request_id = answer.get("id")
+                if request_id not in self._waiting:
+                    if not self._waiting:
+                        continue
+                    request_id = next(iter(self._waiting))
+                self._waiting.pop(request_id).set_result(answer)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection closed"))
+            self._waiting.clear()
+
+    async def send(self, line, request_id=None):
+        """Sends a request line and waits for its answer, matched by request_id (or as the oldest request if the line
+        has none). Raises ConnectionError if the connection is closed."""
+        if self._listener.done():
+            raise ConnectionError("connection closed")
+        if request_id is None:
+            request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(line)
+        await self._writer.drain()
+        return await future
+
+    async def request(self, request):
+        """Sends a request and waits for its answer."""
+        request_id = next(self._ids)
+        request["id"] = request_id
+        return await self.send(json.dumps(request).encode() + b"\n", request_id)
+
+    async def close(self):
+        """Closes the connection."""
+        self._listener.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def play_remote_game(client, latencies, max_plies=200, interval=None, start_at=None):
+    """Plays one game on the server, both pawns walking their shortest path, and records the latency of every
+    request. A local QuoridorGame keeps track of the position to pick the moves.
+    Without an interval every request is sent as soon as the last one is answered (closed loop). With one, the
+    requests are due every interval seconds from start_at, and the latency counts from when a request was due, so a
+    slow answer holding up the next request is counted too (open loop)."""
+    due = time.perf_counter() if start_at is None else start_at
+
+    async def timed(request):
+        nonlocal due
+        if interval is None:
+            start = time.perf_counter()
+        else:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            start = due
+            due += interval
+        answer = await client.request(request)
+        latencies.append(time.perf_counter() - start)
+        return answer
+
+    answer = await timed({"op": "new"})
+    if not answer["ok"]:
+        return False
+    game_id = answer["game"]
+    game = QuoridorGame()
+    for _ in range(max_plies):
+        player_number = game.get_turn()
+        distances = game.get_distance_map(player_number)
+        move = min(game.legal_moves(player_number), key=lambda coordinate_tuple: distances[
+            square_of(coordinate_tuple[1], coordinate_tuple[0])])
+        game.move_pawn(player_number, move)
+        answer = await timed({"op": "move", "game": game_id, "player": player_number, "to": list(move)})
+        if not answer["ok"] or answer["state"] != "UNFINISHED":
+            break
+    await client.request({"op": "close", "game": game_id})
+    return True
+
+
+async def run_load(host="127.0.0.1", port=8765, games=1000, connections=20, rate=None):
+    """Plays the given number of games over the given number of connections and returns the latency report:
+    requests, requests per second, p50 and p99 in milliseconds as seen by the clients, and the p50 and p99 of the time
+    the server took to answer (server_p50_ms, server_p99_ms).
+    Without a rate every game starts at once and sends its next request when the last one is answered, so the client
+    latencies are mostly time spent queued behind the other games. With a rate, requests are sent at that many per
+    second in all, the games starting one after another, see play_remote_game."""
+    clients = []
+    for _ in range(connections):
+        (reader, writer) = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        clients.append(LoadClient(reader, writer))
+    latencies = []
+    start = time.perf_counter()
+    if rate is None:
+        plays = [play_remote_game(clients[number % connections], latencies) for number in range(games)]
+    else:
+        # each game sends one request every games / rate seconds, so all of them together send rate per second
+        plays = [play_remote_game(clients[number % connections], latencies, interval=games / rate,
+                                  start_at=start + number / rate) for number in range(games)]
+    await asyncio.gather(*plays)
+    elapsed = time.perf_counter() - start
+    server = await clients[0].request({"op": "stats"})
+    for client in clients:
+        await client.close()
+    if not latencies:
+        return {"requests": 0}
+    report = {"games": games, "requests": len(latencies), "requests_per_second": len(latencies) / elapsed,
+              "rate": rate, "server_p50_ms": server.get("p50_ms"), "server_p99_ms": server.get("p99_ms")}
+    report.update(percentiles(latencies))
+    return report
+
+
+async def serve(host, port, idle_timeout, max_sessions, snapshot_path=None, snapshot_interval=5.0):
+    """Runs a server until it is interrupted. Games of an existing snapshot file are hosted again."""
+    registry = SessionRegistry(max_sessions)
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        registry.load(snapshot_path)
+    server = QuoridorServer(registry, idle_timeout, snapshot_path=snapshot_path, snapshot_interval=snapshot_interval)
+    listener = await server.start(host, port)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(arguments=None):
+    """Command line entry point: "serve" runs the server, "load" drives a running server with the load generator,
+    and "selftest" runs both in one process."""
+    parser = argparse.ArgumentParser(description="Line-delimited JSON Quoridor game server.")
+    parser.add_argument("command", choices=("serve", "load", "selftest"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an unused game is evicted")
+    parser.add_argument("--max-sessions", type=int, default=100000)
+    parser.add_argument("--snapshot", help="file every game is saved to, and restored from when serving starts")
+    parser.add_argument("--snapshot-interval", type=float, default=5.0, help="seconds between snapshots")
+    parser.add_argument("--games", type=int, default=1000, help="games played by the load generator")
+    parser.add_argument("--connections", type=int, default=20, help="connections opened by the load generator")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="requests per second sent by the load generator, all games at once if not given")
+    options = parser.parse_args(arguments)
+    if options.command == "serve":
+        try:
+            asyncio.run(serve(options.host, options.port, options.idle_timeout, options.max_sessions, options.snapshot,
+                              options.snapshot_interval))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    async def selftest():
+        server = QuoridorServer(SessionRegistry(options.max_sessions), options.idle_timeout)
+        await server.start(options.host, options.port)
+        try:
+            return await run_load(options.host, options.port, options.games, options.connections, options.rate)
+        finally:
+            await server.stop()
+
+    if options.command == "load":
+        report = asyncio.run(run_load(options.host, options.port, options.games, options.connections, options.rate))
+    else:
+        report = asyncio.run(selftest())
+    print(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
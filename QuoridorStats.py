@@ -0,0 +1,186 @@
+import threading
+import time
+
+from Quoridor import QuoridorGame
+from QuoridorRecord import replace_file
+
+# steps of move_pawn and place_fence that can refuse an action, with the reason given when they do
+CHECK_STAGES = {
+    "game_in_progress": "game is over",
+    "same_player_turn": "not the player's turn",
+    "lock_borders": "off the board",
+    "validate_pawn_move": "pawn can not reach the square",
+    "has_fences_left": "no fences left",
+    "validate_fence_slot": "fence slot taken or bad direction",
+    "validate_fence_path": "fence would block a path to the goal",
+}
+# steps that only apply an action already checked
+APPLY_STAGES = ("update_pawn", "update_fence", "update_fences_left", "switch_turns", "win_logic")
+# the actions themselves, counted as a whole
+ACTION_STAGES = ("move_pawn", "place_fence")
+
+
+class PipelineStats:
+    """A class to represent the counters of the move_pawn / place_fence pipeline: calls, total time and rejections of
+    every stage. Games played on several threads count into the same stats, a lock keeps the counters whole."""
+    def __init__(self):
+        """Constructor for PipelineStats class. Starts every counter at zero."""
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._seconds = {}
+        self._rejections = {}
+
+    def reset(self):
+        """Sets every counter back to zero."""
+        with self._lock:
+            self._calls = {}
+            self._seconds = {}
+            self._rejections = {}
+
+    def record(self, stage, seconds, rejected):
+        """Counts one call of the given stage."""
+        with self._lock:
+            self._calls[stage] = self._calls.get(stage, 0) + 1
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+            if rejected:
+                self._rejections[stage] = self._rejections.get(stage, 0) + 1
+
+    def record_rejection(self, stage):
+        """Counts one action refused by the given stage."""
+        with self._lock:
+            self._rejections[stage] = self._rejections.get(stage, 0) + 1
+
+    def get_calls(self, stage):
+        """Gets the number of calls of the given stage."""
+        return self._calls.get(stage, 0)
+
+    def get_seconds(self, stage):
+        """Gets the total time spent in the given stage."""
+        return self._seconds.get(stage, 0.0)
+
+    def get_rejections(self, stage):
+        """Gets the number of actions the given stage refused. For move_pawn and place_fence, the number of actions
+        refused at any stage."""
+        return self._rejections.get(stage, 0)
+
+    def get_stages(self):
+        """Returns {stage: {"calls", "seconds", "rejections"}} for every stage called so far."""
+        with self._lock:
+            return {stage: {"calls": calls, "seconds": self._seconds[stage],
+                            "rejections": self._rejections.get(stage, 0)} for (stage, calls) in self._calls.items()}
+
+    def to_prometheus(self):
+        """Returns the counters in the Prometheus text exposition format."""
+        with self._lock:
+            calls = dict(self._calls)
+            seconds = dict(self._seconds)
+            rejections = dict(self._rejections)
+        lines = ["# HELP quoridor_stage_calls_total Calls of each move_pawn / place_fence pipeline stage.",
+                 "# TYPE quoridor_stage_calls_total counter"]
+        for stage in sorted(calls):
+            lines.append('quoridor_stage_calls_total{stage="%s"} %d' % (stage, calls[stage]))
+        lines += ["# HELP quoridor_stage_seconds_total Time spent in each pipeline stage.",
+                  "# TYPE quoridor_stage_seconds_total counter"]
+        for stage in sorted(seconds):
+            lines.append('quoridor_stage_seconds_total{stage="%s"} %.9f' % (stage, seconds[stage]))
+        lines += ["# HELP quoridor_stage_rejections_total Actions refused by each pipeline stage.",
+                  "# TYPE quoridor_stage_rejections_total counter"]
+        for stage in sorted(rejections):
+            reason = CHECK_STAGES.get(stage, "any")
+            lines.append('quoridor_stage_rejections_total{stage="%s",reason="%s"} %d' % (
+                stage, reason, rejections[stage]))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the counters to a Prometheus text file with replace_file, so a scraper never reads half of it."""
+        replace_file(path, self.to_prometheus().encode())
+
+
+class PipelineState(threading.local):
+    """A class to represent the actions being counted in the current thread: how many move_pawn / place_fence calls are
+    running and the last check stage that failed in them."""
+    def __init__(self):
+        """Constructor for PipelineState class. Starts outside any action."""
+        self.depth = 0
+        self.failed = None
+
+
+def instrument_stage(stats, stage, method, pipeline):
+    """Returns the method wrapped so each call made by move_pawn or place_fence is timed and counted in stats. Calls
+    made outside an action (legal_moves, legal_fences, pop, from_bytes, ...) run the plain method and are not counted.
+    A check stage returning False or None is remembered as the failed stage of the action."""
+    clock = time.perf_counter
+    check = stage in CHECK_STAGES
+
+    def wrapper(*args, **kwargs):
+        if not pipeline.depth:
+            return method(*args, **kwargs)
+        start = clock()
+        result = method(*args, **kwargs)
+        stats.record(stage, clock() - start, False)
+        if check and (result is None or result is False):
+            pipeline.failed = stage
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def instrument_action(stats, stage, method, pipeline):
+    """Returns move_pawn or place_fence wrapped so each call is timed and counted in stats. A refused action is counted
+    as a rejection of the action and of the check stage that failed in it."""
+    clock = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        failed = pipeline.failed
+        pipeline.failed = None
+        pipeline.depth += 1
+        start = clock()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            pipeline.depth -= 1
+        rejected = result is False
+        stats.record(stage, clock() - start, rejected)
+        if rejected and pipeline.failed is not None:
+            stats.record_rejection(pipeline.failed)
+        pipeline.failed = failed
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+_originals = {}
+
+
+def enable_instrumentation(stats=None):
+    """Starts counting the pipeline stages of every QuoridorGame into stats (a new PipelineStats by default) and
+    returns it. Until this is called the pipeline runs the plain methods and costs nothing extra."""
+    if stats is None:
+        stats = PipelineStats()
+    disable_instrumentation()
+    pipeline = PipelineState()
+    for stage in list(CHECK_STAGES) + list(APPLY_STAGES):
+        method = getattr(QuoridorGame, stage)
+        _originals[stage] = method
+        setattr(QuoridorGame, stage, instrument_stage(stats, stage, method, pipeline))
+    for stage in ACTION_STAGES:
+        method = getattr(QuoridorGame, stage)
+        _originals[stage] = method
+        setattr(QuoridorGame, stage, instrument_action(stats, stage, method, pipeline))
+    return stats
+
+
+def disable_instrumentation():
+    """Puts the plain QuoridorGame methods back."""
+    for (stage, method) in _originals.items():
+        setattr(QuoridorGame, stage, method)
+    _originals.clear()
+
+
+def is_instrumented():
+    """Checks if the pipeline is being counted."""
+    return bool(_originals)
@@ -0,0 +1,279 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import deque
+
+from Quoridor import FULL_MASK, GOAL_MASKS, H_BORDER, V_BORDER, Bitboard, QuoridorGame, square_of, \
+    square_of_mask
+from QuoridorAI import play_action
+from QuoridorRecord import GameRecordReader, index_path
+
+# every tablebase file starts with this, followed by one table per fence layout
+MAGIC = b"QTB1"
+# a table holds one entry per (turn, pawn 1 square, pawn 2 square)
+STATES = 2 * 81 * 81
+# an entry is 0 for a draw, else ((plies to the end + 1) << 1) | 1 if the player to move wins, without the | 1 if it
+# loses
+ENTRY = struct.Struct("<H")
+TABLE = struct.Struct("<%dH" % STATES)
+# the index file holds the layout (horizontal then vertical fences without the borders, 11 bytes each) and offset of
+# every table
+INDEX_ENTRY = struct.Struct("<11s11sQ")
+
+
+def layout_key(h_fences, v_fences):
+    """Returns the index key of a fence layout given as Bitboard masks, borders included or not."""
+    return (h_fences & ~H_BORDER & FULL_MASK).to_bytes(11, "little"), (v_fences & ~V_BORDER).to_bytes(11, "little")
+
+
+def game_layout_key(game):
+    """Returns the index key of the fence layout of a game."""
+    bitboard = game.get_bitboard()
+    return layout_key(bitboard.get_h_fences(), bitboard.get_v_fences())
+
+
+def state_index(turn, pawn1, pawn2):
+    """Returns the entry number of a position in a table."""
+    return (turn - 1) * 6561 + pawn1 * 81 + pawn2
+
+
+def encode_entry(won, plies):
+    """Returns the entry of a position won or lost by the player to move in the given number of plies."""
+    return ((plies + 1) << 1) | (1 if won else 0)
+
+
+def decode_entry(entry):
+    """Returns ("win", "loss" or "draw", plies to the end) of an entry, plies being None for a draw."""
+    if entry == 0:
+        return "draw", None
+    if entry & 1:
+        return "win", (entry >> 1) - 1
+    return "loss", (entry >> 1) - 1
+
+
+def solve_layout(h_fences, v_fences):
+    """Solves the pawn race on the given fence layout by retrograde analysis and returns the list of the STATES entries.
+    Finished games are lost by the player to move; going backwards from them, a position is won if one move reaches a
+    lost one and lost once every move reaches a won one. Positions never reached that way are draws. Both pawns on the
+    same square can not happen and are left as draws."""
+    bitboard = Bitboard()
+    for (direction, fences) in (("h", h_fences & ~H_BORDER & FULL_MASK), ("v", v_fences & ~V_BORDER)):
+        while fences:
+            lowest = fences & -fences
+            bitboard.set_fence(direction, square_of_mask(lowest))
+            fences ^= lowest
+    entries = [0] * STATES
+    remaining = [0] * STATES
+    parents = [[] for _ in range(STATES)]
+    queue = deque()
+    for turn in (1, 2):
+        for pawn1 in range(81):
+            for pawn2 in range(81):
+                if pawn1 == pawn2:
+                    continue
+                state = state_index(turn, pawn1, pawn2)
+                if (1 << pawn1) & GOAL_MASKS[1] or (1 << pawn2) & GOAL_MASKS[2]:
+                    # the game is over: the player to move lost, unless it is its own pawn on its goal row
+                    own = pawn1 if turn == 1 else pawn2
+                    entries[state] = encode_entry((1 << own) & GOAL_MASKS[turn], 0)
+                    queue.append(state)
+                    continue
+                bitboard.set_pawn(1, 1 << pawn1)
+                bitboard.set_pawn(2, 1 << pawn2)
+                mask = bitboard.pawn_moves(turn)
+                while mask:
+                    lowest = mask & -mask
+                    mask ^= lowest
+                    if turn == 1:
+                        child = state_index(2, square_of_mask(lowest), pawn2)
+                    else:
+                        child = state_index(1, pawn1, square_of_mask(lowest))
+                    parents[child].append(state)
+                    remaining[state] += 1
+    # breadth first, so wins are found by their shortest way and losses by their longest
+    while queue:
+        state = queue.popleft()
+        entry = entries[state]
+        plies = (entry >> 1) - 1
+        for parent in parents[state]:
+            if entries[parent]:
+                continue
+            if not entry & 1:
+                entries[parent] = encode_entry(True, plies + 1)
+                queue.append(parent)
+            else:
+                remaining[parent] -= 1
+                if remaining[parent] == 0:
+                    entries[parent] = encode_entry(False, plies + 1)
+                    queue.append(parent)
+    return entries
+
+
+class TablebaseWriter:
+    """A class to represent an append-only tablebase file, with its index file of fence layouts."""
+    def __init__(self, path):
+        """Constructor for TablebaseWriter class. Opens the tablebase file for appending, creating it if needed."""
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._index = open(index_path(path), "ab")
+
+    def add_layout(self, h_fences, v_fences):
+        """Solves the given fence layout, appends its table and returns its offset in the file."""
+        offset = self._file.tell()
+        self._file.write(TABLE.pack(*solve_layout(h_fences, v_fences)))
+        self._index.write(INDEX_ENTRY.pack(*layout_key(h_fences, v_fences), offset))
+        return offset
+
+    def close(self):
+        """Closes the tablebase and index files."""
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Tablebase:
+    """A class to represent a tablebase file opened for lookups. The file is memory-mapped and the index of fence
+    layouts is read into a dictionary, so a lookup is one dictionary access and one two-byte read."""
+    def __init__(self, path):
+        """Constructor for Tablebase class. Maps the tablebase file and reads its index."""
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("not a tablebase file: " + path)
+        self._offsets = {}
+        if os.path.exists(index_path(path)):
+            with open(index_path(path), "rb") as index:
+                for (h_key, v_key, offset) in INDEX_ENTRY.iter_unpack(index.read()):
+                    # a table cut short by a crash is left out
+                    if offset + TABLE.size <= len(self._data):
+                        self._offsets[(h_key, v_key)] = offset
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def get_layouts(self):
+        """Gets the index keys of every fence layout with a table."""
+        return set(self._offsets)
+
+    def has_layout(self, game):
+        """Checks that the fence layout of the game has a table."""
+        return game_layout_key(game) in self._offsets
+
+    def get_entry(self, game):
+        """Gets the entry of the game's position, or None if its fence layout has no table."""
+        offset = self._offsets.get(game_layout_key(game))
+        if offset is None:
+            return None
+        (x_coord, y_coord) = game.get_pawn_position(1)
+        (x_other, y_other) = game.get_pawn_position(2)
+        state = state_index(game.get_turn(), square_of(x_coord, y_coord), square_of(x_other, y_other))
+        return ENTRY.unpack_from(self._data, offset + state * ENTRY.size)[0]
+
+    def probe(self, game):
+        """Returns ("win", "loss" or "draw", plies to the end) for the player to move, or None if the game has a fence
+        left or its fence layout has no table. The plies are None for a draw."""
+        if game.get_fences_left(1) or game.get_fences_left(2):
+            return None
+        entry = self.get_entry(game)
+        if entry is None:
+            return None
+        return decode_entry(entry)
+
+    def best_move(self, game):
+        """Returns the coordinate tuple of the best pawn move for the player to move: the quickest win, else a draw,
+        else the slowest loss. Returns None when probe has no answer or there is no move."""
+        if self.probe(game) is None:
+            return None
+        player_number = game.get_turn()
+        offset = self._offsets[game_layout_key(game)]
+        (x_coord, y_coord) = game.get_pawn_position(player_number)
+        (x_other, y_other) = game.get_pawn_position(3 - player_number)
+        other = square_of(x_other, y_other)
+        best = None
+        best_score = None
+        for coordinate_tuple in game.legal_moves(player_number):
+            square = square_of(coordinate_tuple[1], coordinate_tuple[0])
+            if player_number == 1:
+                state = state_index(2, square, other)
+            else:
+                state = state_index(1, other, square)
+            (result, plies) = decode_entry(ENTRY.unpack_from(self._data, offset + state * ENTRY.size)[0])
+            # the entry is for the other player, who moves next
+            if result == "loss":
+                score = STATES - plies
+            elif result == "win":
+                score = plies - STATES
+            else:
+                score = 0
+            if best_score is None or score > best_score:
+                best = coordinate_tuple
+                best_score = score
+        return best
+
+    def close(self):
+        """Unmaps and closes the tablebase file."""
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def record_layouts(path):
+    """Yields the (horizontal, vertical) fence masks of every game in a binary record file at the moment both players
+    had placed all their fences, for games that got there."""
+    with GameRecordReader(path) as reader:
+        for (_, actions) in reader:
+            game = QuoridorGame()
+            for action in actions:
+                play_action(game, game.get_turn(), action)
+                if game.get_fences_left(1) == 0 and game.get_fences_left(2) == 0:
+                    bitboard = game.get_bitboard()
+                    yield bitboard.get_h_fences(), bitboard.get_v_fences()
+                    break
+
+
+def main(arguments=None):
+    """Command line entry point: solves the empty board and the fence layouts reached in binary record files, and
+    appends the ones not yet in the tablebase."""
+    parser = argparse.ArgumentParser(description="Builds a Quoridor endgame tablebase for fence-exhausted positions.")
+    parser.add_argument("output", help="tablebase file, created or appended to")
+    parser.add_argument("--records", action="append", default=[], help="binary record file to take layouts from")
+    options = parser.parse_args(arguments)
+    known = set()
+    if os.path.exists(options.output):
+        with Tablebase(options.output) as tablebase:
+            known = tablebase.get_layouts()
+    empty = Bitboard()
+    layouts = [(empty.get_h_fences(), empty.get_v_fences())]
+    for path in options.records:
+        layouts.extend(record_layouts(path))
+    start = time.perf_counter()
+    added = 0
+    with TablebaseWriter(options.output) as writer:
+        for (h_fences, v_fences) in layouts:
+            key = layout_key(h_fences, v_fences)
+            if key in known:
+                continue
+            known.add(key)
+            writer.add_layout(h_fences, v_fences)
+            added += 1
+    print("%d layouts added, %d in total, %.1f seconds" % (added, len(known), time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import argparse
+import importlib
+import itertools
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Quoridor import QuoridorGame, square_of
+from QuoridorAI import QuoridorAI, play_action
+from QuoridorRecord import GameRecordWriter
+
+# games longer than this many actions are counted as draws
+MAX_PLIES = 400
+ELO_START = 1500.0
+ELO_K = 16.0
+
+
+class RandomPolicy:
+    """A class to represent a player choosing a random pawn move, or now and then a random fence."""
+    def __init__(self, seed=None, fence_rate=0.2):
+        """Constructor for RandomPolicy class. Takes the random seed and how often a fence is tried."""
+        self._random = random.Random(seed)
+        self._fence_rate = fence_rate
+
+    def choose_move(self, game, player_number):
+        """Returns a random valid action for the given player, or None if there is none."""
+        if game.get_fences_left(player_number) > 0 and self._random.random() < self._fence_rate:
+            bitboard = game.get_bitboard()
+            for _ in range(10):
+                direction = self._random.choice("hv")
+                (x_coord, y_coord) = (self._random.randrange(9), self._random.randrange(9))
+                if bitboard.is_fence_free(direction, square_of(x_coord, y_coord)) and \
+                        game.validate_fence_path(direction, square_of(x_coord, y_coord)) is not None:
+                    return "fence", direction, (y_coord, x_coord)
+        moves = game.legal_moves(player_number)
+        if not moves:
+            return None
+        return "move", self._random.choice(moves)
+
+
+class GreedyPolicy:
+    """A class to represent a player always stepping along its shortest path to the goal row."""
+    def __init__(self, seed=None):
+        """Constructor for GreedyPolicy class. Takes the random seed used to break ties."""
+        self._random = random.Random(seed)
+
+    def choose_move(self, game, player_number):
+        """Returns the pawn move getting closest to the goal row, or None if there is none."""
+        distances = game.get_distance_map(player_number)
+        best = []
+        best_distance = None
+        for coordinate_tuple in game.legal_moves(player_number):
+            (y_coord, x_coord) = coordinate_tuple
+            distance = distances[square_of(x_coord, y_coord)]
+            if best_distance is None or distance < best_distance:
+                best = [coordinate_tuple]
+                best_distance = distance
+            elif distance == best_distance:
+                best.append(coordinate_tuple)
+        if not best:
+            return None
+        return "move", self._random.choice(best)
+
+
+def make_policy(spec, seed):
+    """Builds a policy from its name: "random", "greedy", "search" or "search:<seconds per move>", or
+    "module:attribute" for any class or function returning an object with a choose_move(game, player_number)
+    method. A "#<number>" label added by label_policies is left out."""
+    (name, _, argument) = spec.partition("#")[0].partition(":")
+    if name == "random":
+        return RandomPolicy(seed)
+    if name == "greedy":
+        return GreedyPolicy(seed)
+    if name == "search":
+        if argument:
+            return QuoridorAI(time_limit=float(argument))
+        return QuoridorAI()
+    if not argument:
+        raise ValueError("unknown policy: " + spec)
+    return getattr(importlib.import_module(name), argument)()
+
+
+def label_policies(specs):
+    """Returns the policy names with a "#<number>" label added to every name given more than once, such as random#1
+    and random#2, so a policy playing itself gets one row per side in the rating table."""
+    labels = []
+    for (index, spec) in enumerate(specs):
+        if specs.count(spec) > 1:
+            spec += "#" + str(specs[:index].count(spec) + 1)
+        labels.append(spec)
+    return labels
+
+
+def game_seed(seed, game_index):
+    """Returns the seed of one game, derived from the tournament seed only so results do not depend on scheduling."""
+    return random.Random(seed * 1000003 + game_index).getrandbits(32)
+
+
+def play_game(game_index, first, second, seed, max_plies=MAX_PLIES):
+    """Plays one game between two policy names, the first one being player 1. Returns the game record: index, policy
+    names, winner (0 for a draw) and the list of (player_number, action) made."""
+    rng = random.Random(game_seed(seed, game_index))
+    policies = {1: make_policy(first, rng.getrandbits(32)), 2: make_policy(second, rng.getrandbits(32))}
+    game = QuoridorGame()
+    actions = []
+    winner = 0
+    while len(actions) < max_plies:
+        player_number = game.get_turn()
+        action = policies[player_number].choose_move(game, player_number)
+        if action is None or not play_action(game, player_number, action):
+            # a policy with no valid action loses the game
+            winner = 3 - player_number
+            break
+        actions.append((player_number, action))
+        if game.is_winner(player_number):
+            winner = player_number
+            break
+    return {"game": game_index, "players": [first, second], "winner": winner, "actions": actions}
+
+
+def play_chunk(tasks):
+    """Plays a list of (game_index, first, second, seed, max_plies) tasks in a worker process."""
+    return [play_game(*task) for task in tasks]
+
+
+def schedule(policies, games, seed, max_plies=MAX_PLIES):
+    """Returns the tasks of a round robin: every pair of policies plays the given number of games, changing sides
+    every game."""
+    tasks = []
+    for pair in itertools.combinations(policies, 2):
+        for number in range(games):
+            (first, second) = pair if number % 2 == 0 else pair[::-1]
+            tasks.append((len(tasks), first, second, seed, max_plies))
+    return tasks
+
+
+def run_tournament(tasks, workers=None, chunk_size=8):
+    """Plays the tasks on a process pool and yields each chunk of game records as soon as it is done. workers=0 plays
+    every game in this process."""
+    chunks = [tasks[start:start + chunk_size] for start in range(0, len(tasks), chunk_size)]
+    if workers == 0:
+        for chunk in chunks:
+            yield play_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def rate(records):
+    """Returns the Elo rating and win/draw/loss counts of every policy. Games are rated in game index order so the
+    ratings are the same however the games were scheduled."""
+    table = {}
+    for record in sorted(records, key=lambda record: record["game"]):
+        (first, second) = record["players"]
+        for name in (first, second):
+            table.setdefault(name, {"elo": ELO_START, "games": 0, "wins": 0, "draws": 0, "losses": 0})
+        if record["winner"] == 1:
+            (score, first_key, second_key) = (1.0, "wins", "losses")
+        elif record["winner"] == 2:
+            (score, first_key, second_key) = (0.0, "losses", "wins")
+        else:
+            (score, first_key, second_key) = (0.5, "draws", "draws")
+        expected = 1.0 / (1.0 + 10 ** ((table[second]["elo"] - table[first]["elo"]) / 400.0))
+        table[first]["elo"] += ELO_K * (score - expected)
+        table[second]["elo"] -= ELO_K * (score - expected)
+        for (name, key) in ((first, first_key), (second, second_key)):
+            table[name]["games"] += 1
+            table[name][key] += 1
+    return table
+
+
+def format_table(table):
+    """Returns the rating table as text, best rating first."""
+    lines = ["%-24s %7s %6s %6s %6s %6s %7s" % ("policy", "elo", "games", "wins", "draws", "losses", "win%")]
+    for (name, row) in sorted(table.items(), key=lambda item: -item[1]["elo"]):
+        lines.append("%-24s %7.1f %6d %6d %6d %6d %6.1f%%" % (
+            name, row["elo"], row["games"], row["wins"], row["draws"], row["losses"],
+            100.0 * row["wins"] / row["games"] if row["games"] else 0.0))
+    return "\n".join(lines)
+
+
+def main(arguments=None):
+    """Command line entry point of the tournament runner."""
+    parser = argparse.ArgumentParser(description="Plays a round robin of Quoridor games between policies.")
+    parser.add_argument("policies", nargs="+",
+                        help="random, greedy, search, search:<seconds per move> or module:attribute")
+    parser.add_argument("--games", type=int, default=10, help="games per pair of policies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 to play in this process")
+    parser.add_argument("--chunk-size", type=int, default=8, help="games sent to a worker at once")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--records", help="JSON lines file the game records are appended to")
+    parser.add_argument("--binary", help="binary record file (see QuoridorRecord) the games are appended to")
+    options = parser.parse_args(arguments)
+    if len(options.policies) < 2:
+        parser.error("at least two policies are needed")
+    tasks = schedule(label_policies(options.policies), options.games, options.seed, options.max_plies)
+    records = []
+    output = open(options.records, "a") if options.records else None
+    binary = GameRecordWriter(options.binary) if options.binary else None
+    try:
+        for chunk in run_tournament(tasks, options.workers, options.chunk_size):
+            records.extend(chunk)
+            if output is not None:
+                for record in chunk:
+                    output.write(json.dumps(record) + "\n")
+                output.flush()
+            if binary is not None:
+                for record in chunk:
+                    binary.write_game([action for (_, action) in record["actions"]], record["winner"])
+                binary.flush()
+    finally:
+        if output is not None:
+            output.close()
+        if binary is not None:
+            binary.close()
+    print(format_table(rate(records)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
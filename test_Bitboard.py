@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from Quoridor import BOARD_SIZE, GAME_BYTES, H_BORDER, START_BOARD, START_SQUARES, V_BORDER, Bitboard, QuoridorGame, \
+    freeze_row, square_of
+from test_QuoridorPushPop import random_position
+
+# random positions read back through the _board layout
+POSITION_COUNT = 80
+
+
+def bitboard_state(bitboard):
+    """Returns the pawns and fences of a Bitboard."""
+    return (bitboard.get_pawn(1), bitboard.get_pawn(2), bitboard.get_h_fences(), bitboard.get_v_fences())
+
+
+def frozen(board):
+    """Returns a board made by to_board as nested tuples, the way get_board gives it."""
+    return tuple(freeze_row(row) for row in board)
+
+
+class BitboardLayoutTest(unittest.TestCase):
+    """Checks that load_board and to_board translate between the Bitboard and the _board layout of QuoridorGame."""
+
+    def test_start_board(self):
+        """A new Bitboard has the pawns on their starting squares, only the border fences, and draws START_BOARD."""
+        bitboard = Bitboard()
+        self.assertEqual(bitboard_state(bitboard),
+                         (1 << START_SQUARES[1], 1 << START_SQUARES[2], H_BORDER, V_BORDER))
+        self.assertEqual(frozen(bitboard.to_board()), START_BOARD)
+        self.assertEqual(tuple(QuoridorGame().get_board()), START_BOARD)
+        loaded = Bitboard()
+        loaded.load_board(START_BOARD)
+        self.assertEqual(bitboard_state(loaded), bitboard_state(bitboard))
+
+    def test_round_trip(self):
+        """load_board(to_board()) gives back the same pawns and fences, and to_board(load_board(board)) the same board,
+        for random positions."""
+        rng = random.Random(1)
+        for _ in range(POSITION_COUNT):
+            game = random_position(rng)
+            bitboard = game._bitboard
+            loaded = Bitboard()
+            loaded.load_board(bitboard.to_board())
+            self.assertEqual(bitboard_state(loaded), bitboard_state(bitboard))
+            board = game.get_board()
+            loaded = Bitboard()
+            loaded.load_board(board)
+            self.assertEqual(frozen(loaded.to_board()), tuple(board))
+
+    def test_first_column(self):
+        """The first column shows the left border as "|" in its first slot, and "-" there when the square has a fence
+        on its top edge. load_board reads only "-" as a fence."""
+        bitboard = Bitboard()
+        bitboard.set_fence("h", square_of(3, 0))
+        board = bitboard.to_board()
+        for x_coord in range(BOARD_SIZE):
+            if x_coord == 3:
+                self.assertEqual(board[x_coord][0][0], "-")
+            else:
+                self.assertEqual(board[x_coord][0][0], "|")
+            self.assertEqual(board[x_coord][0][1], "")
+        loaded = Bitboard()
+        loaded.load_board(board)
+        self.assertEqual(bitboard_state(loaded), bitboard_state(bitboard))
+        self.assertEqual(loaded.get_h_fences(), H_BORDER | 1 << square_of(3, 0))
+
+    def test_is_winner_reads_the_pawn(self):
+        """is_winner looks at where the pawn is, not at the stored state of the game."""
+        empty = bytes(11)
+        game = QuoridorGame.from_bytes(GAME_BYTES.pack(square_of(8, 2), START_SQUARES[2], empty, empty, 9, 9, 2, 1))
+        self.assertTrue(game.is_winner(1))
+        self.assertFalse(game.is_winner(2))
+        game._current_state = "UNFINISHED"
+        self.assertTrue(game.is_winner(1))
+        game = QuoridorGame()
+        game._current_state = "Player_2 won"
+        self.assertFalse(game.is_winner(2))
+        self.assertFalse(game.is_winner(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import random
+import sys
+import threading
+import unittest
+
+from Quoridor import Bitboard, DistanceCache
+
+# threads sharing one cache, and lookups each of them makes
+THREAD_COUNT = 8
+LOOKUP_COUNT = 20000
+
+
+class DistanceCacheTest(unittest.TestCase):
+    """Checks the distance map cache shared by the games of a process."""
+
+    def test_least_recently_used_dropped(self):
+        """A full cache drops the layout looked up least recently."""
+        cache = DistanceCache(2)
+        cache.store(1, "one")
+        cache.store(2, "two")
+        self.assertEqual(cache.lookup(1), "one")
+        cache.store(3, "three")
+        self.assertIsNone(cache.lookup(2))
+        self.assertEqual(cache.lookup(1), "one")
+        self.assertEqual(cache.lookup(3), "three")
+        self.assertEqual((cache.get_hits(), cache.get_misses()), (3, 1))
+
+    def test_threads(self):
+        """Threads looking up and storing layouts in a tiny cache never fail, and every lookup is counted."""
+        cache = DistanceCache(4)
+        errors = []
+        # switch threads as often as possible so lookups and evictions interleave
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        def work(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(LOOKUP_COUNT):
+                    key = rng.randrange(8)
+                    if cache.lookup(key) is None:
+                        cache.store(key, [None, [key], [key]])
+            except Exception as error:
+                errors.append(error)
+        threads = [threading.Thread(target=work, args=(seed,)) for seed in range(THREAD_COUNT)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(cache), 4)
+        self.assertEqual(cache.get_hits() + cache.get_misses(), THREAD_COUNT * LOOKUP_COUNT)
+
+    def test_get_maps_searches_once(self):
+        """get_maps searches a layout once and hands out the same maps afterwards."""
+        cache = DistanceCache()
+        bitboard = Bitboard()
+        bitboard.set_fence("h", 40)
+        maps = cache.get_maps(bitboard)
+        self.assertEqual(maps[1], bitboard.goal_distances(1))
+        self.assertEqual(maps[2], bitboard.goal_distances(2))
+        self.assertIs(cache.get_maps(bitboard), maps)
+
+
+if __name__ == "__main__":
+    unittest.main()
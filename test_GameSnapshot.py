@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from Quoridor import QuoridorGame
+from test_QuoridorPushPop import random_position
+
+# positions whose snapshots are compared with the game
+POSITION_COUNT = 100
+
+
+class GameSnapshotTest(unittest.TestCase):
+    """Checks the snapshots a game publishes after its actions."""
+
+    def test_version_counts_accepted_actions(self):
+        """The version goes up for every move_pawn or place_fence accepted, and not for refused actions or push_* and
+        pop, which leave the published snapshot as it was."""
+        game = QuoridorGame()
+        start = game.snapshot()
+        self.assertEqual(start.get_version(), 0)
+        self.assertFalse(game.move_pawn(2, (4, 7)))
+        self.assertFalse(game.move_pawn(1, (4, 2)))
+        self.assertFalse(game.place_fence(1, "d", (3, 3)))
+        self.assertIs(game.snapshot(), start)
+        self.assertTrue(game.move_pawn(1, (4, 1)))
+        self.assertEqual(game.snapshot().get_version(), 1)
+        self.assertTrue(game.place_fence(2, "h", (3, 3)))
+        self.assertFalse(game.place_fence(1, "h", (3, 3)))
+        published = game.snapshot()
+        self.assertEqual(published.get_version(), 2)
+        self.assertTrue(game.push_move(1, (4, 2)))
+        self.assertTrue(game.push_fence(2, "v", (5, 5)))
+        self.assertTrue(game.push_null())
+        self.assertIs(game.snapshot(), published)
+        for _ in range(3):
+            self.assertTrue(game.pop())
+        self.assertIs(game.snapshot(), published)
+        self.assertTrue(game.move_pawn(1, (4, 2)))
+        self.assertEqual(game.snapshot().get_version(), 3)
+
+    def test_same_as_game(self):
+        """The board, pawns, fences left, turn and state of a snapshot are the game's, and the board can not be
+        changed."""
+        rng = random.Random(20)
+        for _ in range(POSITION_COUNT):
+            game = random_position(rng)
+            snapshot = game.snapshot()
+            self.assertEqual(snapshot.get_board(), tuple(game.get_board()))
+            for player_number in (1, 2):
+                self.assertEqual(snapshot.get_pawn_position(player_number), game.get_pawn_position(player_number))
+                self.assertEqual(snapshot.get_fences_left(player_number), game.get_fences_left(player_number))
+            self.assertEqual(snapshot.get_turn(), game.get_turn())
+            self.assertEqual(snapshot.get_current_state(), game.get_current_state())
+        with self.assertRaises(TypeError):
+            snapshot.get_board()[0][0][0] = "-"
+
+    def test_diff(self):
+        """diff lists the pawns moved, fences added, fences left changed, turn and state since an older snapshot, and
+        the other way round the fences removed."""
+        game = QuoridorGame()
+        older = game.snapshot()
+        self.assertTrue(game.move_pawn(1, (4, 1)))
+        self.assertTrue(game.place_fence(2, "h", (3, 3)))
+        self.assertTrue(game.place_fence(1, "v", (5, 5)))
+        newer = game.snapshot()
+        self.assertEqual(newer.diff(older), {
+            "version": 3, "since": 0, "pawns": {1: (4, 1)}, "fences_added": [("h", (3, 3)), ("v", (5, 5))],
+            "fences_removed": [], "fences_left": {1: 9, 2: 9}, "turn": 2, "state": "UNFINISHED"})
+        self.assertEqual(older.diff(newer), {
+            "version": 0, "since": 3, "pawns": {1: (4, 0)}, "fences_added": [],
+            "fences_removed": [("h", (3, 3)), ("v", (5, 5))], "fences_left": {1: 10, 2: 10}, "turn": 1,
+            "state": "UNFINISHED"})
+        self.assertEqual(newer.diff(newer)["pawns"], {})
+        self.assertEqual(newer.diff(newer)["fences_added"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from Quoridor import QuoridorGame
+from QuoridorAI import QuoridorAI
+from QuoridorBenchmark import crowded_game
+
+
+class QuoridorAITest(unittest.TestCase):
+    """Checks the actions the search tries."""
+
+    def test_every_legal_action_ordered(self):
+        """ordered_actions lists every legal pawn move and fence, fences away from the opponent's path included."""
+        for game in (QuoridorGame(), crowded_game()[0]):
+            player_number = game.get_turn()
+            actions = QuoridorAI().ordered_actions(game, player_number)
+            for coordinate_tuple in game.legal_moves(player_number):
+                self.assertIn(("move", coordinate_tuple), actions)
+            for (direction, coordinate_tuple) in game.legal_fences(player_number):
+                self.assertIn(("fence", direction, coordinate_tuple), actions)
+            self.assertEqual(len(actions), len(set(actions)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import random
+import unittest
+
+from Quoridor import BOARD_SIZE, QuoridorGame
+
+try:
+    import numpy as np
+    from QuoridorBatch import BatchQuoridor
+except ImportError:
+    np = None
+
+# games played side by side, and actions tried in each of them
+GAME_COUNT = 40
+STEP_COUNT = 100
+STATES = {"UNFINISHED": 0, "Player_1 won": 1, "Player_2 won": 2}
+
+
+def random_action(rng, game):
+    """Returns (player_number, is_fence, direction, coordinate_tuple) of a legal action of the game most of the time,
+    else of an action that is usually invalid: wrong player, off the board, taken slot or unknown direction."""
+    player_number = game.get_turn()
+    roll = rng.random()
+    if roll < 0.45 and game.legal_moves(player_number):
+        return player_number, False, "h", rng.choice(game.legal_moves(player_number))
+    if roll < 0.75 and game.legal_fences(player_number):
+        (direction, coordinate_tuple) = rng.choice(game.legal_fences(player_number))
+        return player_number, True, direction, coordinate_tuple
+    if roll < 0.85:
+        player_number = 3 - player_number
+    coordinate_tuple = (rng.randrange(-1, BOARD_SIZE + 1), rng.randrange(-1, BOARD_SIZE + 1))
+    return player_number, rng.random() < 0.5, rng.choice("hvd"), coordinate_tuple
+
+
+@unittest.skipUnless(np, "BatchQuoridor needs NumPy")
+class BatchQuoridorTest(unittest.TestCase):
+    """Checks that BatchQuoridor follows the same rules as QuoridorGame."""
+
+    def assert_same_game(self, batch, index, game):
+        """Checks that game number index of the batch is in the same position as the QuoridorGame."""
+        for player_number in (1, 2):
+            self.assertEqual(tuple(batch.get_pawns()[index, player_number - 1]), game._pawn_positions[player_number])
+            self.assertEqual(batch.get_fences_left()[index, player_number - 1], game.get_fences_left(player_number))
+        self.assertEqual(batch.get_turns()[index], game.get_turn())
+        self.assertEqual(batch.get_states()[index], STATES[game.get_current_state()])
+        h_fences = game._bitboard.get_h_fences()
+        v_fences = game._bitboard.get_v_fences()
+        for row in range(BOARD_SIZE + 1):
+            for column in range(BOARD_SIZE + 1):
+                square = row * BOARD_SIZE + column
+                if column < BOARD_SIZE:
+                    self.assertEqual(batch.get_h_fences()[index, row, column], bool(h_fences >> square & 1))
+                if row < BOARD_SIZE:
+                    expected = column == BOARD_SIZE or bool(v_fences >> square & 1)
+                    self.assertEqual(batch.get_v_fences()[index, row, column], expected)
+
+    def test_same_as_quoridor_game(self):
+        """A few thousand seeded actions, invalid ones included, are accepted or refused by both and leave the same
+        positions. Finished games start again."""
+        rng = random.Random(4)
+        batch = BatchQuoridor(GAME_COUNT)
+        games = [QuoridorGame() for _ in range(GAME_COUNT)]
+        for _ in range(STEP_COUNT):
+            actions = [random_action(rng, game) for game in games]
+            (players, fences, directions, coordinates) = zip(*actions)
+            valid = batch.apply(players, fences, directions, coordinates)
+            for (index, (player_number, is_fence, direction, coordinate_tuple)) in enumerate(actions):
+                game = games[index]
+                if is_fence:
+                    expected = game.place_fence(player_number, direction, coordinate_tuple)
+                else:
+                    expected = game.move_pawn(player_number, coordinate_tuple)
+                self.assertEqual(valid[index], expected, (index, actions[index]))
+                self.assert_same_game(batch, index, game)
+                if game.get_current_state() != "UNFINISHED":
+                    games[index] = QuoridorGame()
+                    batch.reset([index])
+
+    def test_fence_cutting_pawn_off_refused(self):
+        """The fence closing the last way out of player 1's corner is refused, and the fences placed before it stay."""
+        batch = BatchQuoridor(2)
+        games = [QuoridorGame(), QuoridorGame()]
+        fences = [("h", (3, 1)), ("h", (4, 1)), ("h", (5, 1)), ("v", (3, 0)), ("v", (6, 0))]
+        for (number, (direction, coordinate_tuple)) in enumerate(fences):
+            player_number = number % 2 + 1
+            valid = batch.place_fences(player_number, direction, [coordinate_tuple, coordinate_tuple])
+            expected = [game.place_fence(player_number, direction, coordinate_tuple) for game in games]
+            self.assertEqual(list(valid), expected)
+            self.assertEqual(valid.all(), number < len(fences) - 1)
+        for (index, game) in enumerate(games):
+            self.assert_same_game(batch, index, game)
+
+    def test_repeated_game_refused(self):
+        """A call giving the same game twice raises ValueError and changes nothing."""
+        batch = BatchQuoridor(3)
+        with self.assertRaises(ValueError):
+            batch.move_pawns(1, [(4, 1), (4, 1)], [0, 0])
+        with self.assertRaises(ValueError):
+            batch.place_fences(1, "h", [(2, 2), (3, 2)], [1, 1])
+        self.assertTrue(np.array_equal(batch.get_turns(), [1, 1, 1]))
+        self.assertTrue(np.array_equal(batch.get_fences_left(), BatchQuoridor(3).get_fences_left()))
+
+    def test_unknown_player_refused(self):
+        """Player numbers other than 1 and 2 are refused like QuoridorGame refuses them, without failing the rest of
+        the call."""
+        batch = BatchQuoridor(4)
+        game = QuoridorGame()
+        players = [0, 3, -1, 1]
+        valid = batch.move_pawns(players, [(4, 1)] * 4)
+        self.assertEqual(list(valid), [game.move_pawn(player_number, (4, 1)) for player_number in players[:3]] +
+                         [True])
+        valid = batch.place_fences([1, 3, 0, 2], "h", [(3, 3)] * 4)
+        self.assertEqual(list(valid), [True, False, False, True])
+        self.assertFalse(game.place_fence(3, "h", (3, 3)))
+        self.assertTrue(np.array_equal(batch.get_turns(), [2, 1, 1, 1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from QuoridorBenchmark import GAME_MEMORY_LIMIT, check_memory, compare
+
+
+def report(seconds, memory):
+    """Returns a benchmark report with the given {name: seconds} timings and {name: bytes} memory sizes."""
+    return {"results": {name: {"seconds": value, "ops_per_second": 1.0 / value} for (name, value) in seconds.items()},
+            "memory": dict(memory)}
+
+
+class QuoridorBenchmarkTest(unittest.TestCase):
+    """Checks how compare and check_memory find regressions in hand-built reports."""
+
+    def test_compare(self):
+        """A timing slower than the threshold allows is listed, one within it is not, and a timing missing from the
+        baseline is left out."""
+        baseline = report({"move_pawn": 1.0, "place_fence": 2.0}, {"bytes_per_game": 700})
+        current = report({"move_pawn": 1.25, "place_fence": 2.1, "legal_moves": 9.0}, {"bytes_per_game": 720})
+        regressions = compare(current, baseline, 0.1)
+        self.assertEqual([regression["name"] for regression in regressions], ["move_pawn"])
+        self.assertEqual(regressions[0]["baseline"], 1.0)
+        self.assertEqual(regressions[0]["current"], 1.25)
+        self.assertAlmostEqual(regressions[0]["change"], 0.25)
+        self.assertEqual(compare(current, baseline, 0.5), [])
+
+    def test_compare_memory(self):
+        """Memory grown past the threshold is listed, and a size missing from the baseline is left out."""
+        baseline = report({}, {"bytes_per_game": 700, "bytes_per_table_entry": 100})
+        current = report({}, {"bytes_per_game": 800, "bytes_per_table_entry": 105, "bytes_per_cached_layout": 900})
+        regressions = compare(current, baseline, 0.1)
+        self.assertEqual([regression["name"] for regression in regressions], ["bytes_per_game"])
+        self.assertEqual(compare(current, {"results": {}}, 0.1), [])
+
+    def test_check_memory(self):
+        """A new game bigger than GAME_MEMORY_LIMIT is listed, one at the limit is not."""
+        self.assertEqual(check_memory(report({}, {"bytes_per_game": GAME_MEMORY_LIMIT})), [])
+        regressions = check_memory(report({}, {"bytes_per_game": GAME_MEMORY_LIMIT * 2}))
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]["name"], "bytes_per_game")
+        self.assertEqual(regressions[0]["baseline"], GAME_MEMORY_LIMIT)
+        self.assertAlmostEqual(regressions[0]["change"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from Quoridor import (BOARD_SIZE, DISTANCE_CACHE, UNREACHABLE, Bitboard, QuoridorGame, fence_edge,
+                      mask_coordinates, square_of)
+
+# random fence sequences checked, and fences placed in each of them
+SEQUENCE_COUNT = 200
+FENCE_COUNT = 30
+
+
+def free_slots(bitboard):
+    """Returns (direction, square) of every slot of the bitboard without a fence."""
+    return [(direction, square_of(x_coord, y_coord))
+            for direction in ("h", "v")
+            for (y_coord, x_coord) in mask_coordinates(bitboard.free_fence_slots(direction))]
+
+
+class QuoridorDistancesTest(unittest.TestCase):
+    """Checks that distance maps repaired after a fence match a full search of the new layout."""
+
+    def test_repair_distances(self):
+        """repair_distances gives the goal_distances maps of the layout after each fence of random sequences, cut off
+        squares included."""
+        rng = random.Random(3)
+        for _ in range(SEQUENCE_COUNT):
+            bitboard = Bitboard()
+            maps = {1: bitboard.goal_distances(1), 2: bitboard.goal_distances(2)}
+            for _ in range(FENCE_COUNT):
+                (direction, square) = rng.choice(free_slots(bitboard))
+                bitboard.set_fence(direction, square)
+                (first, second) = fence_edge(direction, square)
+                for player_number in (1, 2):
+                    maps[player_number] = bitboard.repair_distances(maps[player_number], first, second)
+                    self.assertEqual(maps[player_number], bitboard.goal_distances(player_number))
+
+    def test_validate_fence_path(self):
+        """validate_fence_path gives the maps of a full search with the fence, or None when the fence leaves a pawn
+        without a path."""
+        rng = random.Random(4)
+        for _ in range(SEQUENCE_COUNT // 10):
+            DISTANCE_CACHE.clear()
+            game = QuoridorGame()
+            while game.has_fences_left(game._turn):
+                (direction, square) = rng.choice(free_slots(game._bitboard))
+                bitboard = Bitboard()
+                bitboard.set_fences(game._bitboard.get_h_fences(), game._bitboard.get_v_fences())
+                bitboard.set_fence(direction, square)
+                expected = [None, bitboard.goal_distances(1), bitboard.goal_distances(2)]
+                cut_off = any(expected[player_number][square_of(*game._pawn_positions[player_number])] >= UNREACHABLE
+                              for player_number in (1, 2))
+                distances = game.validate_fence_path(direction, square)
+                (x_coord, y_coord) = divmod(square, BOARD_SIZE)
+                if cut_off:
+                    self.assertIsNone(distances)
+                    self.assertFalse(game.place_fence(game._turn, direction, (y_coord, x_coord)))
+                    continue
+                self.assertEqual(distances, expected)
+                self.assertTrue(game.place_fence(game._turn, direction, (y_coord, x_coord)))
+                self.assertEqual(game.get_distances(), expected)
+
+    def test_fence_cutting_pawn_off_refused(self):
+        """The fence closing the last way out of player 1's corner is refused and changes nothing."""
+        game = QuoridorGame()
+        self.assertTrue(game.place_fence(1, "h", (3, 1)))
+        self.assertTrue(game.place_fence(2, "h", (4, 1)))
+        self.assertTrue(game.place_fence(1, "h", (5, 1)))
+        self.assertTrue(game.place_fence(2, "v", (3, 0)))
+        data = game.to_bytes()
+        self.assertIsNone(game.validate_fence_path("v", square_of(0, 6)))
+        self.assertFalse(game.place_fence(1, "v", (6, 0)))
+        self.assertEqual(game.to_bytes(), data)
+        self.assertTrue(game.place_fence(1, "v", (6, 1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
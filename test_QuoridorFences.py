@@ -0,0 +1,94 @@
+import random
+import unittest
+
+from Quoridor import BOARD_SIZE, GAME_BYTES, Bitboard, QuoridorGame, square_of
+
+# positions compared with place_fence, and actions played to reach each of them
+POSITION_COUNT = 80
+ACTION_COUNT = 40
+# fences closing player 1's corner one after the other, the last one leaving it no path
+CORNER_FENCES = [("h", (3, 1)), ("h", (4, 1)), ("h", (5, 1)), ("v", (3, 0)), ("v", (6, 0))]
+
+
+def fenced_position(rng):
+    """Plays random legal actions from the start, fences more often than pawn moves, and returns the game."""
+    game = QuoridorGame()
+    for _ in range(rng.randrange(ACTION_COUNT)):
+        player_number = game.get_turn()
+        fences = game.legal_fences(player_number)
+        if fences and rng.random() < 0.7:
+            game.place_fence(player_number, *rng.choice(fences))
+        else:
+            game.move_pawn(player_number, rng.choice(game.legal_moves(player_number)))
+        if game.get_current_state() != "UNFINISHED":
+            break
+    return game
+
+
+def placeable_fences(game, player_number):
+    """Returns every (direction, coordinate_tuple) place_fence accepts for the player, each tried on its own copy of
+    the game."""
+    data = game.to_bytes()
+    fences = []
+    for direction in ("h", "v"):
+        for x_coord in range(BOARD_SIZE):
+            for y_coord in range(BOARD_SIZE):
+                if QuoridorGame.from_bytes(data).place_fence(player_number, direction, (y_coord, x_coord)):
+                    fences.append((direction, (y_coord, x_coord)))
+    return fences
+
+
+class LegalFencesTest(unittest.TestCase):
+    """Checks legal_fences, which only searches the paths for the fences that could cut a pawn off, against
+    place_fence."""
+
+    def test_same_as_place_fence(self):
+        """legal_fences lists exactly the fences place_fence accepts, for both players, on seeded random positions."""
+        rng = random.Random(16)
+        cut_off = 0
+        for _ in range(POSITION_COUNT):
+            game = fenced_position(rng)
+            for player_number in (1, 2):
+                fences = sorted(placeable_fences(game, player_number))
+                self.assertEqual(sorted(game.legal_fences(player_number)), fences)
+            if game.get_current_state() == "UNFINISHED" and game.get_fences_left(game.get_turn()):
+                bitboard = game.get_bitboard()
+                free = sum(bin(bitboard.free_fence_slots(direction)).count("1") for direction in ("h", "v"))
+                cut_off += free - len(game.legal_fences(game.get_turn()))
+        # the positions hold fences refused for cutting a pawn off, so the path search was needed
+        self.assertGreater(cut_off, 0)
+
+    def test_cut_off_fence_missing(self):
+        """The fence closing the last way out of player 1's corner is not listed, the fences next to it are."""
+        game = QuoridorGame()
+        for (number, (direction, coordinate_tuple)) in enumerate(CORNER_FENCES[:-1]):
+            self.assertTrue(game.place_fence(number % 2 + 1, direction, coordinate_tuple))
+        fences = game.legal_fences(1)
+        self.assertNotIn(CORNER_FENCES[-1], fences)
+        self.assertIn(("v", (7, 0)), fences)
+        self.assertFalse(game.place_fence(1, *CORNER_FENCES[-1]))
+
+    def test_no_fences_for_player(self):
+        """The player not to move and a player with no fence left have no legal fence."""
+        self.assertEqual(QuoridorGame().legal_fences(2), [])
+        game = QuoridorGame.from_bytes(GAME_BYTES.pack(4, 76, bytes(11), bytes(11), 0, 10, 1, 0))
+        self.assertEqual(game.legal_fences(1), [])
+        self.assertEqual(len(game.legal_fences(1)), len(placeable_fences(game, 1)))
+
+    def test_is_fence_free(self):
+        """Border slots, taken slots and unknown directions are not free, other slots are."""
+        bitboard = Bitboard()
+        for column in range(BOARD_SIZE):
+            self.assertFalse(bitboard.is_fence_free("h", square_of(0, column)))
+            self.assertFalse(bitboard.is_fence_free("v", square_of(column, 0)))
+        self.assertTrue(bitboard.is_fence_free("h", square_of(4, 4)))
+        self.assertTrue(bitboard.is_fence_free("v", square_of(4, 4)))
+        bitboard.set_fence("h", square_of(4, 4))
+        self.assertFalse(bitboard.is_fence_free("h", square_of(4, 4)))
+        self.assertTrue(bitboard.is_fence_free("v", square_of(4, 4)))
+        for direction in ("d", "", None):
+            self.assertFalse(bitboard.is_fence_free(direction, square_of(4, 5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
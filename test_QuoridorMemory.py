@@ -0,0 +1,69 @@
+import copy
+import tracemalloc
+import unittest
+
+from Quoridor import START_BOARD, QuoridorGame
+from QuoridorBenchmark import GAME_MEMORY_LIMIT, measure_memory
+
+# games kept alive to measure the memory per game
+GAME_COUNT = 1000
+
+
+class QuoridorMemoryTest(unittest.TestCase):
+    """Checks the memory taken by each game and that games never write to the shared starting board."""
+
+    def test_new_game_memory(self):
+        """A new game takes at most GAME_MEMORY_LIMIT bytes."""
+        (_, per_game) = measure_memory(GAME_COUNT)
+        self.assertLessEqual(per_game, GAME_MEMORY_LIMIT)
+
+    def test_restored_game_memory(self):
+        """A game rebuilt by from_bytes takes at most GAME_MEMORY_LIMIT bytes."""
+        game = QuoridorGame()
+        game.move_pawn(1, (4, 1))
+        game.place_fence(2, "h", (3, 3))
+        data = game.to_bytes()
+        tracemalloc.start()
+        games = [QuoridorGame.from_bytes(data) for _ in range(GAME_COUNT)]
+        (current, _) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(len(games), GAME_COUNT)
+        self.assertLessEqual(current / GAME_COUNT, GAME_MEMORY_LIMIT)
+
+    def test_start_board_unchanged(self):
+        """Moves, fences, taking them back and restored games leave START_BOARD as it was."""
+        start = copy.deepcopy(START_BOARD)
+        rows = list(START_BOARD)
+        game = QuoridorGame()
+        self.assertTrue(game.move_pawn(1, (4, 1)))
+        self.assertTrue(game.move_pawn(2, (4, 7)))
+        self.assertTrue(game.place_fence(1, "h", (4, 7)))
+        self.assertTrue(game.place_fence(2, "v", (1, 0)))
+        self.assertTrue(game.push_fence(1, "h", (0, 8)))
+        self.assertTrue(game.push_move(2, (3, 7)))
+        self.assertTrue(game.pop())
+        self.assertTrue(game.pop())
+        restored = QuoridorGame.from_bytes(game.to_bytes())
+        self.assertEqual(restored._board, game._board)
+        self.assertTrue(restored.move_pawn(1, (3, 1)))
+        self.assertTrue(restored.place_fence(2, "h", (5, 5)))
+        self.assertEqual(START_BOARD, start)
+        for (row, shared) in zip(START_BOARD, rows):
+            self.assertIs(row, shared)
+
+    def test_board_write_refused(self):
+        """Writing to a cell of _board raises TypeError, in a new game and in one that changed the row, and leaves
+        other games as they were."""
+        game = QuoridorGame()
+        with self.assertRaises(TypeError):
+            game._board[3][3][0] = "-"
+        self.assertTrue(game.move_pawn(1, (4, 1)))
+        (x_coord, y_coord) = game.get_pawn_position(1)
+        with self.assertRaises(TypeError):
+            game._board[x_coord][y_coord][0] = "-"
+        self.assertEqual(QuoridorGame().get_board(), list(START_BOARD))
+        self.assertEqual(game.get_board()[3][3][0], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
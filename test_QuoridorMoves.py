@@ -0,0 +1,151 @@
+import random
+import unittest
+
+from Quoridor import BOARD_SIZE, GAME_BYTES, QuoridorGame, square_of
+from test_QuoridorPushPop import random_position
+
+# random positions whose legal moves are checked against move_pawn, and random moves followed by get_pawn_position
+POSITION_COUNT = 60
+MOVE_COUNT = 30
+
+
+def position(pawn1, pawn2, h_fences=(), v_fences=(), turn=1):
+    """Returns a game made by from_bytes with the pawns on the given (row, column) positions and fences on the top
+    (h) or left (v) edge of the given (row, column) squares."""
+    masks = []
+    for fences in (h_fences, v_fences):
+        mask = 0
+        for (row, column) in fences:
+            mask |= 1 << square_of(row, column)
+        masks.append(mask.to_bytes(11, "little"))
+    return QuoridorGame.from_bytes(GAME_BYTES.pack(square_of(*pawn1), square_of(*pawn2), masks[0], masks[1], 9, 9,
+                                                   turn, 0))
+
+
+class PawnMoveTest(unittest.TestCase):
+    """Checks the pawn moves given by the move tables on fixed positions. Coordinate tuples are (column, row), as
+    move_pawn takes them; player 1 moves down the rows."""
+
+    def assert_moves(self, game, player_number, kinds):
+        """Checks that legal_moves lists exactly the coordinate tuples of kinds, {coordinate_tuple: kind}, that each
+        has its kind and that move_pawn accepts it."""
+        self.assertEqual(sorted(game.legal_moves(player_number)), sorted(kinds))
+        for (coordinate_tuple, kind) in kinds.items():
+            (column, row) = coordinate_tuple
+            self.assertEqual(game.pawn_move_kind(player_number, row, column), kind)
+            copy = QuoridorGame.from_bytes(game.to_bytes())
+            self.assertTrue(copy.move_pawn(player_number, coordinate_tuple))
+            self.assertEqual(copy.get_pawn_position(player_number), (row, column))
+
+    def test_straight_jump(self):
+        """Face to face, a pawn jumps straight over the other one and has no diagonal move."""
+        game = position((3, 4), (4, 4))
+        self.assert_moves(game, 1, {(4, 2): "step", (3, 3): "step", (5, 3): "step", (4, 5): "jump"})
+        self.assert_moves(position((3, 4), (4, 4), turn=2), 2,
+                          {(4, 5): "step", (3, 4): "step", (5, 4): "step", (4, 2): "jump"})
+
+    def test_fence_behind_gives_diagonals(self):
+        """With a fence behind the other pawn there is no jump through it, both diagonals are given instead."""
+        game = position((3, 4), (4, 4), h_fences=[(5, 4)])
+        self.assert_moves(game, 1, {(4, 2): "step", (3, 3): "step", (5, 3): "step", (3, 4): "diagonal",
+                                    (5, 4): "diagonal"})
+        self.assertFalse(game.move_pawn(1, (4, 5)))
+
+    def test_edge_behind_gives_diagonals(self):
+        """The board edge behind the other pawn gives the diagonals as a fence would."""
+        game = position((7, 4), (8, 4))
+        self.assert_moves(game, 1, {(4, 6): "step", (3, 7): "step", (5, 7): "step", (3, 8): "diagonal",
+                                    (5, 8): "diagonal"})
+
+    def test_side_fence_refuses_diagonal(self):
+        """A fence at the side of the other pawn refuses the diagonal on that side only."""
+        game = position((3, 4), (4, 4), h_fences=[(5, 4)], v_fences=[(4, 4)])
+        self.assert_moves(game, 1, {(4, 2): "step", (3, 3): "step", (5, 3): "step", (5, 4): "diagonal"})
+        self.assertFalse(game.move_pawn(1, (3, 4)))
+
+    def test_helpers_act_for_their_own_player(self):
+        """The per-player helpers kept for older callers return False for the other player and change nothing; the
+        original ones returned True there. For their own player they take the moves of their kind."""
+        facing = {player_number: position((3, 4), (4, 4), turn=player_number).to_bytes() for player_number in (1, 2)}
+        fenced = {player_number: position((3, 4), (4, 4), h_fences=[(5, 4)], turn=player_number).to_bytes()
+                  for player_number in (1, 2)}
+        # (position, helper, player the helper is for, row and column of a move of its kind)
+        cases = [(fenced, "validate_move_pawn1", 1, (2, 4)), (fenced, "validate_move_pawn2", 2, (4, 5)),
+                 (fenced, "validate_jump_pawn1", 1, (4, 3)), (facing, "validate_jump_pawn2", 2, (2, 4)),
+                 (fenced, "move_pawn_1", 1, (2, 4)), (fenced, "move_pawn_2", 2, (4, 5)),
+                 (facing, "jump_move_pawn1", 1, (5, 4)), (facing, "jump_move_pawn2", 2, (2, 4)),
+                 (fenced, "move_diagonal_pawn1", 1, (4, 5))]
+        for (data, name, player_number, (row, column)) in cases:
+            game = QuoridorGame.from_bytes(data[player_number])
+            self.assertFalse(getattr(game, name)(3 - player_number, row, column), name)
+            self.assertEqual(game.to_bytes(), data[player_number], name)
+            self.assertTrue(getattr(game, name)(player_number, row, column), name)
+        for (name, player_number) in (("place_fence_player1", 1), ("place_fence_player2", 2)):
+            game = QuoridorGame.from_bytes(fenced[player_number])
+            self.assertFalse(getattr(game, name)(3 - player_number, "h", 6, 6), name)
+            self.assertEqual(game.to_bytes(), fenced[player_number], name)
+            self.assertTrue(getattr(game, name)(player_number, "h", 6, 6), name)
+            self.assertEqual(game.get_fences_left(player_number), 8)
+
+class LegalMovesTest(unittest.TestCase):
+    """Checks legal_moves against move_pawn, and get_pawn_position against the pawn on the board."""
+
+    def accepted_moves(self, game, player_number):
+        """Returns every coordinate tuple move_pawn accepts for the given player, tried on a from_bytes copy of the
+        game for each of the 81 squares."""
+        data = game.to_bytes()
+        moves = []
+        for row in range(BOARD_SIZE):
+            for column in range(BOARD_SIZE):
+                if QuoridorGame.from_bytes(data).move_pawn(player_number, (column, row)):
+                    moves.append((column, row))
+        return moves
+
+    def test_same_as_move_pawn(self):
+        """legal_moves lists exactly the squares move_pawn accepts, on random positions and on positions with jumps
+        and diagonal moves."""
+        rng = random.Random(2)
+        games = [random_position(rng) for _ in range(POSITION_COUNT)]
+        games += [position((3, 4), (4, 4)), position((3, 4), (4, 4), h_fences=[(5, 4)]),
+                  position((3, 4), (4, 4), h_fences=[(5, 4)], v_fences=[(4, 4)]), position((7, 4), (8, 4)),
+                  position((4, 3), (4, 4), turn=2), position((4, 0), (4, 1), v_fences=[(4, 2)], turn=2)]
+        for game in games:
+            player_number = game.get_turn()
+            self.assertEqual(sorted(game.legal_moves(player_number)), sorted(self.accepted_moves(game, player_number)))
+
+    def test_no_moves_off_turn_or_after_a_win(self):
+        """legal_moves is empty for the player whose turn it is not, and for both players once the game is won."""
+        game = position((7, 4), (5, 0))
+        self.assertEqual(game.legal_moves(2), [])
+        self.assertTrue(game.legal_moves(1))
+        self.assertTrue(game.move_pawn(1, (4, 8)))
+        self.assertEqual(game.get_current_state(), "Player_1 won")
+        self.assertEqual(game.legal_moves(1), [])
+        self.assertEqual(game.legal_moves(2), [])
+
+    def test_pawn_position_follows_moves_and_pop(self):
+        """get_pawn_position gives the square of the pawn on the board after every move, and the earlier square again
+        after pop."""
+        rng = random.Random(3)
+        game = QuoridorGame()
+        positions = []
+        for _ in range(MOVE_COUNT):
+            player_number = game.get_turn()
+            moves = game.legal_moves(player_number)
+            if not moves:
+                break
+            positions.append((game.get_pawn_position(1), game.get_pawn_position(2)))
+            (column, row) = rng.choice(moves)
+            self.assertTrue(game.push_move(player_number, (column, row)))
+            self.assertEqual(game.get_pawn_position(player_number), (row, column))
+            for number in (1, 2):
+                (x_coord, y_coord) = game.get_pawn_position(number)
+                self.assertEqual(game.get_board()[x_coord][y_coord][2], "P" + str(number))
+        while positions:
+            self.assertTrue(game.pop())
+            self.assertEqual((game.get_pawn_position(1), game.get_pawn_position(2)), positions.pop())
+        self.assertEqual(game.to_bytes(), QuoridorGame().to_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import copy
+import random
+import unittest
+
+from Quoridor import DISTANCE_CACHE, QuoridorGame
+
+# starting positions tried, and actions pushed on each of them before taking them all back
+POSITION_COUNT = 60
+PUSH_COUNT = 8
+
+
+def game_state(game):
+    """Returns everything push_move, push_fence and push_null change, copied so later actions do not alter it. The
+    distance maps of a game made by from_bytes are only searched on first use, so the maps it would use are taken
+    without storing them in the game."""
+    bitboard = game._bitboard
+    return {"pawns": (bitboard.get_pawn(1), bitboard.get_pawn(2)),
+            "fences": (bitboard.get_h_fences(), bitboard.get_v_fences()),
+            "board": copy.deepcopy(game.get_board()),
+            "pawn_positions": list(game._pawn_positions),
+            "fences_left": (game._num_fence_p1, game._num_fence_p2),
+            "distances": copy.deepcopy(game._distances or DISTANCE_CACHE.get_maps(bitboard)),
+            "hash": game.get_hash(),
+            "turn": game._turn,
+            "state": game._current_state}
+
+
+def random_position(rng):
+    """Plays a few random legal actions from the start, and returns the game or the same position made by
+    from_bytes."""
+    game = QuoridorGame()
+    for _ in range(rng.randrange(20)):
+        player_number = game.get_turn()
+        fences = game.legal_fences(player_number)
+        if fences and rng.random() < 0.4:
+            game.place_fence(player_number, *rng.choice(fences))
+        elif game.legal_moves(player_number):
+            game.move_pawn(player_number, rng.choice(game.legal_moves(player_number)))
+        if game.get_current_state() != "UNFINISHED":
+            break
+    if rng.random() < 0.5:
+        return QuoridorGame.from_bytes(game.to_bytes())
+    return game
+
+
+class QuoridorPushPopTest(unittest.TestCase):
+    """Checks that pop takes back push_move, push_fence and push_null exactly."""
+
+    def push_random(self, rng, game):
+        """Pushes a random legal or invalid action. Returns True if one was pushed, and checks that a refused action
+        changed nothing."""
+        player_number = game.get_turn()
+        roll = rng.random()
+        if roll < 0.1:
+            return game.push_null()
+        if roll < 0.5 and game.legal_moves(player_number):
+            return game.push_move(player_number, rng.choice(game.legal_moves(player_number)))
+        if roll < 0.8 and game.legal_fences(player_number):
+            return game.push_fence(player_number, *rng.choice(game.legal_fences(player_number)))
+        before = game_state(game)
+        if rng.random() < 0.5:
+            pushed = game.push_move(rng.choice((1, 2)), (rng.randrange(9), rng.randrange(9)))
+        else:
+            pushed = game.push_fence(rng.choice((1, 2)), rng.choice("hv"), (rng.randrange(9), rng.randrange(9)))
+        if not pushed:
+            self.assertEqual(game_state(game), before)
+        return pushed
+
+    def test_pop_restores_position(self):
+        """Taking back every pushed action one by one gives the state before each push again, board, distance maps
+        and hash included, in new and restored games."""
+        rng = random.Random(6)
+        for _ in range(POSITION_COUNT):
+            game = random_position(rng)
+            states = []
+            for _ in range(PUSH_COUNT):
+                state = game_state(game)
+                if self.push_random(rng, game):
+                    states.append(state)
+                    self.assertEqual(game.get_hash(), game.compute_hash())
+            while states:
+                self.assertTrue(game.pop())
+                self.assertEqual(game_state(game), states.pop())
+            self.assertFalse(game.pop())
+
+    def test_pop_winning_move(self):
+        """Taking back a winning move puts the game back in progress, in new and restored games."""
+        game = QuoridorGame()
+        for row in range(1, 8):
+            self.assertTrue(game.move_pawn(1, (4, row)))
+            self.assertTrue(game.move_pawn(2, (4 - row % 2, 8)))
+        for position in (game, QuoridorGame.from_bytes(game.to_bytes())):
+            state = game_state(position)
+            self.assertTrue(position.push_move(1, (4, 8)))
+            self.assertEqual(position.get_current_state(), "Player_1 won")
+            self.assertTrue(position.pop())
+            self.assertEqual(game_state(position), state)
+
+    def test_pop_restored_game_distances(self):
+        """A fence pushed and taken back in a game made by from_bytes leaves its distance maps to be searched later."""
+        game = QuoridorGame()
+        game.place_fence(1, "h", (4, 4))
+        restored = QuoridorGame.from_bytes(game.to_bytes())
+        self.assertIsNone(restored._distances)
+        self.assertTrue(restored.push_fence(2, "v", (2, 6)))
+        self.assertTrue(restored.pop())
+        self.assertIsNone(restored._distances)
+        self.assertEqual(restored.get_distances(), game.get_distances())
+        self.assertEqual(restored.get_board(), game.get_board())
+
+
+if __name__ == "__main__":
+    unittest.main()
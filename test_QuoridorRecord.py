@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from QuoridorRecord import ACTION_CODES, INDEX_ENTRY, GameRecordReader, GameRecordWriter, decode_action, \
+    encode_action, index_path
+
+GAMES = [
+    (1, [("move", (4, 1)), ("move", (4, 7)), ("fence", "h", (3, 3)), ("fence", "v", (5, 8))]),
+    (0, []),
+    (2, [("fence", "v", (1, 0)), ("move", (4, 7)), ("move", (3, 1))]),
+]
+
+
+class QuoridorRecordTest(unittest.TestCase):
+    """Checks the action codes and the record files left by crashes."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "games.bin")
+        with GameRecordWriter(self._path) as writer:
+            for (winner, actions) in GAMES:
+                writer.write_game(actions, winner)
+        self._size = os.path.getsize(self._path)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def read_all(self):
+        """Returns every game of the record file, read in order and by number."""
+        with GameRecordReader(self._path) as reader:
+            games = list(reader)
+            self.assertEqual([reader.get_game(number) for number in range(len(reader))], games)
+            return games
+
+    def test_every_code(self):
+        """Every code decodes to an action encoded back to it, no two codes share an action, and codes past the last
+        one and border fences have no action."""
+        actions = [decode_action(code) for code in range(ACTION_CODES)]
+        self.assertEqual(ACTION_CODES, 225)
+        self.assertEqual([encode_action(action) for action in actions], list(range(ACTION_CODES)))
+        self.assertEqual(len(set(actions)), ACTION_CODES)
+        for bad in (lambda: decode_action(ACTION_CODES), lambda: encode_action(("fence", "h", (3, 0))),
+                    lambda: encode_action(("fence", "v", (0, 3))), lambda: encode_action(("move", (9, 0)))):
+            with self.assertRaises(ValueError):
+                bad()
+
+    def test_round_trip(self):
+        """Games are read back as they were written."""
+        self.assertEqual(self.read_all(), GAMES)
+
+    def test_partial_game(self):
+        """A last game cut short is skipped by the reader and dropped by the next writer, whose games follow the
+        complete ones."""
+        with open(self._path, "ab") as records:
+            records.write(bytes((10, 0, 1, 4, 13)))
+        self.assertEqual(self.read_all(), GAMES)
+        with GameRecordReader(self._path) as reader:
+            self.assertEqual(reader.get_end(), self._size)
+            with self.assertRaises(ValueError):
+                reader.read_game(self._size)
+        with GameRecordWriter(self._path) as writer:
+            self.assertEqual(writer.write_game([("move", (4, 1))], 0), self._size)
+        self.assertEqual(self.read_all(), GAMES + [(0, [("move", (4, 1))])])
+        with open(index_path(self._path), "rb") as index:
+            self.assertEqual(len(index.read()), (len(GAMES) + 1) * INDEX_ENTRY.size)
+
+    def test_stale_index(self):
+        """An index missing games, listing a game past the end of the file or missing altogether is not used, the
+        offsets are found by scanning the records."""
+        with open(index_path(self._path), "rb") as index:
+            entries = index.read()
+        stale = [entries[:INDEX_ENTRY.size], entries + INDEX_ENTRY.pack(self._size), b""]
+        for data in stale:
+            with open(index_path(self._path), "wb") as index:
+                index.write(data)
+            self.assertEqual(self.read_all(), GAMES)
+        os.remove(index_path(self._path))
+        self.assertEqual(self.read_all(), GAMES)
+        with GameRecordWriter(self._path):
+            pass
+        with open(index_path(self._path), "rb") as index:
+            self.assertEqual(index.read(), entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
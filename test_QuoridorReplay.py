@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import QuoridorReplay
+from QuoridorReplay import replay_file
+from QuoridorTournament import play_game
+
+# games in the legacy log file, and games between two checkpoints
+GAME_COUNT = 6
+CHECKPOINT_EVERY = 2
+
+
+def legacy_entry(player_number, action):
+    """Returns the [player_number, "move" or "fence", direction, coordinate] log entry of an action."""
+    if action[0] == "move":
+        return [player_number, "move", None, list(action[1])]
+    return [player_number, "fence", action[1], list(action[2])]
+
+
+def read_lines(path):
+    """Returns the JSON lines of a replay output file."""
+    with open(path) as output:
+        return [json.loads(line) for line in output]
+
+
+class QuoridorReplayTest(unittest.TestCase):
+    """Checks the replay of legacy JSON logs and carrying on after an interruption."""
+
+    def setUp(self):
+        """Writes GAME_COUNT finished games as bare lists of legacy log entries, with no winner recorded."""
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "legacy.jsonl")
+        with open(self._path, "w") as records:
+            for index in range(GAME_COUNT):
+                record = play_game(index, "greedy", "random", 1)
+                records.write(json.dumps([legacy_entry(*entry) for entry in record["actions"]]) + "\n\n")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def output_path(self, name):
+        """Returns the path of a replay output file in the temporary directory."""
+        return os.path.join(self._directory.name, name)
+
+    def test_legacy_list_lines(self):
+        """Bare lists are replayed as games, and with no winner recorded the winner is unknown, not invalid."""
+        counts = replay_file(self._path, self.output_path("full.jsonl"))
+        self.assertEqual(counts["games"], GAME_COUNT)
+        self.assertEqual(counts["invalid"], 0)
+        lines = read_lines(self.output_path("full.jsonl"))
+        self.assertEqual([line["game"] for line in lines], list(range(GAME_COUNT)))
+        for line in lines:
+            self.assertIsNone(line["refused"])
+            self.assertIsNone(line["winner_matches"])
+            self.assertIn(line["winner"], (1, 2))
+
+    def test_resume_from_checkpoint(self):
+        """A replay stopped halfway through the file carries on from its last checkpoint and writes the same lines as
+        one run from the start."""
+        replay_file(self._path, self.output_path("full.jsonl"), checkpoint_every=CHECKPOINT_EVERY)
+        replay_game = QuoridorReplay.replay_game
+        calls = []
+
+        def crashing_replay(actions, trusted=False):
+            calls.append(actions)
+            if len(calls) > CHECKPOINT_EVERY + 1:
+                raise KeyboardInterrupt
+            return replay_game(actions, trusted)
+
+        path = self.output_path("resumed.jsonl")
+        with mock.patch.object(QuoridorReplay, "replay_game", crashing_replay):
+            with self.assertRaises(KeyboardInterrupt):
+                replay_file(self._path, path, checkpoint_every=CHECKPOINT_EVERY)
+        self.assertEqual(len(read_lines(path)), CHECKPOINT_EVERY + 1)
+        counts = replay_file(self._path, path, checkpoint_every=CHECKPOINT_EVERY)
+        self.assertEqual(counts["resumed_from"], CHECKPOINT_EVERY)
+        self.assertEqual(counts["games"], GAME_COUNT)
+        self.assertEqual(read_lines(path), read_lines(self.output_path("full.jsonl")))
+
+
+if __name__ == "__main__":
+    unittest.main()
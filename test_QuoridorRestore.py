@@ -0,0 +1,124 @@
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+
+from Quoridor import GAME_BYTES, QuoridorGame
+from QuoridorServer import QuoridorServer, SessionRegistry
+from test_QuoridorPushPop import game_state, random_position
+
+# positions packed and unpacked, and games hosted in the snapshot file tests
+POSITION_COUNT = 200
+SESSION_COUNT = 2500
+
+
+def pack(pawn1=4, pawn2=76, fences_p1=10, fences_p2=10, turn=1, state=0):
+    """Returns game data as to_bytes writes it, with no fences and the given fields."""
+    return GAME_BYTES.pack(pawn1, pawn2, bytes(11), bytes(11), fences_p1, fences_p2, turn, state)
+
+
+class GameBytesTest(unittest.TestCase):
+    """Checks to_bytes and from_bytes."""
+
+    def test_round_trip(self):
+        """A game made by from_bytes is in the same position as the one packed, finished games included, and packs
+        to the same bytes."""
+        rng = random.Random(14)
+        for _ in range(POSITION_COUNT):
+            game = random_position(rng)
+            data = game.to_bytes()
+            self.assertEqual(len(data), GAME_BYTES.size)
+            restored = QuoridorGame.from_bytes(data)
+            self.assertEqual(game_state(restored), game_state(game))
+            self.assertEqual(restored.to_bytes(), data)
+            for player_number in (1, 2):
+                self.assertEqual(restored.is_winner(player_number), game.is_winner(player_number))
+                self.assertEqual(restored.legal_moves(player_number), game.legal_moves(player_number))
+
+    def test_bad_data_refused(self):
+        """Data of the wrong size, out of range fields or a state the pawns contradict raise ValueError."""
+        self.assertEqual(QuoridorGame.from_bytes(pack()).to_bytes(), QuoridorGame().to_bytes())
+        bad = [pack()[:-1], pack() + b"\0", pack(pawn1=81), pack(pawn2=4), pack(fences_p1=11), pack(turn=0),
+               pack(state=3),
+               GAME_BYTES.pack(4, 76, b"\1" + bytes(10), bytes(11), 10, 10, 1, 0),
+               # pawn 1 on its goal row in an unfinished game, and a win with the pawn on its starting row
+               pack(pawn1=76, pawn2=40), pack(state=1), pack(state=2),
+               # both pawns on their goal rows
+               pack(pawn1=76, pawn2=4, state=1)]
+        for data in bad:
+            with self.assertRaises(ValueError):
+                QuoridorGame.from_bytes(data)
+        won = QuoridorGame.from_bytes(pack(pawn1=76, pawn2=40, turn=2, state=1))
+        self.assertTrue(won.is_winner(1))
+        self.assertEqual(won.get_current_state(), "Player_1 won")
+
+
+class SessionSnapshotTest(unittest.TestCase):
+    """Checks SessionRegistry.save and load, and the snapshots written by a running QuoridorServer."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "sessions.qss")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def make_registry(self, count):
+        """Returns a registry hosting count games in a few random positions, some of them closed again."""
+        rng = random.Random(count)
+        positions = [random_position(rng).to_bytes() for _ in range(20)]
+        registry = SessionRegistry()
+        for number in range(count):
+            session = registry.create()
+            session._game = QuoridorGame.from_bytes(positions[number % len(positions)])
+        for game_id in range(1, count, 7):
+            registry.remove(str(game_id))
+        return registry
+
+    def assert_same_sessions(self, registry, loaded):
+        """Checks that both registries host the same games in the same positions."""
+        self.assertEqual(sorted(loaded._sessions), sorted(registry._sessions))
+        for (game_id, session) in registry._sessions.items():
+            self.assertEqual(loaded.get(game_id).get_game().to_bytes(), session.get_game().to_bytes())
+
+    def test_save_load(self):
+        """Every game is read back from the file, and new games get ids after the largest one read."""
+        registry = self.make_registry(50)
+        self.assertEqual(registry.save(self._path), len(registry))
+        loaded = SessionRegistry()
+        self.assertEqual(loaded.load(self._path), len(registry))
+        self.assert_same_sessions(registry, loaded)
+        self.assertEqual(loaded.create().get_game_id(), "51")
+
+    def test_not_a_snapshot(self):
+        """A file not written by save raises ValueError."""
+        with open(self._path, "wb") as snapshot:
+            snapshot.write(b"QRC1" + bytes(8))
+        with self.assertRaises(ValueError):
+            SessionRegistry().load(self._path)
+
+    def test_concurrent_server_snapshots(self):
+        """Snapshots started together, one of them cancelled, and the last one made by stop leave
+        one whole snapshot file and no temporary files."""
+        registry = self.make_registry(SESSION_COUNT)
+
+        async def run():
+            server = QuoridorServer(registry, snapshot_path=self._path, snapshot_interval=3600.0)
+            await server.start("127.0.0.1", 0)
+            saves = [asyncio.ensure_future(server.save_snapshot()) for _ in range(4)]
+            await asyncio.sleep(0)
+            saves[1].cancel()
+            registry.create()
+            await server.stop()
+            await asyncio.gather(*saves, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertEqual(os.listdir(self._directory.name), [os.path.basename(self._path)])
+        loaded = SessionRegistry()
+        loaded.load(self._path)
+        self.assert_same_sessions(registry, loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
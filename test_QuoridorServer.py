@@ -0,0 +1,113 @@
+import asyncio
+import json
+import time
+import unittest
+
+from QuoridorServer import LINE_LIMIT, LoadClient, QuoridorServer, SessionRegistry
+
+# requests sent without reading the answers in the backpressure test
+FLOOD_REQUESTS = 50000
+
+
+class QuoridorServerTest(unittest.IsolatedAsyncioTestCase):
+    """Checks the line protocol, eviction, backpressure and stopping of QuoridorServer on a local port."""
+
+    async def asyncSetUp(self):
+        self._server = QuoridorServer(SessionRegistry(max_sessions=3), idle_timeout=60.0)
+        listener = await self._server.start("127.0.0.1", 0)
+        self._port = listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self._server.stop()
+
+    async def connect(self):
+        """Opens a LoadClient connection to the server."""
+        (reader, writer) = await asyncio.open_connection("127.0.0.1", self._port, limit=LINE_LIMIT)
+        return LoadClient(reader, writer)
+
+    async def test_protocol(self):
+        """Every op answers with its result and the game status, and the id of the request."""
+        client = await self.connect()
+        answer = await client.request({"op": "new"})
+        self.assertEqual((answer["ok"], answer["turn"], answer["state"]), (True, 1, "UNFINISHED"))
+        game_id = answer["game"]
+        answer = await client.request({"op": "move", "game": game_id, "player": 1, "to": [4, 1]})
+        self.assertEqual((answer["ok"], answer["turn"]), (True, 2))
+        answer = await client.request({"op": "move", "game": game_id, "player": 1, "to": [4, 2]})
+        self.assertEqual((answer["ok"], answer["turn"]), (False, 2))
+        answer = await client.request({"op": "fence", "game": game_id, "player": 2, "direction": "h", "at": [3, 3]})
+        self.assertTrue(answer["ok"])
+        answer = await client.request({"op": "view", "game": game_id})
+        self.assertEqual(answer["version"], 2)
+        self.assertEqual(answer["fences_left"], [10, 9])
+        answer = await client.request({"op": "winner", "game": game_id, "player": 1})
+        self.assertEqual((answer["ok"], answer["winner"]), (True, False))
+        self.assertEqual(await client.request({"op": "spin", "game": game_id}),
+                         {"ok": False, "error": "unknown op", "id": 7})
+        self.assertTrue((await client.request({"op": "close", "game": game_id}))["ok"])
+        self.assertEqual((await client.request({"op": "view", "game": game_id}))["error"], "unknown game")
+        self.assertEqual(len(self._server.get_registry()), 0)
+        stats = await client.request({"op": "stats"})
+        self.assertEqual(stats["served"], 9)
+        self.assertGreater(stats["p99_ms"], 0.0)
+        await client.close()
+
+    async def test_bad_request(self):
+        """A line that is not a request gets an answer without an id, which goes to the request that sent it; the
+        connection keeps working and requests sent after it get their own answers."""
+        client = await self.connect()
+        (bad, good) = await asyncio.gather(client.send(b"not json\n"), client.request({"op": "new"}))
+        self.assertEqual(bad, {"ok": False, "error": "bad request"})
+        self.assertTrue(good["ok"])
+        answer = await client.request({"op": "move", "game": good["game"], "player": 1})
+        self.assertEqual(answer["error"], "bad request")
+        await client.close()
+
+    async def test_server_full(self):
+        """New games are refused once max_sessions games are hosted."""
+        client = await self.connect()
+        for _ in range(3):
+            self.assertTrue((await client.request({"op": "new"}))["ok"])
+        self.assertEqual(await client.request({"op": "new"}), {"ok": False, "error": "server full", "id": 4})
+        await client.close()
+
+    async def test_evict_idle(self):
+        """Only games unused for idle_timeout seconds are evicted."""
+        registry = SessionRegistry()
+        idle = registry.create()
+        used = registry.create()
+        time.sleep(0.05)
+        registry.get(used.get_game_id())
+        self.assertEqual(registry.evict_idle(0.03), 1)
+        self.assertIsNone(registry.get(idle.get_game_id()))
+        self.assertIs(registry.get(used.get_game_id()), used)
+
+    async def test_backpressure(self):
+        """A client that does not read its answers stops the server reading its requests, and every request is
+        answered in order once it reads again."""
+        (reader, writer) = await asyncio.open_connection("127.0.0.1", self._port, limit=LINE_LIMIT)
+        registry = self._server.get_registry()
+        game_id = registry.create().get_game_id()
+        request = json.dumps({"op": "view", "game": game_id}).encode()
+        for number in range(FLOOD_REQUESTS):
+            writer.write(request[:-1] + b', "id": %d}\n' % number)
+        await asyncio.sleep(0.5)
+        self.assertLess(self._server.get_served(), FLOOD_REQUESTS)
+        for number in range(FLOOD_REQUESTS):
+            self.assertEqual(json.loads(await reader.readline())["id"], number)
+        self.assertEqual(self._server.get_served(), FLOOD_REQUESTS)
+        writer.close()
+        await writer.wait_closed()
+
+    async def test_stop_closes_connections(self):
+        """Stopping the server closes open connections, and requests still waiting get a ConnectionError."""
+        client = await self.connect()
+        self.assertTrue((await client.request({"op": "new"}))["ok"])
+        await self._server.stop()
+        with self.assertRaises(ConnectionError):
+            await client.request({"op": "new"})
+        await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from Quoridor import GAME_BYTES, QuoridorGame
+from QuoridorStats import ACTION_STAGES, APPLY_STAGES, CHECK_STAGES, disable_instrumentation, \
+    enable_instrumentation, is_instrumented
+
+# fences closing player 1's corner one after the other, the last one refused for leaving no path
+CORNER_FENCES = [("h", (3, 1)), ("h", (4, 1)), ("h", (5, 1)), ("v", (3, 0)), ("v", (6, 0))]
+
+
+def restored_game(pawn1=4, pawn2=76, fences_p1=10, turn=1, state=0):
+    """Returns a game made by from_bytes with no fences and the given fields."""
+    return QuoridorGame.from_bytes(GAME_BYTES.pack(pawn1, pawn2, bytes(11), bytes(11), fences_p1, 10, turn, state))
+
+
+class QuoridorStatsTest(unittest.TestCase):
+    """Checks what the pipeline instrumentation counts."""
+
+    def setUp(self):
+        self._methods = {stage: QuoridorGame.__dict__[stage]
+                         for stage in list(CHECK_STAGES) + list(APPLY_STAGES) + list(ACTION_STAGES)}
+        self._stats = enable_instrumentation()
+        self.addCleanup(disable_instrumentation)
+
+    def test_one_rejection_per_refused_action(self):
+        """Every refused action counts one rejection of the action and one of the check stage that refused it;
+        accepted actions count none."""
+        refused = {
+            "same_player_turn": lambda: QuoridorGame().move_pawn(2, (4, 7)),
+            "lock_borders": lambda: QuoridorGame().move_pawn(1, (9, 0)),
+            "validate_pawn_move": lambda: QuoridorGame().move_pawn(1, (4, 2)),
+            "validate_fence_slot": lambda: QuoridorGame().place_fence(1, "d", (3, 3)),
+            "has_fences_left": lambda: restored_game(fences_p1=0).place_fence(1, "h", (3, 3)),
+            "game_in_progress": lambda: restored_game(pawn1=76, pawn2=40, turn=2, state=1).move_pawn(2, (4, 3)),
+        }
+        for (stage, action) in refused.items():
+            self.assertFalse(action(), stage)
+            self.assertEqual(self._stats.get_rejections(stage), 1, stage)
+        game = QuoridorGame()
+        for (number, (direction, coordinate_tuple)) in enumerate(CORNER_FENCES):
+            accepted = game.place_fence(number % 2 + 1, direction, coordinate_tuple)
+            self.assertEqual(accepted, number < len(CORNER_FENCES) - 1)
+        self.assertEqual(self._stats.get_rejections("validate_fence_path"), 1)
+        self.assertEqual(sum(self._stats.get_rejections(stage) for stage in CHECK_STAGES), len(refused) + 1)
+        self.assertEqual(self._stats.get_rejections("move_pawn"), 4)
+        self.assertEqual(self._stats.get_rejections("place_fence"), 3)
+        self.assertEqual(self._stats.get_calls("place_fence"), 3 + len(CORNER_FENCES) - 1)
+        self.assertEqual(self._stats.get_calls("update_fence"), len(CORNER_FENCES) - 1)
+        self.assertIn('stage="validate_fence_path",reason="fence would block a path to the goal"} 1',
+                      self._stats.to_prometheus())
+
+    def test_search_calls_not_counted(self):
+        """legal_moves, legal_fences, push_* and pop count nothing, even between counted actions."""
+        game = QuoridorGame()
+        self.assertTrue(game.move_pawn(1, (4, 1)))
+        stages = self._stats.get_stages()
+        game.legal_moves(2)
+        game.legal_fences(2)
+        self.assertTrue(game.push_fence(2, "h", (3, 3)))
+        self.assertFalse(game.push_move(2, (4, 7)))
+        self.assertTrue(game.push_move(1, (4, 2)))
+        self.assertTrue(game.pop())
+        self.assertTrue(game.pop())
+        self.assertEqual(self._stats.get_stages(), stages)
+
+    def test_disable_restores_methods(self):
+        """disable_instrumentation puts back the plain methods, and enabling twice does not wrap them twice."""
+        self.assertTrue(is_instrumented())
+        for (stage, method) in self._methods.items():
+            self.assertIsNot(QuoridorGame.__dict__[stage], method)
+            self.assertIs(QuoridorGame.__dict__[stage].__wrapped__, method)
+        enable_instrumentation()
+        for (stage, method) in self._methods.items():
+            self.assertIs(QuoridorGame.__dict__[stage].__wrapped__, method)
+        disable_instrumentation()
+        self.assertFalse(is_instrumented())
+        for (stage, method) in self._methods.items():
+            self.assertIs(QuoridorGame.__dict__[stage], method)
+
+
+if __name__ == "__main__":
+    unittest.main()
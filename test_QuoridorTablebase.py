@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+from Quoridor import GAME_BYTES, GOAL_MASKS, QuoridorGame, square_of_mask
+from QuoridorTablebase import STATES, Tablebase, TablebaseWriter, decode_entry, solve_layout, state_index
+
+# fences placed in turn before both players are taken out of fences
+FENCES = [("h", (3, 3)), ("v", (5, 5)), ("h", (4, 6)), ("v", (2, 1)), ("h", (6, 7)), ("h", (1, 2))]
+
+
+def fenced_game(pawn1=4, pawn2=76, turn=1):
+    """Returns a game with the FENCES placed, no fences left and the pawns on the given squares."""
+    game = QuoridorGame()
+    for (number, (direction, coordinate_tuple)) in enumerate(FENCES):
+        assert game.place_fence(number % 2 + 1, direction, coordinate_tuple)
+    (_, _, h_fences, v_fences, _, _, _, _) = GAME_BYTES.unpack(game.to_bytes())
+    return QuoridorGame.from_bytes(GAME_BYTES.pack(pawn1, pawn2, h_fences, v_fences, 0, 0, turn, 0))
+
+
+def children(bitboard, turn, pawn1, pawn2):
+    """Returns the entry numbers of the positions one pawn move away, the other player to move."""
+    bitboard.set_pawn(1, 1 << pawn1)
+    bitboard.set_pawn(2, 1 << pawn2)
+    mask = bitboard.pawn_moves(turn)
+    states = []
+    while mask:
+        square = square_of_mask(mask & -mask)
+        mask &= mask - 1
+        if turn == 1:
+            states.append(state_index(2, square, pawn2))
+        else:
+            states.append(state_index(1, pawn1, square))
+    return states
+
+
+class QuoridorTablebaseTest(unittest.TestCase):
+    """Checks the solved tables against a one-ply minimax and plays them out."""
+
+    def setUp(self):
+        self._game = fenced_game()
+        bitboard = self._game.get_bitboard()
+        self._layout = (bitboard.get_h_fences(), bitboard.get_v_fences())
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "endgames.qtb")
+        with TablebaseWriter(self._path) as writer:
+            writer.add_layout(*self._layout)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_entries_are_minimax(self):
+        """Finished positions are lost by the player to move unless its own pawn is home, a win is the quickest way
+        to a child lost by the opponent, a loss the slowest way when every child is won by the opponent, and draws
+        have neither."""
+        entries = solve_layout(*self._layout)
+        bitboard = fenced_game().get_bitboard()
+        wins = 0
+        for turn in (1, 2):
+            for pawn1 in range(81):
+                for pawn2 in range(81):
+                    (result, plies) = decode_entry(entries[state_index(turn, pawn1, pawn2)])
+                    if pawn1 == pawn2:
+                        self.assertEqual(result, "draw")
+                        continue
+                    if (1 << pawn1) & GOAL_MASKS[1] or (1 << pawn2) & GOAL_MASKS[2]:
+                        own = pawn1 if turn == 1 else pawn2
+                        self.assertEqual((result, plies), ("win" if (1 << own) & GOAL_MASKS[turn] else "loss", 0))
+                        continue
+                    results = [decode_entry(entries[child]) for child in children(bitboard, turn, pawn1, pawn2)]
+                    losses = [child_plies for (child, child_plies) in results if child == "loss"]
+                    if losses:
+                        self.assertEqual((result, plies), ("win", min(losses) + 1))
+                        wins += 1
+                    elif results and all(child == "win" for (child, _) in results):
+                        self.assertEqual((result, plies), ("loss", max(child for (_, child) in results) + 1))
+                    else:
+                        self.assertEqual(result, "draw")
+        self.assertGreater(wins, STATES // 4)
+
+    def test_best_move_plays_out(self):
+        """best_move for both sides from the start of the race ends the game in the plies probe predicted, won by the
+        side probe said."""
+        with Tablebase(self._path) as tablebase:
+            self.assertEqual(len(tablebase), 1)
+            game = self._game
+            (result, plies) = tablebase.probe(game)
+            self.assertIn(result, ("win", "loss"))
+            first = game.get_turn()
+            for ply in range(plies):
+                player_number = game.get_turn()
+                self.assertEqual(tablebase.probe(game), (result if ply % 2 == 0 else
+                                                         {"win": "loss", "loss": "win"}[result], plies - ply))
+                self.assertTrue(game.move_pawn(player_number, tablebase.best_move(game)))
+            winner = first if result == "win" else 3 - first
+            self.assertTrue(game.is_winner(winner))
+            self.assertEqual(game.get_current_state(), "Player_%d won" % winner)
+
+    def test_no_answer(self):
+        """probe and best_move have no answer with a fence left or for a layout with no table."""
+        with Tablebase(self._path) as tablebase:
+            self.assertIsNone(tablebase.probe(QuoridorGame()))
+            self.assertIsNone(tablebase.best_move(QuoridorGame()))
+            unknown = QuoridorGame.from_bytes(GAME_BYTES.pack(4, 76, bytes(11), bytes(11), 0, 0, 1, 0))
+            self.assertFalse(tablebase.has_layout(unknown))
+            self.assertIsNone(tablebase.probe(unknown))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+
+from QuoridorTournament import label_policies, make_policy, rate, run_tournament, schedule
+
+# games per pair of policies, and actions before a game is counted as a draw
+GAME_COUNT = 4
+MAX_PLIES = 60
+
+
+def by_game(records):
+    """Returns the records in game index order."""
+    return sorted(records, key=lambda record: record["game"])
+
+
+class QuoridorTournamentTest(unittest.TestCase):
+    """Checks the scheduling, playing and rating of a round robin."""
+
+    def test_schedule_swaps_sides(self):
+        """Every pair plays the given number of games, changing sides every game, with consecutive game indexes."""
+        tasks = schedule(["random", "greedy", "search"], GAME_COUNT, 5, MAX_PLIES)
+        self.assertEqual([task[0] for task in tasks], list(range(3 * GAME_COUNT)))
+        self.assertTrue(all(task[3:] == (5, MAX_PLIES) for task in tasks))
+        for start in range(0, len(tasks), GAME_COUNT):
+            pairs = [task[1:3] for task in tasks[start:start + GAME_COUNT]]
+            self.assertEqual(pairs[1::2], [pair[::-1] for pair in pairs[0::2]])
+        self.assertEqual([task[1:3] for task in tasks[0:GAME_COUNT:2]], [("random", "greedy")] * (GAME_COUNT // 2))
+
+    def test_workers_give_the_same_records(self):
+        """Playing in this process or on two worker processes gives the same records for one seed."""
+        tasks = schedule(["random", "greedy"], GAME_COUNT, 7, MAX_PLIES)
+        in_process = [record for chunk in run_tournament(tasks, workers=0, chunk_size=3) for record in chunk]
+        pooled = [record for chunk in run_tournament(tasks, workers=2, chunk_size=3) for record in chunk]
+        self.assertEqual(len(in_process), len(tasks))
+        self.assertEqual(by_game(pooled), by_game(in_process))
+
+    def test_rate_ignores_record_order(self):
+        """rate gives the same table whatever order the records come in."""
+        tasks = schedule(label_policies(["random", "greedy", "random"]), GAME_COUNT, 3, MAX_PLIES)
+        records = [record for chunk in run_tournament(tasks, workers=0) for record in chunk]
+        table = rate(records)
+        self.assertEqual(sum(row["games"] for row in table.values()), 2 * len(records))
+        rng = random.Random(8)
+        for _ in range(5):
+            rng.shuffle(records)
+            self.assertEqual(rate(records), table)
+
+    def test_label_policies(self):
+        """A policy given more than once gets one label per entry, and make_policy still builds it from a label."""
+        self.assertEqual(label_policies(["random", "greedy", "random"]), ["random#1", "greedy", "random#2"])
+        self.assertEqual(label_policies(["random", "greedy"]), ["random", "greedy"])
+        tasks = schedule(label_policies(["random", "random"]), GAME_COUNT, 1, MAX_PLIES)
+        records = [record for chunk in run_tournament(tasks, workers=0) for record in chunk]
+        table = rate(records)
+        self.assertEqual(sorted(table), ["random#1", "random#2"])
+        self.assertEqual([row["games"] for row in table.values()], [GAME_COUNT, GAME_COUNT])
+        self.assertEqual(type(make_policy("greedy#2", 0)), type(make_policy("greedy", 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
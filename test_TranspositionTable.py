@@ -0,0 +1,69 @@
+import unittest
+
+from Quoridor import EXACT, LOWER_BOUND, TranspositionTable
+
+# entries of the table used by the replacement tests: 8 pairs, so keys 8 apart share a pair
+TABLE_SIZE = 16
+
+
+class TranspositionTableTest(unittest.TestCase):
+    """Checks the size and replacement policy of the transposition table."""
+
+    def test_size_rounded_down(self):
+        """The size is rounded down to a power of two, one pair of slots at least, and storing many more entries does
+        not grow the table."""
+        for (size, expected) in ((1 << 16, 1 << 16), (100, 64), (16, 16), (3, 2), (2, 2), (1, 2)):
+            self.assertEqual(TranspositionTable(size).get_size(), expected, size)
+        table = TranspositionTable(100)
+        for key in range(1000):
+            table.store(key * 7919, key % 5, key, EXACT)
+        self.assertEqual(table.get_size(), 64)
+        self.assertEqual(len(table._keys), 64)
+        self.assertEqual(len(table._entries), 64)
+
+    def test_depth_preferred_and_always_replace(self):
+        """The first slot of a pair keeps the deepest result and the second one the newest; a result for the same
+        position, or one at least as deep, takes the first slot."""
+        table = TranspositionTable(TABLE_SIZE)
+        table.store(1, 5, 10, EXACT, ("move", (4, 1)))
+        table.store(9, 3, 20, LOWER_BOUND)
+        self.assertEqual(table.lookup(1), (5, 10, EXACT, ("move", (4, 1))))
+        self.assertEqual(table.lookup(9), (3, 20, LOWER_BOUND, None))
+        # a shallower result replaces the newest one and leaves the deepest one
+        table.store(17, 2, 30, EXACT)
+        self.assertIsNone(table.lookup(9))
+        self.assertEqual(table.lookup(1)[0], 5)
+        self.assertEqual(table.lookup(17)[0], 2)
+        # a deeper result takes the first slot
+        table.store(25, 6, 40, EXACT)
+        self.assertIsNone(table.lookup(1))
+        self.assertEqual(table.lookup(25)[0], 6)
+        self.assertEqual(table.lookup(17)[0], 2)
+        # the same position is updated in place, even with a shallower result
+        table.store(25, 1, 50, EXACT)
+        self.assertEqual(table.lookup(25), (1, 50, EXACT, None))
+        # an equal depth replaces the first slot too
+        table.store(33, 1, 60, EXACT)
+        self.assertIsNone(table.lookup(25))
+        self.assertEqual(table.lookup(33)[1], 60)
+        # other pairs are left alone
+        table.store(2, 0, 70, EXACT)
+        self.assertEqual(table.lookup(33)[1], 60)
+        self.assertEqual(table.lookup(2)[1], 70)
+
+    def test_counters_and_clear(self):
+        """Lookups count hits and misses, and clear empties the table and resets them."""
+        table = TranspositionTable(TABLE_SIZE)
+        table.store(3, 1, 0, EXACT)
+        table.lookup(3)
+        table.lookup(11)
+        table.lookup(4)
+        self.assertEqual((table.get_hits(), table.get_misses()), (1, 2))
+        table.clear()
+        self.assertEqual((table.get_hits(), table.get_misses()), (0, 0))
+        self.assertIsNone(table.lookup(3))
+        self.assertEqual(table.get_size(), TABLE_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()